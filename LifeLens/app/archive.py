@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import aliased
+from .models import (
+    db, User, Activity, Mood, Nutrition, HabitLog,
+    ActivityArchive, MoodArchive, NutritionArchive, HabitLogArchive,
+)
+
+
+# hot model -> the archive table its old rows are moved to
+ARCHIVES = {
+    Activity: ActivityArchive,
+    Mood: MoodArchive,
+    Nutrition: NutritionArchive,
+    HabitLog: HabitLogArchive,
+}
+
+
+def boundary(user_id):
+    """
+    The user's archived_before date: anything dated earlier may be in the
+    archive, nothing later is. None if nothing was ever archived.
+    """
+    # inside a request this is current_user, already in the identity map
+    user = db.session.get(User, user_id)
+    return user.archived_before if user else None
+
+
+def reaches(user_id, since=None):
+    """Whether a read of the user's entries from `since` (or all of them) needs the archive."""
+    before = boundary(user_id)
+    return before is not None and (since is None or since < before)
+
+
+def including(model):
+    """`model` aliased to the UNION ALL of its hot and archive tables."""
+    hot, cold = model.__table__, ARCHIVES[model].__table__
+    rows = select(*hot.c).union_all(select(*(cold.c[column.name] for column in hot.c)))
+    return aliased(model, rows.subquery(f'{hot.name}_all'))
+
+
+def source(model, user_id, since=None):
+    """What to select a user's `model` rows from: the hot table, or with the archive when the range needs it."""
+    return including(model) if reaches(user_id, since) else model
+
+
+def _move(model, ids):
+    """Copy the rows to the archive and delete them from the hot table."""
+    hot = model.__table__
+    names = [column.name for column in hot.c]
+    db.session.execute(insert(ARCHIVES[model]).from_select(names, select(*hot.c).where(model.id.in_(ids))))
+    db.session.execute(delete(model).where(model.id.in_(ids)))
+
+
+def run(after_days, batch_size=1000, user_id=None, today=None, progress=None):
+    """
+    Move raw entries dated more than `after_days` ago into the archive
+    tables, one user and `batch_size` rows at a time, committing after each
+    batch so no transaction holds its locks for long. The daily_log rollup
+    and the search index keep covering archived rows, so nothing derived
+    from them changes. Returns the rows moved per table;
+    `progress(user_id, table, moved)` is called after each batch.
+    """
+    today = today or date.today()
+    cutoff = today - timedelta(days=after_days)
+    user_ids = [user_id] if user_id is not None else db.session.execute(
+        select(User.id).order_by(User.id)
+    ).scalars().all()
+
+    moved = {model.__tablename__: 0 for model in ARCHIVES}
+    for uid in user_ids:
+        for model in ARCHIVES:
+            while True:
+                ids = db.session.execute(
+                    select(model.id).where(model.user_id == uid, model.date < cutoff).limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                user = db.session.get(User, uid)
+                if user.archived_before is None or user.archived_before < cutoff:
+                    # in the same commit as the rows, so readers never miss them
+                    user.archived_before = cutoff
+                _move(model, ids)
+                db.session.commit()
+                moved[model.__tablename__] += len(ids)
+                if progress:
+                    progress(uid, model.__tablename__, len(ids))
+                if len(ids) < batch_size:
+                    break
+    return moved
@@ -0,0 +1,117 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """In-process LRU store with per-entry TTL. Only consistent within one worker."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Shared store so every worker sees the same entries and invalidations."""
+
+    def __init__(self, url, prefix='lifelens:'):
+        # Optional dependency: only needed when the shared backend is configured
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+BACKENDS = {
+    'memory': lambda app: MemoryBackend(app.config['SUMMARY_CACHE_MAX_ENTRIES']),
+    'redis': lambda app: RedisBackend(app.config['SUMMARY_CACHE_URL']),
+}
+
+
+class SummaryCache:
+    """
+    Per-user cache of computed page summaries.
+
+    Entries are keyed by user, summary name and date window, and by the
+    user's data_version from the database. Every write bumps that version,
+    so each worker misses on its next read (whichever worker handled the
+    write) and stale entries simply age out of the backend.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SUMMARY_CACHE_BACKEND', 'memory')
+        app.config.setdefault('SUMMARY_CACHE_URL', None)
+        app.config.setdefault('SUMMARY_CACHE_TTL', 300)
+        app.config.setdefault('SUMMARY_CACHE_MAX_ENTRIES', 1024)
+
+        backend = app.config['SUMMARY_CACHE_BACKEND']
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown SUMMARY_CACHE_BACKEND: {backend!r}")
+        self.backend = BACKENDS[backend](app)
+        self.ttl = app.config['SUMMARY_CACHE_TTL']
+        app.extensions['summary_cache'] = self
+
+    def _key(self, user, name, window):
+        return f"{name}:{user.id}:{user.data_version or 0}:{window}"
+
+    def get_or_compute(self, user, name, window, compute):
+        """Return `user`'s cached summary, computing and storing it on a miss."""
+        key = self._key(user, name, window)
+        value = self.backend.get(key)
+        if value is None:
+            value = compute()
+            self.backend.set(key, value, self.ttl)
+        return value
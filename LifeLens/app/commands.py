@@ -0,0 +1,394 @@
+import os
+import statistics
+import subprocess
+import sys
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from .models import db, User, Habit
+
+
+rollup_cli = AppGroup('rollup', help='Maintain the daily_log rollup table.')
+
+
+@rollup_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def rollup_rebuild(user_id):
+    """Backfill or repair daily_log from the raw entries."""
+    from . import rollup, wellness_stats
+
+    written = rollup.rebuild(user_id)
+    # the running sums are derived from the rollup, so they follow it
+    wellness_stats.rebuild(user_id)
+    # drops cached summaries (and ETags) computed from the old rollup
+    User.mark_all_changed([user_id] if user_id is not None else None)
+    db.session.commit()
+    click.echo(f"Rebuilt {written} daily rollup row(s).")
+
+
+habits_cli = AppGroup('habits', help='Maintain habit streak counters.')
+
+
+@habits_cli.command('repair-streaks')
+@click.option('--user-id', type=int, default=None, help='Only repair this user.')
+def habits_repair_streaks(user_id):
+    """Recompute current/longest streaks from habit_log."""
+    from . import streaks
+
+    query = Habit.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    habits = query.all()
+    streaks.repair(habits)
+    User.mark_all_changed({h.user_id for h in habits})
+    db.session.commit()
+    click.echo(f"Repaired streaks for {len(habits)} habit(s).")
+
+
+@habits_cli.command('rebuild-calendars')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def habits_rebuild_calendars(user_id):
+    """Rebuild the per-year completion bitmaps from habit_log."""
+    from . import habit_calendar
+
+    written = habit_calendar.rebuild(user_id)
+    db.session.commit()
+    click.echo(f"Rebuilt {written} habit calendar year(s).")
+
+
+@habits_cli.command('rollover')
+def habits_rollover():
+    """Reset streaks broken by a missed day (run daily, e.g. from cron)."""
+    from . import streaks
+
+    reset = streaks.roll_over()
+    db.session.commit()
+    click.echo(f"Reset {reset} broken streak(s).")
+
+
+wellness_cli = AppGroup('wellness', help='Maintain the wellness model statistics.')
+
+
+@wellness_cli.command('rebuild-stats')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def wellness_rebuild_stats(user_id):
+    """Recompute the running correlation/regression sums from daily_log.
+
+    `flask rollup rebuild` does this too, after rebuilding from the raw entries.
+    """
+    from . import wellness_stats
+
+    written = wellness_stats.rebuild(user_id)
+    db.session.commit()
+    click.echo(f"Rebuilt wellness statistics for {written} user(s).")
+
+
+jobs_cli = AppGroup('jobs', help='Run and maintain background jobs.')
+
+
+@jobs_cli.command('work')
+@click.option('--once', is_flag=True, help='Drain the queue once and exit.')
+@click.option('--poll', default=1.0, show_default=True, help='Seconds to sleep when the queue is empty.')
+@click.option('--stale-after', default=600, show_default=True,
+              help='Requeue jobs left running this many seconds by a dead worker.')
+def jobs_work(once, poll, stale_after):
+    """Process queued jobs (use with JOBS_MODE=worker)."""
+    import time
+    from datetime import timedelta
+    from . import jobs
+
+    while True:
+        requeued = jobs.requeue_stale(timedelta(seconds=stale_after))
+        db.session.commit()
+        if requeued:
+            click.echo(f"Requeued {requeued} stale job(s).")
+        ran = jobs.drain()
+        if ran:
+            click.echo(f"Ran {ran} job(s).")
+        if once:
+            break
+        if not ran:
+            time.sleep(poll)
+
+
+@jobs_cli.command('prune')
+@click.option('--days', default=7, show_default=True, help='Keep finished jobs this many days.')
+def jobs_prune(days):
+    """Delete finished jobs older than --days."""
+    from datetime import timedelta
+    from . import jobs
+
+    deleted = jobs.prune(timedelta(days=days))
+    db.session.commit()
+    click.echo(f"Deleted {deleted} finished job(s).")
+
+
+recommendations_cli = AppGroup('recommendations', help='Generate AI recommendations ahead of time.')
+
+
+@recommendations_cli.command('precompute')
+@click.option('--active-days', type=click.IntRange(min=1), default=7, show_default=True,
+              help='Include users with entries in this many days.')
+@click.option('--concurrency', type=click.IntRange(min=1), default=4, show_default=True,
+              help='LLM calls in flight at once.')
+@click.option('--rpm', type=click.IntRange(min=1), default=30, show_default=True,
+              help='LLM requests per minute (token bucket).')
+@click.option('--limit', type=click.IntRange(min=0), default=None, help='Generate for at most this many users.')
+@click.option('--resume', is_flag=True, help="Continue today's interrupted run and its report.")
+@click.option('--dry-run', is_flag=True, help='Use the offline fake client and write nothing.')
+@click.option('--fake-delay', type=click.FloatRange(min=0), default=0.0,
+              help='Seconds each fake completion takes (with --dry-run).')
+def recommendations_precompute(active_days, concurrency, rpm, limit, resume, dry_run, fake_delay):
+    """Fill the recommendation cache for recently active users (run nightly)."""
+    from . import llm
+    from .precompute import precompute
+
+    def progress(report):
+        finished = report['generated'] + report['failed']
+        if finished % 10 == 0:
+            click.echo(f"  {finished} generated or failed, {report['tokens']} tokens so far")
+
+    report = precompute(
+        active_days=active_days, concurrency=concurrency, rpm=rpm, limit=limit,
+        dry_run=dry_run, resume=resume, progress=progress,
+        client=llm.FakeClient(fake_delay) if dry_run else None
+    )
+
+    click.echo(f"{'Dry run' if dry_run else 'Run'} for {report['day']}: {report['users_total']} active user(s)")
+    click.echo(f"  generated {report['generated']}, skipped {report['skipped']} (already cached), "
+               f"failed {report['failed']}")
+    click.echo(f"  tokens used {report['tokens']}, {report['elapsed']:.1f}s, "
+               f"{report['users_per_minute'] or 0} users/min")
+    for error in report['errors']:
+        click.echo(f"  user {error['user_id']}: {error['error']}")
+
+
+search_cli = AppGroup('search', help='Maintain the full-text search index.')
+
+
+@search_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user.')
+def search_rebuild(user_id):
+    """Re-index activity, mood and meal text (run once after upgrading)."""
+    from . import search
+
+    indexed = search.rebuild(user_id)
+    db.session.commit()
+    click.echo(f"Indexed {indexed} entr{'y' if indexed == 1 else 'ies'}.")
+
+
+archive_cli = AppGroup('archive', help='Move old entries out of the hot tables.')
+
+
+@archive_cli.command('run')
+@click.option('--after-days', type=int, default=None,
+              help='Archive entries older than this many days (default ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, default=None, help='Rows moved per commit (default ARCHIVE_BATCH_SIZE).')
+@click.option('--user-id', type=int, default=None, help='Only archive this user.')
+def archive_run(after_days, batch_size, user_id):
+    """Move old activity, mood, meal and habit log rows to the archive tables (run nightly)."""
+    from . import archive
+
+    if after_days is None:
+        after_days = current_app.config['ARCHIVE_AFTER_DAYS']
+    moved = archive.run(
+        after_days, batch_size or current_app.config['ARCHIVE_BATCH_SIZE'], user_id=user_id
+    )
+    click.echo(f"Archived entries older than {after_days} days:")
+    for table, count in moved.items():
+        click.echo(f"  {table}: {count} row(s)")
+
+
+replicas_cli = AppGroup('replicas', help='Read replica heartbeat and lag.')
+
+
+@replicas_cli.command('heartbeat')
+@click.option('--every', default=1.0, show_default=True, help='Seconds between beats.')
+@click.option('--once', is_flag=True, help='Beat once and exit (e.g. from cron).')
+def replicas_heartbeat(every, once):
+    """Keep stamping the primary's heartbeat row; replicas' lag is measured against it."""
+    import time
+    from datetime import datetime
+    from .models import ReplicaHeartbeat
+
+    while True:
+        beat = db.session.get(ReplicaHeartbeat, 1)
+        if beat is None:
+            beat = ReplicaHeartbeat(id=1)
+            db.session.add(beat)
+        beat.beat_at = datetime.utcnow()
+        db.session.commit()
+        if once:
+            break
+        time.sleep(every)
+
+
+@replicas_cli.command('status')
+def replicas_status():
+    """Show how far each configured replica trails the primary."""
+    from . import replica_router
+
+    if not replica_router.keys:
+        click.echo("No replicas configured (set REPLICA_URLS).")
+        return
+    for key, lag in replica_router.status().items():
+        if lag is None:
+            state = "unavailable (unreachable, or no heartbeat yet)"
+        else:
+            state = f"{lag:.1f}s behind" + (" - too far, not used" if lag > replica_router.max_lag else "")
+        click.echo(f"{key} ({db.engines[key].url.render_as_string()}): {state}")
+
+
+import_cli = AppGroup('import', help='Bulk-import entry history.')
+
+
+@import_cli.command('history')
+@click.argument('kind', type=click.Choice(['activity', 'mood', 'nutrition']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'username', required=True, help='Username to import the entries for.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None,
+              help='File format (default: from the file extension).')
+@click.option('--batch-size', type=int, default=None, help='Rows per INSERT and commit (default IMPORT_BATCH_SIZE).')
+def import_history(kind, path, username, fmt, batch_size):
+    """Import a CSV or JSON Lines export of activity, mood or nutrition entries."""
+    from . import importer
+
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username!r}.")
+    if fmt is None:
+        fmt = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+    def progress(report):
+        click.echo(f"  batch {report['batches']}: {report['imported']} imported, {report['failed']} failed")
+
+    with open(path, 'rb') as stream:
+        try:
+            report = importer.import_entries(
+                user, kind, stream, fmt,
+                batch_size=batch_size or current_app.config['IMPORT_BATCH_SIZE'], progress=progress
+            )
+        except importer.ImportRejected as e:
+            raise click.ClickException(str(e))
+
+    click.echo(f"Imported {report['imported']} of {report['rows']} {kind} row(s); {report['failed']} failed.")
+    for error in report['errors']:
+        click.echo(f"  line {error['line']}: {error['error']}")
+
+
+llm_cli = AppGroup('llm', help='LLM client utilities.')
+
+
+@llm_cli.command('fake-server')
+@click.option('--port', default=8765, show_default=True)
+@click.option('--delay', default=0.0, help='Seconds each completion takes.')
+@click.option('--fail-rate', default=0.0, help='Share of calls answered with a 503.')
+def llm_fake_server(port, delay, fail_rate):
+    """Serve fake completions locally; point GROQ_BASE_URL at it."""
+    from werkzeug.serving import run_simple
+    from . import llm
+
+    click.echo(f"Set GROQ_BASE_URL=http://127.0.0.1:{port} to use it.")
+    run_simple('127.0.0.1', port, llm.fake_server(llm.FakeClient(delay, fail_rate)), threaded=True)
+
+
+STARTUP_PROBE = """
+import sys, time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(time.perf_counter() - start, ' '.join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+HEAVY_MODULES = ('sklearn', 'groq', 'scipy')
+
+
+@click.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='Fresh interpreters to time.')
+@click.option('--max-seconds', type=float, default=None,
+              help='Exit non-zero if the median create_app() time exceeds this.')
+@click.option('--top', default=0, help='Also list the N slowest imports (python -X importtime).')
+def bench_startup(runs, max_seconds, top):
+    """Time importing the app and running create_app() in fresh processes."""
+    root = os.path.dirname(current_app.root_path)
+    probe = STARTUP_PROBE.format(heavy=HEAVY_MODULES)
+    env = dict(os.environ, WARM_UP='')
+
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', probe], cwd=root, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        elapsed, *loaded = out.split()
+        timings.append(float(elapsed))
+
+    median = statistics.median(timings)
+    click.echo(f"create_app(): median {median * 1000:.0f} ms, "
+               f"min {min(timings) * 1000:.0f} ms over {runs} run(s)")
+    click.echo(f"Heavy modules loaded at startup: {', '.join(loaded) or 'none'}")
+
+    if top:
+        stderr = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', probe], cwd=root, env=env,
+            capture_output=True, text=True, check=True
+        ).stderr
+        imports = []
+        for line in stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parts = line.split('|')
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                imports.append((int(parts[1]), parts[2].strip()))
+        for cumulative, name in sorted(imports, reverse=True)[:top]:
+            click.echo(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    if max_seconds is not None and median > max_seconds:
+        raise click.ClickException(f"startup median {median:.3f}s exceeds {max_seconds:.3f}s")
+
+
+@click.command('check-query-plans')
+@click.option('--user-id', type=int, default=None,
+              help='Request the pages as this user (default: the one with the most history).')
+@click.option('--verbose', '-v', is_flag=True, help='Print every query and its plan.')
+@with_appcontext
+def check_query_plans(user_id, verbose):
+    """EXPLAIN the queries behind each page and fail on full table scans.
+
+    Run it against a database seeded with realistic volumes: on tiny
+    tables the planner may prefer a scan even where an index exists.
+    """
+    from . import query_plans
+
+    user_id = user_id or query_plans.busiest_user()
+    if user_id is None:
+        raise click.ClickException("No user with any data to query as.")
+
+    try:
+        report = query_plans.check(current_app._get_current_object(), user_id)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    failures = [entry for entry in report if entry[3]]
+    for path, statement, plan, scanned in report:
+        if verbose or scanned:
+            click.echo(f"{'FULL SCAN of ' + ', '.join(scanned) if scanned else 'ok'}  ({path})")
+            click.echo('  ' + ' '.join(statement.split()))
+            for line in plan:
+                click.echo(f"    {line}")
+    click.echo(f"Checked {len(report)} distinct queries; {len(failures)} full table scan(s).")
+    if failures:
+        raise click.ClickException("query plan regression")
+
+
+def register_commands(app):
+    app.cli.add_command(rollup_cli)
+    app.cli.add_command(habits_cli)
+    app.cli.add_command(wellness_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(recommendations_cli)
+    app.cli.add_command(import_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(replicas_cli)
+    app.cli.add_command(llm_cli)
+    app.cli.add_command(bench_startup)
+    app.cli.add_command(check_query_plans)
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+import numpy as np
+from flask import g, has_request_context
+from sqlalchemy import func, select
+from .models import db, DailyLog
+from .rollup import as_date
+
+
+FEATURES = (
+    'activity_count', 'calories_out',
+    'meal_count', 'calories_in', 'water', 'protein', 'carbs', 'fat',
+    'mood_count', 'mood_total', 'first_mood_score',
+    'habits_completed',
+)
+
+
+class UserWeekFeatures:
+    """
+    One user's per-day feature matrix for the `days` days ending `today`:
+    row i is `start + i` days, one column per name in FEATURES, 0 where
+    nothing was logged. Rows dated after `today` are summed into `after`
+    so totals that count "since start" still can.
+
+    Built from a single range query over the daily rollup and memoized on
+    flask.g, so every consumer in a request shares it.
+    """
+
+    def __init__(self, user_id, today, matrix, after):
+        self.user_id = user_id
+        self.today = today
+        self.matrix = matrix
+        self.after = after
+        self.days = len(matrix)
+        self.start = today - timedelta(days=self.days - 1)
+
+    def __getitem__(self, name):
+        return self.matrix[:, FEATURES.index(name)]
+
+    @property
+    def dates(self):
+        return [self.start + timedelta(days=i) for i in range(self.days)]
+
+    # The series the wellness model is fitted on
+    @property
+    def activities(self):
+        return self['activity_count']
+
+    @property
+    def calories(self):
+        return self['calories_out']
+
+    @property
+    def mood(self):
+        return self['first_mood_score']
+
+    def total(self, name):
+        """Sum of a feature from `start` onwards, including days after `today`."""
+        return int(self[name].sum()) + self.after[name]
+
+    def window(self, days):
+        """The last `days` days of this matrix, without another query."""
+        if days > self.days:
+            raise ValueError(f"only {self.days} day(s) loaded")
+        return UserWeekFeatures(self.user_id, self.today, self.matrix[self.days - days:], self.after)
+
+    @classmethod
+    def load(cls, user_id, today=None, days=7):
+        today = today or date.today()
+        start = today - timedelta(days=days - 1)
+        rows = db.session.execute(
+            select(DailyLog.date, *(func.coalesce(getattr(DailyLog, name), 0) for name in FEATURES))
+            .where(DailyLog.user_id == user_id, DailyLog.date >= start)
+        ).all()
+
+        offsets = np.array([(as_date(row[0]) - start).days for row in rows], dtype=np.int64)
+        values = np.array([row[1:] for row in rows], dtype=np.int64).reshape(len(rows), len(FEATURES))
+        inside = offsets < days
+
+        matrix = np.zeros((days, len(FEATURES)), dtype=np.int64)
+        np.add.at(matrix, offsets[inside], values[inside])
+        after = dict(zip(FEATURES, values[~inside].sum(axis=0).tolist()))
+        return cls(user_id, today, matrix, after)
+
+    @classmethod
+    def get(cls, user_id, today=None, days=7):
+        """
+        Features for the request, loading them at most once: a later call for
+        the same or a shorter window is sliced from the matrix already held.
+        """
+        today = today or date.today()
+        if not has_request_context():
+            return cls.load(user_id, today, days)
+
+        memo = g.setdefault('user_week_features', {})
+        features = memo.get((user_id, today))
+        if features is None or features.days < days:
+            features = memo[(user_id, today)] = cls.load(user_id, today, days)
+        return features if features.days == days else features.window(days)
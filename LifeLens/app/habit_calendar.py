@@ -0,0 +1,138 @@
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import select
+from .models import db, Habit, HabitLog, HabitCalendar
+from .rollup import as_date
+from . import archive
+
+
+YEAR_BYTES = 46  # 366 bits
+
+
+def _empty():
+    return bytes(YEAR_BYTES)
+
+
+def _year_index(day):
+    return day.timetuple().tm_yday - 1
+
+
+def set_day(habit_id, day, completed):
+    """Set or clear the bit for `day` in the habit's calendar for that year."""
+    day = as_date(day)
+    row = HabitCalendar.query.filter_by(habit_id=habit_id, year=day.year).first()
+    if row is None:
+        row = HabitCalendar(habit_id=habit_id, year=day.year, bits=_empty())
+        db.session.add(row)
+
+    bits = bytearray(row.bits)
+    i = _year_index(day)
+    if completed:
+        bits[i >> 3] |= 1 << (i & 7)
+    else:
+        bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+    row.bits = bytes(bits)
+    return row
+
+
+def forget(habit_id):
+    HabitCalendar.query.filter_by(habit_id=habit_id).delete(synchronize_session=False)
+
+
+def rebuild(user_id=None):
+    """Rebuild calendars from habit_log for one user's habits or everyone's."""
+    habit_ids = select(Habit.id)
+    if user_id is not None:
+        habit_ids = habit_ids.where(Habit.user_id == user_id)
+    HabitCalendar.query.filter(HabitCalendar.habit_id.in_(habit_ids)).delete(synchronize_session=False)
+
+    years = {}
+    logs = archive.including(HabitLog)
+    for habit_id, day in db.session.execute(
+        select(logs.habit_id, logs.date)
+        .where(logs.habit_id.in_(habit_ids), logs.is_completed.is_(True))
+    ):
+        day = as_date(day)
+        bits = years.setdefault((habit_id, day.year), np.zeros(YEAR_BYTES * 8, dtype=bool))
+        bits[_year_index(day)] = True
+
+    db.session.add_all(
+        HabitCalendar(habit_id=habit_id, year=year, bits=np.packbits(bits, bitorder='little').tobytes())
+        for (habit_id, year), bits in years.items()
+    )
+    return len(years)
+
+
+def completion_array(habit_id, start, end):
+    """Boolean array with one entry per day from `start` to `end` inclusive."""
+    rows = {
+        row.year: row.bits
+        for row in HabitCalendar.query.filter(
+            HabitCalendar.habit_id == habit_id,
+            HabitCalendar.year >= start.year,
+            HabitCalendar.year <= end.year
+        )
+    }
+    parts = []
+    for year in range(start.year, end.year + 1):
+        bits = np.unpackbits(np.frombuffer(rows.get(year, _empty()), dtype=np.uint8), bitorder='little')
+        first = _year_index(start) if year == start.year else 0
+        last = _year_index(end) if year == end.year else _year_index(date(year, 12, 31))
+        parts.append(bits[first:last + 1])
+    return np.concatenate(parts).astype(bool)
+
+
+def _runs(done):
+    """(start, length) of every run of completed days."""
+    padded = np.concatenate(([0], done.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return edges[::2], edges[1::2] - edges[::2]
+
+
+def current_streak(done):
+    """Run of completed days ending on the last or second-to-last day."""
+    starts, lengths = _runs(done)
+    if not len(starts):
+        return 0
+    end = starts[-1] + lengths[-1]
+    return int(lengths[-1]) if end >= len(done) - 1 else 0
+
+
+def longest_streak(done):
+    _, lengths = _runs(done)
+    return int(lengths.max()) if len(lengths) else 0
+
+
+def period_counts(done, start, period='week'):
+    """Completed days per calendar week (Monday-based) or month."""
+    if not len(done):
+        return []
+    days = np.datetime64(start, 'D') + np.arange(len(done))
+    if period == 'month':
+        months = days.astype('datetime64[M]')
+        boundaries = np.flatnonzero(months[1:] != months[:-1]) + 1
+    else:
+        # 1970-01-01 was a Thursday, so Mondays are where (days + 3) % 7 == 0
+        boundaries = np.flatnonzero((days.astype(np.int64) + 3) % 7 == 0)
+        boundaries = boundaries[boundaries > 0]
+    indices = np.concatenate(([0], boundaries))
+    return np.add.reduceat(done.astype(np.int32), indices).tolist()
+
+
+def heatmap(habit_id, days=365, today=None):
+    """Completion calendar and vectorized stats for the last `days` days."""
+    today = today or date.today()
+    start = today - timedelta(days=days - 1)
+    done = completion_array(habit_id, start, today)
+    return {
+        "habit_id": habit_id,
+        "start": start.isoformat(),
+        "end": today.isoformat(),
+        "days": done.astype(int).tolist(),
+        "completed_days": int(done.sum()),
+        "completion_rate": round(float(done.mean()) * 100, 1) if len(done) else 0,
+        "current_streak": current_streak(done),
+        "longest_streak": longest_streak(done),
+        "weekly_counts": period_counts(done, start, 'week'),
+        "monthly_counts": period_counts(done, start, 'month')
+    }
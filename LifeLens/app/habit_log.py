@@ -0,0 +1,89 @@
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from .models import db, Habit, HabitLog, DailyLog
+from .upsert import insert_for
+
+
+def toggle(habit, day):
+    """
+    Flip the habit's completion for `day` with one INSERT ... ON CONFLICT /
+    ON DUPLICATE KEY UPDATE against uq_habit_log_habit_date, so double
+    clicks and parallel tabs can't create a second row for the day.
+    Returns the day's new is_completed. The caller commits.
+    """
+    # completed_count first: MySQL applies the assignments in order and the
+    # later ones see the earlier results
+    flipped = [
+        ('completed_count', case(
+            (HabitLog.is_completed.is_(True), case((HabitLog.completed_count > 0, HabitLog.completed_count - 1), else_=0)),
+            else_=func.coalesce(HabitLog.completed_count, 0) + 1
+        )),
+        ('is_completed', case((HabitLog.is_completed.is_(True), False), else_=True)),
+    ]
+    dialect = db.session.get_bind().dialect
+    insert = insert_for(dialect)
+    if insert is None:
+        return _toggle_portable(habit, day, flipped)
+
+    stmt = insert(HabitLog).values(
+        habit_id=habit.id, user_id=habit.user_id, date=day,
+        completed_count=1, is_completed=True
+    )
+    if dialect.name == 'mysql':
+        stmt = stmt.on_duplicate_key_update(flipped)
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[HabitLog.habit_id, HabitLog.date],
+            set_=dict(flipped)
+        )
+
+    if dialect.insert_returning and dialect.name != 'mysql':
+        return bool(db.session.execute(stmt.returning(HabitLog.is_completed)).scalar_one())
+    db.session.execute(stmt)
+    return _is_completed(habit, day)
+
+
+def _toggle_portable(habit, day, flipped):
+    """
+    toggle() where the dialect has no upsert: the day's row is flipped with
+    an UPDATE, and only when there is none yet is it INSERTed in a
+    savepoint. If a concurrent request inserts it first, ours fails and the
+    UPDATE runs again.
+    """
+    flip = update(HabitLog).where(HabitLog.habit_id == habit.id, HabitLog.date == day).values(dict(flipped))
+    # the UPDATE comes first so the transaction already holds its write lock
+    # (pysqlite only BEGINs before DML, and would otherwise commit the
+    # savepoint's INSERT as soon as it is released)
+    if db.session.execute(flip).rowcount:
+        return _is_completed(habit, day)
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(HabitLog).values(
+                habit_id=habit.id, user_id=habit.user_id, date=day,
+                completed_count=1, is_completed=True
+            ))
+        return True
+    except IntegrityError:
+        db.session.execute(flip)
+    return _is_completed(habit, day)
+
+
+def _is_completed(habit, day):
+    # the write holds the row lock until commit, so this reads our own write
+    return bool(db.session.execute(
+        select(HabitLog.is_completed).where(HabitLog.habit_id == habit.id, HabitLog.date == day)
+    ).scalar_one())
+
+
+def day_counts(user_id, day):
+    """
+    (total_habits, completed_on_day) for the toggle response, with the
+    completions read from the daily rollup rather than counted from
+    habit_log.
+    """
+    total = select(func.count(Habit.id)).where(Habit.user_id == user_id).scalar_subquery()
+    completed = select(DailyLog.habits_completed).where(
+        DailyLog.user_id == user_id, DailyLog.date == day
+    ).scalar_subquery()
+    row = db.session.execute(select(total, completed)).one()
+    return row[0] or 0, row[1] or 0
@@ -0,0 +1,59 @@
+from datetime import date
+from sqlalchemy import and_, or_, select
+from .models import db, Activity, Mood, Nutrition
+from .rollup import as_date
+from . import archive
+
+
+PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+
+# kind -> (model, the columns its history list shows)
+LISTINGS = {
+    'activity': (Activity, ('id', 'title', 'category', 'intensity', 'duration', 'calories', 'date', 'notes')),
+    'mood': (Mood, ('id', 'mood_type', 'mood_score', 'energy_score', 'stress_score', 'date', 'notes')),
+    'nutrition': (Nutrition, (
+        'id', 'meal_type', 'food_items', 'calories', 'protein', 'carbs', 'fat', 'water', 'date', 'notes'
+    )),
+}
+
+
+def encode_cursor(day, entry_id):
+    return f"{as_date(day).isoformat()}.{entry_id}"
+
+
+def decode_cursor(cursor):
+    """(date, id) from a cursor made by encode_cursor; ValueError if it's malformed."""
+    day, _, entry_id = cursor.partition('.')
+    return date.fromisoformat(day), int(entry_id)
+
+
+def _seek(model, columns, user_id, after, limit):
+    stmt = select(*(getattr(model, name) for name in columns)).where(model.user_id == user_id)
+    if after is not None:
+        day, entry_id = decode_cursor(after)
+        stmt = stmt.where(or_(model.date < day, and_(model.date == day, model.id < entry_id)))
+    return db.session.execute(stmt.order_by(model.date.desc(), model.id.desc()).limit(limit)).all()
+
+
+def page(kind, user_id, after=None, limit=PAGE_SIZE):
+    """
+    One page of a user's entries, newest first, as plain dicts of the
+    listed columns plus `archived`. Pages are keyed on (date, id) rather
+    than an offset, so every page costs the same index seek however far
+    back it is. Returns (items, cursor for the next page or None).
+    """
+    model, columns = LISTINGS[kind]
+    rows = [(row, False) for row in _seek(model, columns, user_id, after, limit + 1)]
+
+    # Archived rows all predate the user's boundary, so they only belong on
+    # this page if it runs out of (or past) hot rows before reaching it
+    before = archive.boundary(user_id)
+    if before is not None and (len(rows) <= limit or as_date(rows[-1][0].date) < before):
+        cold = archive.ARCHIVES[model]
+        rows += [(row, True) for row in _seek(cold, columns, user_id, after, limit + 1)]
+        rows.sort(key=lambda entry: (as_date(entry[0].date), entry[0].id), reverse=True)
+
+    items = [dict(row._asdict(), archived=archived) for row, archived in rows[:limit]]
+    cursor = encode_cursor(items[-1]['date'], items[-1]['id']) if len(rows) > limit else None
+    return items, cursor
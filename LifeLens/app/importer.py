@@ -0,0 +1,265 @@
+import csv
+import io
+import json
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from .models import db, Activity, Mood, Nutrition
+from . import rollup, search, wellness_stats
+
+
+FORMATS = ('csv', 'jsonl')
+
+# How many row errors a report keeps verbatim
+ERROR_SAMPLE = 100
+
+
+# field converters: each takes the raw value and returns the stored one or raises ValueError
+
+def _text(limit=None):
+    def convert(value):
+        # a JSON number, object or list would otherwise be stored as its repr
+        if not isinstance(value, str):
+            raise ValueError("must be a string")
+        if _undecodable(value):
+            # a JSON "\udcXX" escape: not text the database can store
+            raise ValueError("not valid Unicode")
+        value = value.strip()
+        if not value:
+            raise ValueError("required")
+        if limit is not None and len(value) > limit:
+            raise ValueError(f"longer than {limit} characters")
+        return value
+    return convert
+
+
+def _count(value):
+    number = int(str(value).strip())
+    if number < 0:
+        raise ValueError("negative")
+    return number
+
+
+def _score(value):
+    number = int(str(value).strip())
+    if not 1 <= number <= 10:
+        raise ValueError("must be between 1 and 10")
+    return number
+
+
+def _day(value):
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date()
+
+
+def _choice(*options):
+    def convert(value):
+        value = str(value).strip()
+        if value.lower() not in (o.lower() for o in options):
+            raise ValueError(f"must be one of {', '.join(options)}")
+        return next(o for o in options if o.lower() == value.lower())
+    return convert
+
+
+# kind -> (model, {field: converter}, optional fields)
+KINDS = {
+    'activity': (Activity, {
+        'title': _text(100),
+        'category': _choice('Exercise', 'Social', 'Work', 'Hobby', 'Rest'),
+        'duration': _count,
+        'calories': _count,
+        'intensity': _choice('low', 'medium', 'high'),
+        'date': _day,
+        'notes': _text(),
+    }, ('notes',)),
+    'mood': (Mood, {
+        'mood_type': _text(50),
+        'mood_score': _score,
+        'energy_score': _score,
+        'stress_score': _score,
+        'date': _day,
+        'notes': _text(),
+    }, ('notes',)),
+    'nutrition': (Nutrition, {
+        'meal_type': _choice('breakfast', 'lunch', 'dinner', 'snack'),
+        'food_items': _text(),
+        'calories': _count,
+        'protein': _count,
+        'carbs': _count,
+        'fat': _count,
+        'water': _count,
+        'date': _day,
+        'notes': _text(),
+    }, ('notes',)),
+}
+
+
+class ImportRejected(ValueError):
+    """The upload as a whole can't be imported (bad kind, format or header)."""
+
+
+def _undecodable(*values):
+    """
+    True if any of the strings holds bytes that weren't UTF-8. The stream is
+    decoded with surrogateescape, which keeps them as lone surrogates.
+    """
+    for value in values:
+        if isinstance(value, list):
+            if _undecodable(*value):
+                return True
+        elif isinstance(value, str):
+            try:
+                value.encode('utf-8')
+            except UnicodeEncodeError:
+                return True
+    return False
+
+
+NOT_UTF8 = "not UTF-8 text"
+
+
+def read_rows(stream, fmt, required=()):
+    """
+    Yield (line, record) from a binary stream one record at a time, where
+    record is a dict or, for a line that can't be parsed or decoded, an
+    error string. A CSV header that isn't UTF-8 or is missing any of the
+    `required` columns is rejected outright.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='surrogateescape', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        try:
+            fieldnames = reader.fieldnames or ()
+        except csv.Error as e:
+            raise ImportRejected(f"unreadable CSV header: {e}")
+        if _undecodable(*fieldnames):
+            raise ImportRejected(f"CSV header is {NOT_UTF8}; save the file as UTF-8")
+        missing = [name for name in required if name not in fieldnames]
+        if missing:
+            raise ImportRejected(f"CSV header is missing {', '.join(missing)}")
+        line = reader.line_num
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # the reader drops the bad record and carries on after it
+                line += 1
+                yield line, f"unreadable CSV: {e}"
+                continue
+            line = reader.line_num
+            yield line, NOT_UTF8 if _undecodable(*record.values()) else record
+    elif fmt == 'jsonl':
+        for line, raw in enumerate(text, 1):
+            if not raw.strip():
+                continue
+            if _undecodable(raw):
+                yield line, NOT_UTF8
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError as e:
+                yield line, f"invalid JSON: {e}"
+                continue
+            yield line, record if isinstance(record, dict) else "expected a JSON object"
+    else:
+        raise ImportRejected(f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+def validate(kind, record):
+    """Convert one record to column values, or raise ValueError naming the bad fields."""
+    _, fields, optional = KINDS[kind]
+    values, problems = {}, []
+    for name, convert in fields.items():
+        raw = record.get(name)
+        if raw is None or str(raw).strip() == '':
+            if name in optional:
+                values[name] = None
+            else:
+                problems.append(f"{name}: required")
+            continue
+        try:
+            values[name] = convert(raw)
+        except (TypeError, ValueError) as e:
+            problems.append(f"{name}: {e}")
+    if problems:
+        raise ValueError("; ".join(problems))
+    return values
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _insert(user, kind, model, valid, batch, report):
+    """Insert one batch and refresh what's derived from it, all in one transaction."""
+    try:
+        last_id = db.session.execute(select(func.max(model.id)).where(model.user_id == user.id)).scalar()
+        db.session.execute(insert(model), valid)
+        search.index(kind, user.id, after_id=last_id or 0)
+        rollup.rebuild(user.id, days=sorted({values['date'] for values in valid}))
+        wellness_stats.rebuild(user.id)
+        user.mark_data_changed()
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        report["failed"] += len(valid)
+        if len(report["errors"]) < ERROR_SAMPLE:
+            report["errors"].append({
+                "line": f"{batch[0][0]}-{batch[-1][0]}", "error": f"batch rejected: {type(e).__name__}"
+            })
+    else:
+        report["imported"] += len(valid)
+
+
+def import_entries(user, kind, stream, fmt='csv', batch_size=500, progress=None):
+    """
+    Stream `kind` entries (activity, mood or nutrition) for `user` from a CSV
+    or JSON Lines file.
+
+    Records are read and validated `batch_size` at a time; each batch's
+    valid rows go in with one executemany INSERT and are committed together
+    with their search index entries and the rollup and wellness sums for
+    the days they touched, so derived data is refreshed once per batch
+    rather than once per row. Invalid rows are skipped and reported; a
+    batch the database rejects is rolled back and reported as a whole.
+
+    Returns the report; `progress(report)` is called after each batch.
+    """
+    if kind not in KINDS:
+        raise ImportRejected(f"unknown kind {kind!r} (expected one of {', '.join(KINDS)})")
+    model, fields, optional = KINDS[kind]
+    required = [name for name in fields if name not in optional]
+    report = {"kind": kind, "format": fmt, "rows": 0, "imported": 0, "failed": 0, "batches": 0, "errors": []}
+
+    def fail(line, error):
+        report["failed"] += 1
+        if len(report["errors"]) < ERROR_SAMPLE:
+            report["errors"].append({"line": line, "error": error})
+
+    for batch in _batches(read_rows(stream, fmt, required), batch_size):
+        valid = []
+        for line, record in batch:
+            report["rows"] += 1
+            if isinstance(record, str):
+                fail(line, record)
+                continue
+            try:
+                values = validate(kind, record)
+            except ValueError as e:
+                fail(line, str(e))
+                continue
+            valid.append(dict(values, user_id=user.id))
+        report["batches"] += 1
+        if valid:
+            _insert(user, kind, model, valid, batch, report)
+        if progress is not None:
+            progress(report)
+
+    return report
@@ -0,0 +1,50 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+
+class JobQueue:
+    """
+    Runs queued jobs off the request. With JOBS_MODE='thread' each web
+    process drains the queue on a small thread pool as jobs are added; with
+    'worker' they are left for `flask jobs work` running elsewhere.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.executor = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('JOBS_MODE', 'thread')
+        app.config.setdefault('JOBS_THREADS', 2)
+        app.config.setdefault('JOBS_STALE_AFTER', 600)
+
+        mode = app.config['JOBS_MODE']
+        if mode not in ('thread', 'worker'):
+            raise ValueError(f"Unknown JOBS_MODE: {mode!r}")
+        self.app = app
+        self.executor = ThreadPoolExecutor(
+            max_workers=app.config['JOBS_THREADS'], thread_name_prefix='lifelens-jobs'
+        ) if mode == 'thread' else None
+        app.extensions['job_queue'] = self
+
+    def kick(self):
+        """Have a pool thread drain the queue; a no-op in worker mode."""
+        if self.executor is not None:
+            self.executor.submit(self._drain)
+
+    def _drain(self):
+        # imported here: this module is loaded by app/__init__.py before the models
+        from . import db
+        from .jobs import drain, requeue_stale
+
+        with self.app.app_context():
+            try:
+                # a restart kills pool threads mid-job; their jobs would stay
+                # 'running' (and block new ones for the same key) for good
+                requeue_stale(timedelta(seconds=self.app.config['JOBS_STALE_AFTER']))
+                db.session.commit()
+                drain()
+            finally:
+                db.session.remove()
@@ -0,0 +1,103 @@
+import json
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, update
+from .models import db, Job
+from .metrics import metrics
+
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+# kind -> handler(job, payload); registered by the modules that enqueue work
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(user_id, kind, key, payload):
+    """
+    Add a job, or return the one already queued or running for the same
+    (user, kind, key) so repeat page views don't pile up duplicate work.
+    The caller commits, then calls `job_queue.kick()` (see job_runner.py).
+    """
+    job = Job.query.filter(
+        Job.user_id == user_id, Job.kind == kind, Job.key == key,
+        Job.status.in_((PENDING, RUNNING))
+    ).first()
+    if job is None:
+        job = Job(user_id=user_id, kind=kind, key=key, payload=json.dumps(payload), status=PENDING)
+        db.session.add(job)
+        metrics.incr(f"jobs.{kind}.enqueued")
+    return job
+
+
+def claim():
+    """
+    Take the oldest pending job. The status flip is a conditional UPDATE, so
+    when several workers race for the same row only one of them gets it.
+    """
+    for job_id in db.session.execute(
+        select(Job.id).where(Job.status == PENDING).order_by(Job.id).limit(5)
+    ).scalars():
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == PENDING)
+            .values(status=RUNNING, started_at=datetime.utcnow(), attempts=Job.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+    return None
+
+
+def run(job):
+    """Run one claimed job and record how it ended."""
+    started = time.monotonic()
+    try:
+        HANDLERS[job.kind](job, json.loads(job.payload))
+        job.status = DONE
+        job.error = None
+    except Exception as e:
+        db.session.rollback()
+        job.status = FAILED
+        job.error = f"{type(e).__name__}: {e}"
+        current_app.logger.exception("job %s failed", job.id)
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+    metrics.incr(f"jobs.{job.kind}.{job.status}")
+    metrics.incr(f"jobs.{job.kind}.ms", int((time.monotonic() - started) * 1000))
+    return job
+
+
+def drain(limit=None):
+    """Run pending jobs until none are left (or `limit` ran). Returns the count."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim()
+        if job is None:
+            break
+        run(job)
+        count += 1
+    return count
+
+
+def requeue_stale(older_than):
+    """Put jobs whose worker died mid-run (`older_than` a timedelta) back in the queue."""
+    cutoff = datetime.utcnow() - older_than
+    return Job.query.filter(Job.status == RUNNING, Job.started_at < cutoff).update(
+        {Job.status: PENDING}, synchronize_session=False
+    )
+
+
+def prune(older_than):
+    """Delete finished jobs older than `older_than`."""
+    cutoff = datetime.utcnow() - older_than
+    return Job.query.filter(Job.status.in_((DONE, FAILED)), Job.finished_at < cutoff).delete(
+        synchronize_session=False
+    )
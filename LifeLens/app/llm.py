@@ -0,0 +1,412 @@
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+from .metrics import metrics
+
+
+_client = None
+_lock = threading.Lock()
+
+
+class LLMError(Exception):
+    """The provider couldn't produce a completion (after any retries)."""
+
+
+class CircuitOpenError(LLMError):
+    """Calls are failing fast because the provider looks unhealthy."""
+
+
+class DeadlineExceeded(LLMError):
+    """The call's overall deadline passed before a completion arrived."""
+
+
+class FakeClient:
+    """
+    Offline stand-in for the Groq client (LLM_BACKEND=fake), for development
+    and tests. Answers every prompt with the same well-formed
+    recommendations after LLM_FAKE_DELAY seconds, streamed in small chunks
+    when asked to. LLM_FAKE_FAIL_RATE makes that share of calls fail with a
+    connection error, and a delay longer than the call's timeout times out.
+    """
+
+    ICONS = {"activity": "fa-running", "mood": "fa-heart", "nutrition": "fa-apple-alt", "habits": "fa-check-circle"}
+
+    def __init__(self, delay=0.0, fail_rate=0.0):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, stream=False, timeout=None, **kwargs):
+        self.calls.append({"model": model, "messages": messages, "stream": stream, **kwargs})
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise ConnectionError("fake LLM transport failure")
+        if timeout is not None and self.delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"fake LLM call took longer than {timeout}s")
+
+        content = json.dumps({
+            category: [
+                {
+                    "title": f"Sample {category} tip {i + 1}",
+                    "description": "Generated offline by the fake LLM client.",
+                    "priority": priority,
+                    "meta": ["offline", model],
+                    "icon": icon
+                }
+                for i, priority in enumerate(("High", "Medium", "Low"))
+            ]
+            for category, icon in self.ICONS.items()
+        })
+        prompt_tokens = sum(len(m["content"].split()) for m in messages)
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(content.split()),
+            total_tokens=prompt_tokens + len(content.split())
+        )
+        if stream:
+            return self._stream(content, usage)
+        if self.delay:
+            time.sleep(self.delay)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=usage
+        )
+
+    def _stream(self, content, usage, size=40):
+        """Chunks shaped like Groq's, spreading the delay over the reply."""
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        for piece in pieces:
+            if self.delay:
+                time.sleep(self.delay / len(pieces))
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))],
+                x_groq=None
+            )
+        yield SimpleNamespace(
+            choices=[SimpleNamespace(delta=SimpleNamespace(content=None))],
+            x_groq=SimpleNamespace(usage=usage)
+        )
+
+
+# Status codes worth retrying: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(error):
+    """True for transient provider failures, False for caller errors (bad request, auth)."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    return isinstance(error, (TimeoutError, ConnectionError)) or \
+        type(error).__name__ in ("APITimeoutError", "APIConnectionError")
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and fails calls fast for
+    `reset_after` seconds. Then one trial call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, threshold=5, reset_after=30.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return
+            # one trial at a time; a trial that never reported back expires
+            if state == "half-open" and (
+                self.trial_at is None or self.clock() - self.trial_at >= self.reset_after
+            ):
+                self.trial_at = self.clock()
+                return
+        metrics.incr("llm.circuit.rejected")
+        raise CircuitOpenError("LLM provider unavailable (circuit open)")
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_at = None
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    metrics.incr("llm.circuit.opened")
+                self.opened_at = self.clock()
+                self.trial_at = None
+
+
+class ResilientClient:
+    """
+    Wraps an SDK-shaped transport (Groq, FakeClient, or Groq pointed at a
+    local fake server) behind the same `chat.completions.create()` call, with:
+
+    - a per-attempt `timeout` and an overall `deadline` per call
+    - up to `retries` retries of transient errors, with full-jitter backoff
+    - a circuit breaker that fails fast while the provider is unhealthy
+    - at most `max_concurrency` calls in flight per process
+    - latency/token histograms and error counters in app.metrics
+    """
+
+    def __init__(self, transport, timeout=20.0, deadline=60.0, retries=2, backoff=0.5,
+                 max_backoff=8.0, max_concurrency=8, breaker=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.transport = transport
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker(clock=clock)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.clock = clock
+        self.sleep = sleep
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, **kwargs):
+        start = self.clock()
+        deadline_at = start + self.deadline
+        self.breaker.allow()
+        if not self.slots.acquire(timeout=self.deadline):
+            metrics.incr("llm.errors.Busy")
+            raise LLMError("too many LLM calls in flight")
+
+        release = True
+        try:
+            attempt = 0
+            while True:
+                remaining = deadline_at - self.clock()
+                if remaining <= 0:
+                    metrics.incr("llm.errors.DeadlineExceeded")
+                    raise DeadlineExceeded(f"no completion within {self.deadline}s")
+                try:
+                    response = self.transport.chat.completions.create(
+                        stream=stream, timeout=min(self.timeout, remaining), **kwargs
+                    )
+                except Exception as e:
+                    metrics.incr(f"llm.errors.{type(e).__name__}")
+                    if not is_retryable(e):
+                        # the provider answered; the request itself was wrong
+                        self.breaker.success()
+                        raise
+                    self.breaker.failure()
+                    delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                    if attempt >= self.retries or self.breaker.state != "closed" \
+                            or self.clock() + delay >= deadline_at:
+                        metrics.observe("llm.attempts", attempt + 1)
+                        raise LLMError(f"LLM call failed after {attempt + 1} attempt(s): {e}") from e
+                    metrics.incr("llm.retries")
+                    self.sleep(delay)
+                    attempt += 1
+                    continue
+
+                metrics.observe("llm.attempts", attempt + 1)
+                if stream:
+                    # the slot is held, and the breaker told how the call
+                    # went, once the caller finishes reading
+                    release = False
+                    return Stream(self, response, start)
+                self.breaker.success()
+                self._record(start, getattr(response, "usage", None))
+                return response
+        finally:
+            if release:
+                self.slots.release()
+
+    def _record(self, start, usage):
+        metrics.incr("llm.calls")
+        metrics.observe("llm.latency_ms", (self.clock() - start) * 1000)
+        tokens = getattr(usage, "total_tokens", None)
+        if tokens:
+            metrics.incr("llm.tokens", tokens)
+            metrics.observe("llm.tokens_per_call", tokens)
+
+
+class Stream:
+    """
+    A streamed completion from ResilientClient. Iterate it for the chunks.
+    It holds one of the client's concurrency slots until it is read to the
+    end, fails, or is closed. Closing happens on garbage collection too, so
+    a stream that's dropped unread (the client went away before the first
+    chunk) still gives its slot back. The circuit breaker hears about the
+    call when the reply ends: success, or failure if the connection broke.
+    """
+
+    def __init__(self, client, chunks, start):
+        self.client = client
+        self.chunks = chunks
+        self.iterator = iter(chunks)
+        self.start = start
+        self.usage = None
+        self.holding = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.holding:
+            raise StopIteration
+        try:
+            chunk = next(self.iterator)
+        except StopIteration:
+            self.close()
+            self.client.breaker.success()
+            self.client._record(self.start, self.usage)
+            raise
+        except Exception as e:
+            metrics.incr(f"llm.errors.{type(e).__name__}")
+            # a connection lost mid-reply counts against the provider like a failed call
+            if is_retryable(e):
+                self.client.breaker.failure()
+            self.close()
+            raise
+        self.usage = getattr(chunk, "usage", None) or \
+            getattr(getattr(chunk, "x_groq", None), "usage", None) or self.usage
+        return chunk
+
+    def close(self):
+        """Stop reading and give the slot back; safe to call more than once."""
+        if self.holding:
+            self.holding = False
+            self.client.slots.release()
+            close = getattr(self.chunks, "close", None)
+            if close is not None:
+                close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def _groq_transport():
+    # Imported on first use; GROQ_BASE_URL (read by the SDK) can point it at
+    # a local fake server
+    import httpx
+    from groq import Groq
+
+    # One pooled HTTP client, so calls reuse keep-alive connections. The
+    # SDK's own retries are off: ResilientClient retries.
+    limit = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
+    return Groq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        max_retries=0,
+        http_client=httpx.Client(limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit))
+    )
+
+
+TRANSPORTS = {
+    "groq": _groq_transport,
+    "fake": lambda: FakeClient(float(os.getenv("LLM_FAKE_DELAY", 0)), float(os.getenv("LLM_FAKE_FAIL_RATE", 0))),
+}
+
+
+def get_client():
+    """
+    The shared LLM client, created on first use. Importing groq is deferred
+    to here so app startup, `flask db` and other CLI commands don't pay for it.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                backend = os.getenv("LLM_BACKEND", "groq")
+                if backend not in TRANSPORTS:
+                    raise ValueError(f"Unknown LLM_BACKEND: {backend!r}")
+                _client = ResilientClient(
+                    TRANSPORTS[backend](),
+                    timeout=float(os.getenv("LLM_TIMEOUT", 20)),
+                    deadline=float(os.getenv("LLM_DEADLINE", 60)),
+                    retries=int(os.getenv("LLM_RETRIES", 2)),
+                    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", 8)),
+                    breaker=CircuitBreaker(
+                        threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", 5)),
+                        reset_after=float(os.getenv("LLM_BREAKER_RESET", 30))
+                    )
+                )
+    return _client
+
+
+def status():
+    """Circuit state of the shared client, or None before the first call."""
+    return {"circuit": _client.breaker.state} if _client is not None else None
+
+
+def fake_server(client=None):
+    """
+    A tiny Flask app speaking the OpenAI-compatible chat completions API that
+    the Groq SDK calls, answered by FakeClient. Run it with
+    `flask llm fake-server` and set GROQ_BASE_URL to exercise the real
+    transport (HTTP, timeouts, 5xx retries) without the provider.
+    """
+    from flask import Flask, Response, jsonify, request
+
+    client = client or FakeClient()
+    server = Flask("lifelens-fake-llm")
+
+    def usage_json(usage):
+        return {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens
+        }
+
+    @server.post("/openai/v1/chat/completions")
+    def completions():
+        body = request.get_json()
+        try:
+            result = client.create(body["model"], body["messages"], stream=bool(body.get("stream")))
+        except ConnectionError as e:
+            return jsonify({"error": {"message": str(e), "type": "server_error"}}), 503
+        created = int(time.time())
+
+        if not body.get("stream"):
+            return jsonify({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": created, "model": body["model"],
+                "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": result.choices[0].message.content}
+                }],
+                "usage": usage_json(result.usage)
+            })
+
+        def events():
+            for chunk in result:
+                data = {
+                    "id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": chunk.choices[0].delta.content}, "finish_reason": None}]
+                }
+                if chunk.x_groq is not None:
+                    data["x_groq"] = {"id": "req-fake", "usage": usage_json(chunk.x_groq.usage)}
+                yield f"data: {json.dumps(data)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return Response(events(), mimetype="text/event-stream")
+
+    return server
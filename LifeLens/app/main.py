@@ -1,20 +1,19 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, stream_with_context
 from flask_login import login_required, current_user
-from .models import db, Activity, Mood, Nutrition, Habit, HabitLog
-from datetime import date, timedelta, datetime
-from sqlalchemy import func
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import StandardScaler
-import os
-from groq import Groq
+from .models import db, Activity, Mood, Nutrition, Habit, HabitLog, HabitLogArchive, Job
+from . import rollup, streaks, habit_calendar, habit_log, history, search, wellness_stats, jobs
+from .summaries import dashboard_summary, analytics_summary, recommendation_weekly_data, ANALYTICS_WINDOWS
+from . import summary_cache, job_queue, replica_router
+from .metrics import metrics
+from .replicas import read_only
+from . import recommendations, llm, importer, config
+from .wellness import analyze_wellness, generate_ai_text, wellness_results
+from datetime import date, datetime, timezone
 import json
-from datetime import date, timedelta
+import math
 from flask import current_app
 
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
 main_bp = Blueprint('main', __name__)
 
 def generate_ai_one_liner(avg_mood, completed_habits, total_habits):
@@ -45,102 +44,42 @@ def index():
 
 
 @main_bp.route('/dashboard')
+@read_only
 @login_required
 def dashboard():
     today = date.today()
-    
-    # Mood data
-    latest_mood = Mood.query.filter_by(user_id=current_user.id).order_by(Mood.date.desc()).first()
-    
-    # Get the most recent date with nutrition data
-    latest_nutrition_date = db.session.query(db.func.max(Nutrition.date)).filter_by(user_id=current_user.id).scalar()
-    display_date = latest_nutrition_date if latest_nutrition_date else today
-    
-    # Water for display date (sum all water entries for that date)
-    display_nutrition_entries = Nutrition.query.filter_by(user_id=current_user.id, date=display_date).all()
-    today_water = sum(n.water for n in display_nutrition_entries)
-    
-    # Water this week
-    week_start = today - timedelta(days=7)
-    week_nutrition = Nutrition.query.filter_by(user_id=current_user.id).filter(Nutrition.date >= week_start).all()
-    week_water_total = sum(n.water for n in week_nutrition)
-    
-    # Habits today
-    habits = Habit.query.filter_by(user_id=current_user.id).all()
-    total_habits = len(habits)
-    completed_today = HabitLog.query.filter_by(user_id=current_user.id, date=today, is_completed=True).count()
-    completion_rate = round((completed_today / total_habits * 100) if total_habits > 0 else 0)
-    
-    # Calories for display date
-    today_activity = Activity.query.filter_by(user_id=current_user.id, date=today).all()
-    today_calories_burned = sum(a.calories for a in today_activity)
-    today_activity_count = len(today_activity)
-    calories_today = sum(n.calories for n in display_nutrition_entries)
-    
-    # Weekly activity
-    activities_week = Activity.query.filter_by(user_id=current_user.id).filter(Activity.date >= week_start).all()
-    total_weekly_activities = len(activities_week)
-    
-    # Calculate activity count per day for the sparkline
-    weekly_activities_by_day = []
-    for i in range(7):
-        day = today - timedelta(days=6-i)
-        count = Activity.query.filter_by(user_id=current_user.id, date=day).count()
-        weekly_activities_by_day.append(count)
-    
-    # Weekly mood
-    weekly_mood = []
-    for i in range(7):
-        day = today - timedelta(days=6-i)
-        m = Mood.query.filter_by(user_id=current_user.id, date=day).first()
-        weekly_mood.append(m.mood_score if m else 0)
-    
-    # For average mood calculation
-    moods_week = Mood.query.filter_by(user_id=current_user.id).filter(Mood.date >= week_start).all()
-    
-    # Day labels
-    day_labels = [(today - timedelta(days=6-i)).strftime('%a') for i in range(7)]
-    
-    # Average mood
-    avg_mood = round(sum(m.mood_score for m in moods_week) / len(moods_week)) if moods_week else 0
-    
-    # Longest streak
-    longest_streak = 0
-    for habit in habits:
-        streak = compute_streak(habit)
-        if streak > longest_streak:
-            longest_streak = streak
-    
+    summary = summary_cache.get_or_compute(
+        current_user, 'dashboard', today.isoformat(),
+        lambda: dashboard_summary(current_user.id, today)
+    )
+
     # AI one-liner
-    ai_one_liner = generate_ai_one_liner(avg_mood, completed_today, total_habits)
-    
+    ai_one_liner = generate_ai_one_liner(
+        summary["avg_mood"], summary["completed_today"], summary["total_habits"]
+    )
+
     return render_template(
         'dashboard.html',
         user=current_user,
-        latest_mood=latest_mood,
-        today_water=today_water,
-        week_water_total=week_water_total,
-        total_habits=total_habits,
-        completed_today=completed_today,
-        completion_rate=completion_rate,
-        today_calories_burned=today_calories_burned,
-        today_activity_count=today_activity_count,
-        calories_today=calories_today,
-        total_weekly_activities=total_weekly_activities,
-        weekly_mood=weekly_mood,
-        weekly_activities=weekly_activities_by_day,
-        day_labels=day_labels,
-        avg_mood=avg_mood,
-        longest_streak=longest_streak,
-        ai_one_liner=ai_one_liner
+        ai_one_liner=ai_one_liner,
+        **summary
     )
 
 
+def _history_next(kind, cursor):
+    return url_for('main.history_page', kind=kind, after=cursor) if cursor else None
+
+
 @main_bp.route('/activity')
+@read_only
+@login_required
 def activity():
-    # Fetch all activities for logged-in user
-    user_activities = Activity.query.filter_by(user_id=current_user.id).order_by(Activity.date.desc()).all()
-    return render_template('activity.html', user=current_user, activities=user_activities)
+    # First page of the user's activities; script.js scrolls in the rest
+    user_activities, cursor = history.page('activity', current_user.id)
+    return render_template(
+        'activity.html', user=current_user, activities=user_activities,
+        next_page=_history_next('activity', cursor)
+    )
 
 
 @main_bp.route('/add_activity', methods=['POST'])
@@ -165,150 +104,124 @@ def add_activity():
         date=datetime.strptime(date, '%Y-%m-%d')
     )
     db.session.add(new_activity)
+    db.session.flush()
+    rollup.record_activity(new_activity)
+    search.index('activity', current_user.id, [new_activity.id])
+    current_user.mark_data_changed()
     db.session.commit()
     flash('Activity added successfully!', 'success')
     return redirect(url_for('main.activity'))
 
 
-@main_bp.route('/mood', methods=['GET', 'POST'])
+@main_bp.route('/mood')
+@read_only
 @login_required
 def mood():
-    if request.method == 'POST':
-        mood_type = request.form.get('mood_type')
-        mood_score = int(request.form.get('mood_score'))
-        energy_score = int(request.form.get('energy_score'))
-        stress_score = int(request.form.get('stress_score'))
-        date = datetime.strptime(request.form.get('date'), '%Y-%m-%d')
-        notes = request.form.get('notes')
-
-        new_mood = Mood(
-            user_id=current_user.id,
-            mood_type=mood_type,
-            mood_score=mood_score,
-            energy_score=energy_score,
-            stress_score=stress_score,
-            date=date,
-            notes=notes
-        )
+    # First page of the user's moods; script.js scrolls in the rest
+    moods, cursor = history.page('mood', current_user.id)
+    return render_template('mood.html', moods=moods, next_page=_history_next('mood', cursor))
 
-        db.session.add(new_mood)
-        db.session.commit()
-        flash('Mood logged successfully!', 'success')
-        return redirect(url_for('main.mood'))
 
-    # Show all moods for current user
-    moods = Mood.query.filter_by(user_id=current_user.id).order_by(Mood.date.desc()).all()
-    return render_template('mood.html', moods=moods)
+@main_bp.route('/mood', methods=['POST'])
+@login_required
+def log_mood():
+    mood_type = request.form.get('mood_type')
+    mood_score = int(request.form.get('mood_score'))
+    energy_score = int(request.form.get('energy_score'))
+    stress_score = int(request.form.get('stress_score'))
+    date = datetime.strptime(request.form.get('date'), '%Y-%m-%d')
+    notes = request.form.get('notes')
+
+    new_mood = Mood(
+        user_id=current_user.id,
+        mood_type=mood_type,
+        mood_score=mood_score,
+        energy_score=energy_score,
+        stress_score=stress_score,
+        date=date,
+        notes=notes
+    )
+
+    db.session.add(new_mood)
+    rollup.record_mood(new_mood)
+    search.index('mood', current_user.id, [new_mood.id])
+    current_user.mark_data_changed()
+    db.session.commit()
+    flash('Mood logged successfully!', 'success')
+    return redirect(url_for('main.mood'))
 
 
-@main_bp.route('/nutrition', methods=['GET', 'POST'])
+@main_bp.route('/nutrition')
+@read_only
 @login_required
 def nutrition():
-    if request.method == 'POST':
-        meal_type = request.form.get('meal_type')
-        food_items = request.form.get('food_items')
+    meals, cursor = history.page('nutrition', current_user.id)
+    return render_template('nutrition.html', meals=meals, next_page=_history_next('nutrition', cursor))
 
-        calories = int(request.form.get('calories'))
-        protein = int(request.form.get('protein'))
-        carbs = int(request.form.get('carbs'))
-        fat = int(request.form.get('fat'))
-        water = int(request.form.get('water'))
 
-        date = datetime.strptime(request.form.get('date'), "%Y-%m-%d")
-        notes = request.form.get('notes')
-
-        new_meal = Nutrition(
-            user_id=current_user.id,
-            meal_type=meal_type,
-            food_items=food_items,
-            calories=calories,
-            protein=protein,
-            carbs=carbs,
-            fat=fat,
-            water=water,
-            date=date,
-            notes=notes
-        )
+@main_bp.route('/nutrition', methods=['POST'])
+@login_required
+def log_meal():
+    meal_type = request.form.get('meal_type')
+    food_items = request.form.get('food_items')
 
-        db.session.add(new_meal)
-        db.session.commit()
-        flash("Meal logged successfully!", "success")
-        return redirect(url_for('main.nutrition'))
+    calories = int(request.form.get('calories'))
+    protein = int(request.form.get('protein'))
+    carbs = int(request.form.get('carbs'))
+    fat = int(request.form.get('fat'))
+    water = int(request.form.get('water'))
 
-    meals = Nutrition.query.filter_by(user_id=current_user.id).order_by(Nutrition.date.desc()).all()
-    return render_template('nutrition.html', meals=meals)
+    date = datetime.strptime(request.form.get('date'), "%Y-%m-%d")
+    notes = request.form.get('notes')
 
+    new_meal = Nutrition(
+        user_id=current_user.id,
+        meal_type=meal_type,
+        food_items=food_items,
+        calories=calories,
+        protein=protein,
+        carbs=carbs,
+        fat=fat,
+        water=water,
+        date=date,
+        notes=notes
+    )
 
-@login_required
-def compute_streak(habit, max_days=365):
-    """
-    Return consecutive days count for which habit was completed.
-    Counts from the most recent completed day backwards.
-    """
-    streak = 0
-    today = date.today()
-    
-    # Find the most recent day with a completed log
-    most_recent_completed = None
-    for i in range(max_days):
-        check_day = today - timedelta(days=i)
-        log = HabitLog.query.filter_by(habit_id=habit.id, user_id=habit.user_id, date=check_day).first()
-        if log and log.is_completed:
-            most_recent_completed = check_day
-            break
-    
-    # If no completed day found, streak is 0
-    if not most_recent_completed:
-        return 0
-    
-    # Count consecutive days backwards from most recent completed day
-    for i in range(max_days):
-        check_day = most_recent_completed - timedelta(days=i)
-        log = HabitLog.query.filter_by(habit_id=habit.id, user_id=habit.user_id, date=check_day).first()
-        if log and log.is_completed:
-            streak += 1
-        else:
-            break
-    
-    return streak
+    db.session.add(new_meal)
+    db.session.flush()
+    rollup.record_meal(new_meal)
+    search.index('nutrition', current_user.id, [new_meal.id])
+    current_user.mark_data_changed()
+    db.session.commit()
+    flash("Meal logged successfully!", "success")
+    return redirect(url_for('main.nutrition'))
 
 
 @main_bp.route('/habits')
+@read_only
 @login_required
 def habits():
     # all habits for the user
     habits = Habit.query.filter_by(user_id=current_user.id).order_by(Habit.created_at.desc()).all()
 
-    # get or create today's log for each habit (but don't commit here, just read)
+    # streaks and today's status are kept on the habit rows themselves
     today = date.today()
-    todays_logs = {}
-    completed_today = 0
+    todays_status = {h.id: h.last_completed_date == today for h in habits}
+    streak_days = {h.id: h.streak_as_of(today) for h in habits}
+    completed_today = sum(todays_status.values())
     total_habits = len(habits)
 
-    for h in habits:
-        log = HabitLog.query.filter_by(habit_id=h.id, user_id=current_user.id, date=today).first()
-        if not log:
-            # No log yet — treat as uncompleted (we won't auto-create DB row here)
-            todays_logs[h.id] = None
-        else:
-            todays_logs[h.id] = log
-            if log.is_completed:
-                completed_today += 1
-
     # compute stats
     completion_rate = int((completed_today / total_habits) * 100) if total_habits > 0 else 0
 
-    # compute streaks per habit and optionally overall average streak
-    streaks = {h.id: compute_streak(h) for h in habits}
-
     return render_template(
         'habits.html',
         habits=habits,
-        todays_logs=todays_logs,
+        todays_status=todays_status,
         completed_today=completed_today,
         total_habits=total_habits,
         completion_rate=completion_rate,
-        streaks=streaks
+        streaks=streak_days
     )
 
 
@@ -332,6 +245,7 @@ def add_habit():
         target_count=target_count
     )
     db.session.add(habit)
+    current_user.mark_data_changed()
     db.session.commit()
     flash('Habit created', 'success')
     return redirect(url_for('main.habits'))
@@ -350,40 +264,38 @@ def toggle_habit():
     if not habit_id:
         return jsonify({"error": "habit_id required"}), 400
 
-    habit = Habit.query.filter_by(id=habit_id, user_id=current_user.id).first()
+    # Locking the habit row serializes toggles of the same habit, so the
+    # streak counters below are updated from what the last toggle left
+    habit = Habit.query.filter_by(id=habit_id, user_id=current_user.id).with_for_update().first()
     if not habit:
         return jsonify({"error": "habit not found"}), 404
 
     today = date.today()
-    log = HabitLog.query.filter_by(habit_id=habit.id, user_id=current_user.id, date=today).first()
-
-    if not log:
-        # create log with completed
-        log = HabitLog(habit_id=habit.id, user_id=current_user.id, date=today, completed_count=1, is_completed=True)
-        db.session.add(log)
+    is_completed = habit_log.toggle(habit, today)
+    # SQLite ignores FOR UPDATE, so another toggle may have moved the
+    # counters since they were loaded; the upsert has taken its write lock
+    # now, so read them again
+    db.session.refresh(habit)
+    if is_completed:
+        rollup.record_habit_completion(current_user.id, today)
+        streaks.record_completion(habit, today)
     else:
-        # toggle
-        if log.is_completed:
-            log.is_completed = False
-            # decrement completed_count (but not below 0)
-            log.completed_count = max(0, log.completed_count - 1)
-        else:
-            log.is_completed = True
-            log.completed_count = log.completed_count + 1
+        rollup.record_habit_completion(current_user.id, today, -1)
+        streaks.record_uncompletion(habit, today)
 
+    habit_calendar.set_day(habit.id, today, is_completed)
+    current_user.mark_data_changed()
     db.session.commit()
 
-    # recompute today's totals for user
-    total_habits = Habit.query.filter_by(user_id=current_user.id).count()
-    completed_today = HabitLog.query.filter_by(user_id=current_user.id, date=today, is_completed=True).count()
+    total_habits, completed_today = habit_log.day_counts(current_user.id, today)
     completion_rate = int((completed_today / total_habits) * 100) if total_habits > 0 else 0
 
-    # compute streak for this habit
-    current_streak = compute_streak(habit)
+    # streak for this habit, as updated above
+    current_streak = habit.streak_as_of(today)
 
     return jsonify({
         "habit_id": habit.id,
-        "is_completed": log.is_completed,
+        "is_completed": is_completed,
         "completed_today": completed_today,
         "total_habits": total_habits,
         "completion_rate": completion_rate,
@@ -391,220 +303,190 @@ def toggle_habit():
     })
 
 
-@main_bp.route("/analytics")
+@main_bp.route('/api/habits/<int:habit_id>/heatmap')
+@read_only
 @login_required
-def analytics():
-    today = date.today()
+def habit_heatmap(habit_id):
+    """Per-day completion calendar (default: last 365 days) with summary stats."""
+    habit = Habit.query.filter_by(id=habit_id, user_id=current_user.id).first()
+    if not habit:
+        return jsonify({"error": "habit not found"}), 404
 
-    # last 7 days
-    days = [(today - timedelta(days=i)) for i in range(6, -1, -1)]
-    day_labels = [d.strftime("%a") for d in days]
-
-    # Weekly Activities Count
-    weekly_activities = [
-        Activity.query.filter_by(user_id=current_user.id, date=d).count()
-        for d in days
-    ]
-    total_weekly_activities = sum(weekly_activities)
-
-    # Weekly Calories
-    weekly_calories = []
-    for d in days:
-        acts = Activity.query.filter_by(user_id=current_user.id, date=d).all()
-        weekly_calories.append(sum(a.calories for a in acts))
-    total_calories_burned = sum(weekly_calories)
-
-    # Weekly Mood
-    weekly_mood = []
-    for d in days:
-        m = Mood.query.filter_by(user_id=current_user.id, date=d).first()
-        weekly_mood.append(m.mood_score if m else 0)
-    mood_values = [m for m in weekly_mood if m > 0]
-    avg_mood = round(sum(mood_values)/len(mood_values), 1) if mood_values else 0
-
-    # Habit Stats
-    total_habits = Habit.query.filter_by(user_id=current_user.id).count()
-    completed_today = HabitLog.query.filter_by(
-        user_id=current_user.id, date=today, is_completed=True
-    ).count()
-    habit_success = int((completed_today/total_habits)*100) if total_habits else 0
-
-    # Longest streak
-    all_habits = Habit.query.filter_by(user_id=current_user.id).all()
-    streaks = []
-    for h in all_habits:
-        streaks.append(compute_streak(h))
-    longest_streak = max(streaks) if streaks else 0
-
-    # Water Intake Today
-    today_water = db.session.query(db.func.sum(Nutrition.water)).filter(
-        Nutrition.user_id == current_user.id,
-        Nutrition.date == today
-    ).scalar() or 0
-    today_water = int(today_water)
-
-    # 1. MOOD DISTRIBUTION PIE CHART (last 7 days mood types)
-    mood_records = Mood.query.filter(
-        Mood.user_id == current_user.id,
-        Mood.date >= (today - timedelta(days=6))
-    ).all()
-    mood_dist = {}
-    for m in mood_records:
-        mood_dist[m.mood_type] = mood_dist.get(m.mood_type, 0) + 1
-    mood_labels = list(mood_dist.keys()) if mood_dist else ["No Data"]
-    mood_counts = list(mood_dist.values()) if mood_dist else [0]
-
-    # 2. MACRO BREAKDOWN PIE CHART (last 7 days macros)
-    nutrition_records = Nutrition.query.filter(
-        Nutrition.user_id == current_user.id,
-        Nutrition.date >= (today - timedelta(days=6))
-    ).all()
-    total_protein = sum(n.protein for n in nutrition_records)
-    total_carbs = sum(n.carbs for n in nutrition_records)
-    total_fat = sum(n.fat for n in nutrition_records)
-    macro_labels = ["Protein", "Carbs", "Fat"]
-    macro_values = [total_protein, total_carbs, total_fat]
-
-    # 3. CALORIES IN VS CALORIES OUT (last 7 days)
-    calories_in = []
-    calories_out = []
-    for d in days:
-        # Calories in (from nutrition)
-        intake = db.session.query(db.func.sum(Nutrition.calories)).filter(
-            Nutrition.user_id == current_user.id,
-            Nutrition.date == d
-        ).scalar() or 0
-        calories_in.append(int(intake))
-        
-        # Calories out (from activities)
-        burned = db.session.query(db.func.sum(Activity.calories)).filter(
-            Activity.user_id == current_user.id,
-            Activity.date == d
-        ).scalar() or 0
-        calories_out.append(int(burned))
-
-    # 4. HABIT COMPLETION TREND (last 7 days)
-    habit_completion_trend = []
-    for d in days:
-        total = Habit.query.filter_by(user_id=current_user.id).count()
-        completed = HabitLog.query.filter_by(
-            user_id=current_user.id, date=d, is_completed=True
-        ).count()
-        rate = int((completed / total) * 100) if total > 0 else 0
-        habit_completion_trend.append(rate)
-
-    # 5. SCATTER: MOOD VS ACTIVITY (last 7 days)
-    scatter_data = []
-    for d in days:
-        activities = Activity.query.filter_by(user_id=current_user.id, date=d).count()
-        mood = Mood.query.filter_by(user_id=current_user.id, date=d).first()
-        mood_score = mood.mood_score if mood else 0
-        if mood_score > 0:  # Only include if mood was logged
-            scatter_data.append({"x": activities, "y": mood_score})
-
-    # AI Analysis
-    ml_results = analyze_wellness(weekly_activities, weekly_mood, weekly_calories)
+    days = min(max(request.args.get('days', 365, type=int), 1), 366 * 5)
+    return jsonify(habit_calendar.heatmap(habit.id, days))
+
+
+def _analytics_window():
+    window = request.args.get('window', 7, type=int)
+    return window if window in ANALYTICS_WINDOWS else 7
+
+
+@main_bp.route("/api/history/<kind>")
+@read_only
+@login_required
+def history_page(kind):
+    """The next page of a history list: ?after=<cursor>&limit=<n>."""
+    if kind not in history.LISTINGS:
+        return jsonify({"error": "unknown list"}), 404
+    limit = request.args.get('limit', history.PAGE_SIZE, type=int)
+    try:
+        items, cursor = history.page(
+            kind, current_user.id, request.args.get('after'), max(1, min(limit, history.MAX_PAGE_SIZE))
+        )
+    except ValueError:
+        return jsonify({"error": "invalid cursor"}), 400
+    return jsonify({
+        "items": [dict(item, date=item["date"].isoformat()) for item in items],
+        "next": _history_next(kind, cursor)
+    })
+
+
+@main_bp.route("/search")
+@read_only
+@login_required
+def search_entries():
+    """Full-text search over the user's activity, mood and meal entries."""
+    query = request.args.get('q', '').strip()
+    page = max(1, request.args.get('page', 1, type=int))
+    results, has_next = search.search(current_user.id, query, page) if query else ([], False)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({
+            "results": [dict(result, date=result["date"].isoformat()) for result in results],
+            "next": url_for('main.search_entries', q=query, page=page + 1) if has_next else None
+        })
+    return render_template('search.html', query=query, results=results, page=page, has_next=has_next)
 
+
+@main_bp.route("/analytics")
+@read_only
+@login_required
+def analytics():
+    # Only the page shell is rendered here; every chart and stat card is
+    # fetched from /api/analytics/<series> after first paint
     return render_template(
         "analytics.html",
-
-        # charts
-        weekly_activities=weekly_activities,
-        weekly_calories=weekly_calories,
-        weekly_mood=weekly_mood,
-        day_labels=day_labels,
-
-        # New charts data
-        mood_labels=mood_labels,
-        mood_counts=mood_counts,
-        macro_labels=macro_labels,
-        macro_values=macro_values,
-        calories_in=calories_in,
-        calories_out=calories_out,
-        habit_completion_trend=habit_completion_trend,
-        scatter_data=scatter_data,
-
-        # stats
-        total_weekly_activities=total_weekly_activities,
-        total_calories_burned=total_calories_burned,
-        avg_mood=avg_mood,
-        habit_success=habit_success,
-        completed_today=completed_today,
-        today_water=today_water,
-        longest_streak=longest_streak,
-
-        # AI
-        ai_insight=ml_results["insight"],
-        activity_corr=ml_results["activity_mood_corr"],
-        calorie_corr=ml_results["calorie_mood_corr"],
-        predicted_mood=ml_results["prediction"]
+        window=_analytics_window(),
+        windows=ANALYTICS_WINDOWS
     )
 
 
-@login_required
-def analyze_wellness(activity_list, mood_list, calories_list):
-    # Convert to numpy arrays
-    X = np.array([activity_list, calories_list]).T
-    y = np.array(mood_list)
-
-    # Remove missing values
-    valid = y > 0
-    X, y = X[valid], y[valid]
-
-    if len(y) < 3:
-        return {
-            "insight": "Not enough data for AI analysis.",
-            "activity_mood_corr": 0,
-            "calorie_mood_corr": 0,
-            "prediction": 0
-        }
-
-    # 1. Correlation
-    activity_corr = np.corrcoef(activity_list, mood_list)[0][1]
-    calorie_corr = np.corrcoef(calories_list, mood_list)[0][1]
-
-    # 2. Regression model
-    model = LinearRegression()
-    model.fit(X, y)
-    predicted_mood = model.predict([[2, 200]])[0]
+def _finite(value):
+    value = float(value)
+    return value if math.isfinite(value) else 0
+
 
+def _insights(summary):
+    if summary["window"] > 7:
+        # Longer windows are answered from the running sums, not a refit
+        model = wellness_stats.model(wellness_stats.totals(current_user.id, summary["window"]))
+        if model is None:
+            ml_results = {
+                "insight": "Not enough data for AI analysis.",
+                "activity_mood_corr": 0,
+                "calorie_mood_corr": 0,
+                "prediction": 0
+            }
+        else:
+            ml_results = dict(
+                model, insight=generate_ai_text(model["activity_mood_corr"], model["calorie_mood_corr"])
+            )
+    else:
+        ml_results = analyze_wellness(
+            summary["weekly_activities"], summary["weekly_mood"], summary["weekly_calories"]
+        )
     return {
-        "activity_mood_corr": round(activity_corr, 2),
-        "calorie_mood_corr": round(calorie_corr, 2),
-        "prediction": round(predicted_mood, 1),
-        "insight": generate_ai_text(activity_corr, calorie_corr)
+        "insight": ml_results["insight"],
+        "activity_mood_corr": _finite(ml_results["activity_mood_corr"]),
+        "calorie_mood_corr": _finite(ml_results["calorie_mood_corr"]),
+        "prediction": _finite(ml_results["prediction"])
     }
 
 
+ANALYTICS_SERIES = {
+    "activities": lambda s: {"labels": s["day_labels"], "values": s["weekly_activities"]},
+    "calories": lambda s: {"labels": s["day_labels"], "values": s["weekly_calories"]},
+    "mood": lambda s: {"labels": s["day_labels"], "values": s["weekly_mood"]},
+    "mood-distribution": lambda s: {"labels": s["mood_labels"], "values": s["mood_counts"]},
+    "macros": lambda s: {"labels": s["macro_labels"], "values": s["macro_values"]},
+    "calorie-balance": lambda s: {
+        "labels": s["day_labels"], "calories_in": s["calories_in"], "calories_out": s["calories_out"]
+    },
+    "habit-trend": lambda s: {"labels": s["day_labels"], "values": s["habit_completion_trend"]},
+    "scatter": lambda s: {"points": s["scatter_data"]},
+    "stats": lambda s: {
+        key: s[key] for key in (
+            "total_weekly_activities", "total_calories_burned", "avg_mood",
+            "habit_success", "completed_today", "today_water", "longest_streak"
+        )
+    },
+    "insights": _insights,
+    "wellness-model": lambda s: {
+        "window": wellness_stats.model(wellness_stats.totals(current_user.id, s["window"])),
+        "all_time": wellness_stats.model(wellness_stats.totals(current_user.id))
+    },
+}
+
+
+@main_bp.route("/api/analytics/<series>")
+@read_only
 @login_required
-def generate_ai_text(activity_corr, calorie_corr):
-    insight = ""
-
-    if activity_corr > 0.6:
-        insight += "Your mood strongly improves on active days. Try adding short activities on low-energy days. "
-    elif activity_corr < -0.3:
-        insight += "High activity seems to reduce your mood. Try balancing intense days with rest. "
-
-    if calorie_corr > 0.5:
-        insight += "Burning more calories correlates with better mood. Keep it up! "
-    elif calorie_corr < -0.3:
-        insight += "High calorie days lower your mood—avoid overexertion. "
-
-    if insight == "":
-        insight = "Your lifestyle trends look balanced. Keep maintaining consistency."
-
-    # AI Recommendation
-    recommendation = ""
-    if activity_corr > 0.5 and calorie_corr > 0.5:
-        recommendation = "Aim for 20–30 minutes of moderate activity daily."
-    elif activity_corr < 0:
-        recommendation = "Your body may be stressed. Try light stretching or meditation."
-    elif calorie_corr < 0:
-        recommendation = "Ensure proper nutrition and hydration on workout days."
+def analytics_series(series):
+    """
+    One analytics chart/stat block as JSON. Validators come from the user's
+    data version, so an unchanged series is answered with a 304 before any
+    query runs.
+    """
+    if series not in ANALYTICS_SERIES:
+        return jsonify({"error": "unknown series"}), 404
+
+    today = date.today()
+    window = _analytics_window()
+    etag = f"{current_user.id}-{current_user.data_version or 0}-{series}-{window}-{today.isoformat()}"
+    # data_updated_at is naive UTC; the series change at the server's local
+    # midnight too (when `today` moves on), so that is converted to UTC
+    last_modified = max(
+        (current_user.data_updated_at or datetime.min).replace(tzinfo=timezone.utc),
+        datetime.combine(today, datetime.min.time()).astimezone(timezone.utc)
+    ).replace(microsecond=0)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
     else:
-        recommendation = "Maintain your routine; consistency is improving your wellness."
+        not_modified = bool(request.if_modified_since and last_modified <= request.if_modified_since)
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        summary = summary_cache.get_or_compute(
+            current_user, 'analytics', f"{today.isoformat()}:{window}",
+            lambda: analytics_summary(current_user.id, today, window)
+        )
+        response = jsonify(ANALYTICS_SERIES[series](summary))
+
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
-    return insight + " Recommendation: " + recommendation
+
+@main_bp.route("/admin/metrics")
+@login_required
+def admin_metrics():
+    """Process-local counters and cache hit ratios, for admins only."""
+    if not current_user.is_admin:
+        abort(403)
+    snapshot = metrics.snapshot()
+    snapshot["ratios"] = {
+        "wellness_cache": metrics.ratio("wellness_cache.hits", "wellness_cache.misses"),
+        "recommendation_cache": metrics.ratio("recommendation_cache.hits", "recommendation_cache.misses")
+    }
+    snapshot["sizes"] = {"wellness_cache": len(wellness_results)}
+    snapshot["recommendation_cache"] = recommendations.totals()
+    snapshot["llm"] = llm.status()
+    snapshot["db_pool"] = config.pool_status(db.engines)
+    snapshot["replica_lag"] = replica_router.status()
+    return jsonify(snapshot)
 
 
 @main_bp.route("/apply_recommendation", methods=['POST'])
@@ -642,6 +524,7 @@ def apply_recommendation():
             target_count=1
         )
         db.session.add(new_habit)
+        current_user.mark_data_changed()
         db.session.commit()
         
         # DO NOT create a log entry - leave it uncompleted
@@ -668,7 +551,10 @@ def delete_activity(activity_id):
         if not activity:
             return jsonify({"error": "Activity not found"}), 404
         
+        rollup.record_activity(activity, -1)
+        search.forget('activity', [activity.id])
         db.session.delete(activity)
+        current_user.mark_data_changed()
         db.session.commit()
         return jsonify({"success": True, "message": "Activity deleted"}), 200
     except Exception as e:
@@ -685,7 +571,10 @@ def delete_mood(mood_id):
         if not mood:
             return jsonify({"error": "Mood entry not found"}), 404
         
+        rollup.record_mood(mood, -1)
+        search.forget('mood', [mood.id])
         db.session.delete(mood)
+        current_user.mark_data_changed()
         db.session.commit()
         return jsonify({"success": True, "message": "Mood entry deleted"}), 200
     except Exception as e:
@@ -702,7 +591,10 @@ def delete_nutrition(meal_id):
         if not nutrition:
             return jsonify({"error": "Nutrition entry not found"}), 404
         
+        rollup.record_meal(nutrition, -1)
+        search.forget('nutrition', [nutrition.id])
         db.session.delete(nutrition)
+        current_user.mark_data_changed()
         db.session.commit()
         return jsonify({"success": True, "message": "Nutrition entry deleted"}), 200
     except Exception as e:
@@ -720,9 +612,13 @@ def delete_habit(habit_id):
             return jsonify({"error": "Habit not found"}), 404
         
         # Delete all habit logs first
+        rollup.forget_habit_logs(habit_id, current_user.id)
+        habit_calendar.forget(habit_id)
         HabitLog.query.filter_by(habit_id=habit_id).delete()
+        HabitLogArchive.query.filter_by(habit_id=habit_id).delete()
         # Then delete the habit
         db.session.delete(habit)
+        current_user.mark_data_changed()
         db.session.commit()
         return jsonify({"success": True, "message": "Habit deleted"}), 200
     except Exception as e:
@@ -734,179 +630,130 @@ def delete_habit(habit_id):
 @login_required
 def recommendation():
     today = date.today()
+    weekly_data = summary_cache.get_or_compute(
+        current_user, 'recommendation', today.isoformat(),
+        lambda: recommendation_weekly_data(current_user.id, today)
+    )
 
-    # Build weekly data ------------------------------------
-    days = [(today - timedelta(days=i)) for i in range(6, -1, -1)]
-
-    weekly_activities = [
-        Activity.query.filter_by(user_id=current_user.id, date=d).count()
-        for d in days
-    ]
-
-    weekly_mood = [
-        (Mood.query.filter_by(user_id=current_user.id, date=d).first().mood_score
-         if Mood.query.filter_by(user_id=current_user.id, date=d).first() else 0)
-        for d in days
-    ]
-
-    weekly_calories = []
-    for d in days:
-        acts = Activity.query.filter_by(user_id=current_user.id, date=d).all()
-        weekly_calories.append(int(sum(a.calories for a in acts)))
-
-    today_water = db.session.query(db.func.sum(Nutrition.water)).filter(
-        Nutrition.user_id == current_user.id, Nutrition.date == today
-    ).scalar() or 0
-    today_water = int(today_water)
-
-    total_habits = Habit.query.filter_by(user_id=current_user.id).count()
-    completed_today = HabitLog.query.filter_by(
-        user_id=current_user.id, date=today, is_completed=True
-    ).count()
-    habit_success = int((completed_today/total_habits)*100) if total_habits else 0
-
-    weekly_data = {
-        "activities": weekly_activities,
-        "mood": weekly_mood,
-        "calories": weekly_calories, 
-        "water_today": today_water,
-        "habit_success": habit_success
-    }
-
-    # CALL AI (Groq)
-    ai_recs = generate_ai_recommendations(weekly_data)
+    # CALL AI (Groq) off-request, unless this week's data was already answered.
+    # In 'job' mode the page polls the job and reloads once the answer is
+    # stored; in 'stream' mode it fills in categories from the SSE endpoint.
+    key, ai_recs = recommendations.cached(current_user.id, weekly_data)
+    job = None
+    stream = False
+    if ai_recs is None:
+        if current_app.config['RECOMMENDATION_MODE'] == 'stream':
+            stream = True
+        else:
+            job = jobs.enqueue(current_user.id, 'recommendation', key, weekly_data)
+            db.session.commit()
+            job_queue.kick()
+        ai_recs = recommendations.EMPTY
 
     return render_template(
         "recommendation.html",
-        recs=ai_recs
+        recs=ai_recs,
+        job=job,
+        stream=stream
     )
 
 
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@main_bp.route("/recommendation/stream")
 @login_required
-def generate_ai_recommendations(weekly_data):
-    prompt = f"""
-    You are a wellness AI coach. Based on the user's weekly data below, 
-    generate personalized and actionable recommendations.
-
-    IMPORTANT: Generate EXACTLY 3 recommendations for EACH category with one High, one Medium, and one Low priority item.
-
-    The output MUST be ONLY valid JSON in this exact structure:
-
-    {{
-        "activity": [
-            {{
-                "title": "Recommendation 1",
-                "description": "Description for recommendation 1",
-                "priority": "High",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-running"
-            }},
-            {{
-                "title": "Recommendation 2",
-                "description": "Description for recommendation 2",
-                "priority": "Medium",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-dumbbell"
-            }},
-            {{
-                "title": "Recommendation 3",
-                "description": "Description for recommendation 3",
-                "priority": "Low",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-hiking"
-            }}
-        ],
-        "mood": [
-            {{
-                "title": "Recommendation 1",
-                "description": "Description for recommendation 1",
-                "priority": "High",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-smile"
-            }},
-            {{
-                "title": "Recommendation 2",
-                "description": "Description for recommendation 2",
-                "priority": "Medium",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-heart"
-            }},
-            {{
-                "title": "Recommendation 3",
-                "description": "Description for recommendation 3",
-                "priority": "Low",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-music"
-            }}
-        ],
-        "nutrition": [
-            {{
-                "title": "Recommendation 1",
-                "description": "Description for recommendation 1",
-                "priority": "High",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-apple-alt"
-            }},
-            {{
-                "title": "Recommendation 2",
-                "description": "Description for recommendation 2",
-                "priority": "Medium",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-water"
-            }},
-            {{
-                "title": "Recommendation 3",
-                "description": "Description for recommendation 3",
-                "priority": "Low",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-carrot"
-            }}
-        ],
-        "habits": [
-            {{
-                "title": "Recommendation 1",
-                "description": "Description for recommendation 1",
-                "priority": "High",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-check-circle"
-            }},
-            {{
-                "title": "Recommendation 2",
-                "description": "Description for recommendation 2",
-                "priority": "Medium",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-bullseye"
-            }},
-            {{
-                "title": "Recommendation 3",
-                "description": "Description for recommendation 3",
-                "priority": "Low",
-                "meta": ["detail1", "detail2"],
-                "icon": "fa-calendar"
-            }}
-        ]
-    }}
-
-    Return ONLY valid JSON. No extra text before or after.
-
-    USER WEEKLY DATA:
-    {json.dumps(weekly_data, indent=2)}
+def recommendation_stream():
     """
-
-    response = client.chat.completions.create(
-        model="llama-3.1-8b-instant",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.4
+    Server-Sent Events: one `category` event per finished category as the
+    model streams its answer, then `done` (or `error`). A cached answer is
+    sent straight away.
+    """
+    today = date.today()
+    user_id = current_user.id
+    weekly_data = summary_cache.get_or_compute(
+        current_user, 'recommendation', today.isoformat(),
+        lambda: recommendation_weekly_data(user_id, today)
     )
+    key, cached = recommendations.cached(user_id, weekly_data)
+
+    def events():
+        if cached is not None:
+            for category in recommendations.CATEGORIES:
+                yield _sse("category", {"category": category, "items": cached.get(category, [])})
+            yield _sse("done", {"cached": True})
+            return
+
+        try:
+            for kind, value in recommendations.stream_ai_recommendations(weekly_data):
+                if kind == "category":
+                    category, items = value
+                    yield _sse("category", {"category": category, "items": items})
+                    continue
+                result, tokens = value
+                if "error" in result:
+                    yield _sse("error", {"error": result["error"]})
+                    return
+                recommendations.store(user_id, key, result, tokens)
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("recommendation stream failed")
+            yield _sse("error", {"error": "Couldn't generate recommendations right now."})
+            return
+        yield _sse("done", {"cached": False})
+
+    response = current_app.response_class(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
+
+
+@main_bp.route("/api/jobs/<int:job_id>")
+@login_required
+def job_status(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify({
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    })
+
 
-    content = response.choices[0].message.content.strip()
+@main_bp.route("/recommendation/refresh", methods=['POST'])
+@login_required
+def refresh_recommendation():
+    """Drop the cached answer so the next view generates a fresh one."""
+    recommendations.invalidate(current_user.id)
+    db.session.commit()
+    return jsonify({"success": True, "redirect": url_for('main.recommendation')})
+
+
+@main_bp.route("/import", methods=['POST'])
+@login_required
+def import_history():
+    """
+    Bulk-import activity, mood or nutrition history. Multipart form with
+    `kind`, `file` and optionally `format` ('csv' or 'jsonl', otherwise
+    taken from the file name). Returns the import report.
+    """
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({"error": "file required"}), 400
+    fmt = request.form.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    fmt = 'jsonl' if fmt in ('json', 'ndjson') else fmt
 
     try:
-        result = json.loads(content)
-        result["activity"] = (result.get("activity") or [])[:3]
-        result["mood"] = (result.get("mood") or [])[:3]
-        result["nutrition"] = (result.get("nutrition") or [])[:3]
-        result["habits"] = (result.get("habits") or [])[:3]
-        return result
-    except:
-        return {"error": "Invalid JSON returned by AI", "raw": content}
+        report = importer.import_entries(
+            current_user, request.form.get('kind'), upload.stream, fmt,
+            batch_size=current_app.config['IMPORT_BATCH_SIZE']
+        )
+    except importer.ImportRejected as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(report), 200 if report["imported"] or not report["failed"] else 422
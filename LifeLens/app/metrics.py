@@ -0,0 +1,61 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+
+# Upper bounds for histograms; suits milliseconds and token counts alike
+DEFAULT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class Metrics:
+    """Process-local counters and histograms, exposed to admins at /admin/metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._histograms = {}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def get(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS):
+        """Record one value in the named histogram."""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {
+                    "buckets": tuple(buckets), "counts": [0] * (len(buckets) + 1), "sum": 0, "count": 0
+                }
+            histogram["counts"][bisect_left(histogram["buckets"], value)] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def ratio(self, hits, misses):
+        """hits / (hits + misses) for two counters, or None before any traffic."""
+        hit, miss = self.get(hits), self.get(misses)
+        return round(hit / (hit + miss), 4) if hit + miss else None
+
+    def snapshot(self):
+        with self._lock:
+            histograms = {}
+            for name, h in self._histograms.items():
+                # cumulative counts per upper bound, Prometheus style
+                running, le = 0, {}
+                for bound, count in zip(h["buckets"] + ("+Inf",), h["counts"]):
+                    running += count
+                    le[str(bound)] = running
+                histograms[name] = {"count": h["count"], "sum": round(h["sum"], 3), "le": le}
+            return {"counters": dict(self._counters), "histograms": histograms}
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+metrics = Metrics()
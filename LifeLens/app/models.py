@@ -12,8 +12,36 @@ class User(UserMixin, db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Bumped by every write route; the analytics API derives its ETag and
+    # Last-Modified headers from these
+    data_version = db.Column(db.Integer, nullable=False, default=0)
+    data_updated_at = db.Column(db.DateTime)
+
+    # Entries dated before this may have been moved to the archive tables
+    # (see archive.py); None until the user's first archival
+    archived_before = db.Column(db.Date)
+
+    def mark_data_changed(self):
+        """Record a write to this user's entries; call before committing it."""
+        self.data_version = User.data_version + 1
+        self.data_updated_at = datetime.utcnow()
+
+    @classmethod
+    def mark_all_changed(cls, user_ids=None):
+        """mark_data_changed for many users in one UPDATE (every user when `user_ids` is None)."""
+        stmt = db.update(cls).values(data_version=cls.data_version + 1, data_updated_at=datetime.utcnow())
+        if user_ids is not None:
+            stmt = stmt.where(cls.id.in_(user_ids))
+        db.session.execute(stmt)
+
 
 class DailyLog(db.Model):
+    """
+    Per-(user, date) rollup of the raw Activity, Mood, Nutrition and HabitLog
+    rows, kept up to date by app.rollup on every write and delete.
+    """
+    __table_args__ = (db.UniqueConstraint('user_id', 'date', name='uq_daily_log_user_date'),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     date = db.Column(db.Date, nullable=False)
@@ -25,10 +53,52 @@ class DailyLog(db.Model):
     mood = db.Column(db.Integer)
     stress = db.Column(db.Integer)
     calories = db.Column(db.Integer)
+
+    # Activity
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+    calories_out = db.Column(db.Integer, nullable=False, default=0)
+
+    # Nutrition
+    meal_count = db.Column(db.Integer, nullable=False, default=0)
+    calories_in = db.Column(db.Integer, nullable=False, default=0)
+    water = db.Column(db.Integer, nullable=False, default=0)
+    protein = db.Column(db.Integer, nullable=False, default=0)
+    carbs = db.Column(db.Integer, nullable=False, default=0)
+    fat = db.Column(db.Integer, nullable=False, default=0)
+
+    # Mood (totals so averages survive incremental updates)
+    mood_count = db.Column(db.Integer, nullable=False, default=0)
+    mood_total = db.Column(db.Integer, nullable=False, default=0)
+    energy_total = db.Column(db.Integer, nullable=False, default=0)
+    stress_total = db.Column(db.Integer, nullable=False, default=0)
+    first_mood_id = db.Column(db.Integer)
+    first_mood_score = db.Column(db.Integer)
+
+    # Habits
+    habits_completed = db.Column(db.Integer, nullable=False, default=0)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def avg_mood(self):
+        return self.mood_total / self.mood_count if self.mood_count else 0
+
+    @property
+    def avg_energy(self):
+        return self.energy_total / self.mood_count if self.mood_count else 0
+
+    @property
+    def avg_stress(self):
+        return self.stress_total / self.mood_count if self.mood_count else 0
 
 
 class Activity(db.Model):
+    __table_args__ = (
+        db.Index('ix_activity_user_date', 'user_id', 'date'),
+        {'sqlite_autoincrement': True},  # ids stay unique across this table and its archive
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     title = db.Column(db.String(100), nullable=False)
@@ -44,6 +114,11 @@ class Activity(db.Model):
 
 
 class Mood(db.Model):
+    __table_args__ = (
+        db.Index('ix_mood_user_date', 'user_id', 'date'),
+        {'sqlite_autoincrement': True},  # ids stay unique across this table and its archive
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
@@ -60,6 +135,11 @@ class Mood(db.Model):
 
 
 class Nutrition(db.Model):
+    __table_args__ = (
+        db.Index('ix_nutrition_user_date', 'user_id', 'date'),
+        {'sqlite_autoincrement': True},  # ids stay unique across this table and its archive
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
@@ -84,17 +164,39 @@ class Nutrition(db.Model):
 class Habit(db.Model):
     __tablename__ = 'habit'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     frequency = db.Column(db.String(20), default='daily')  # daily / weekly / monthly
     target_count = db.Column(db.Integer, default=1)        # e.g., 1x per day
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Maintained by app.streaks on every toggle; `flask habits repair-streaks`
+    # recomputes them from habit_log
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0)
+    last_completed_date = db.Column(db.Date)
+    # The longest run that ended before the current streak began (every run
+    # when there's no current streak), so un-marking today is O(1) too
+    longest_before_current = db.Column(db.Integer, nullable=False, default=0)
+
     user = db.relationship('User', backref=db.backref('habits', lazy='dynamic'))
 
+    def streak_as_of(self, day):
+        """The live streak: it's broken once a whole day passes without a completion."""
+        if self.last_completed_date and self.last_completed_date >= day - timedelta(days=1):
+            return self.current_streak or 0
+        return 0
+
 class HabitLog(db.Model):
     __tablename__ = 'habit_log'
+    __table_args__ = (
+        # also the (habit_id, date) lookup index
+        db.UniqueConstraint('habit_id', 'date', name='uq_habit_log_habit_date'),
+        db.Index('ix_habit_log_user_date_completed', 'user_id', 'date', 'is_completed'),
+        {'sqlite_autoincrement': True},  # ids stay unique across this table and its archive
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     habit_id = db.Column(db.Integer, db.ForeignKey('habit.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -104,4 +206,177 @@ class HabitLog(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     habit = db.relationship('Habit', backref=db.backref('logs', lazy='dynamic'))
-    user = db.relationship('User')
\ No newline at end of file
+    user = db.relationship('User')
+
+class HabitCalendar(db.Model):
+    """One bit per day of `year`, set when the habit was completed that day."""
+    __tablename__ = 'habit_calendar'
+    __table_args__ = (db.UniqueConstraint('habit_id', 'year', name='uq_habit_calendar_habit_year'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    habit_id = db.Column(db.Integer, db.ForeignKey('habit.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    bits = db.Column(db.LargeBinary(46), nullable=False)  # 366 days, little-endian bit order
+
+class WellnessStats(db.Model):
+    """Running sums over a user's days with a mood logged (see wellness_stats.py)."""
+    __tablename__ = 'wellness_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    n = db.Column(db.BigInteger, default=0)
+    sum_a = db.Column(db.BigInteger, default=0)
+    sum_c = db.Column(db.BigInteger, default=0)
+    sum_m = db.Column(db.BigInteger, default=0)
+    sum_aa = db.Column(db.BigInteger, default=0)
+    sum_cc = db.Column(db.BigInteger, default=0)
+    sum_mm = db.Column(db.BigInteger, default=0)
+    sum_ac = db.Column(db.BigInteger, default=0)
+    sum_am = db.Column(db.BigInteger, default=0)
+    sum_cm = db.Column(db.BigInteger, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RecommendationCache(db.Model):
+    """A parsed AI recommendation answer for one user's weekly-data fingerprint."""
+    __tablename__ = 'recommendation_cache'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'fingerprint', name='uq_recommendation_cache_user_fingerprint'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    tokens = db.Column(db.Integer, default=0)  # what generating it cost
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class Job(db.Model):
+    """A unit of background work (see jobs.py), e.g. generating recommendations."""
+    __tablename__ = 'job'
+    __table_args__ = (db.Index('ix_job_user_kind_key', 'user_id', 'kind', 'key'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(64), nullable=False)  # dedupes identical requests
+    payload = db.Column(db.Text, nullable=False)  # JSON input for the handler
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class PrecomputeRun(db.Model):
+    """Progress and report of one `flask recommendations precompute` run."""
+    __tablename__ = 'precompute_run'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)  # the weekly data it was built for
+    status = db.Column(db.String(20), nullable=False, default='running')
+    active_days = db.Column(db.Integer, nullable=False)
+    users_total = db.Column(db.Integer, default=0)
+    generated = db.Column(db.Integer, default=0)
+    skipped = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    tokens = db.Column(db.Integer, default=0)
+    elapsed = db.Column(db.Float, default=0)  # seconds, summed over resumes
+    errors = db.Column(db.Text)  # JSON list of {"user_id", "error"}
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+class ReplicaHeartbeat(db.Model):
+    """
+    A single row the primary stamps every second or so (`flask replicas
+    heartbeat`); how old a replica's copy of it is measures its lag.
+    """
+    __tablename__ = 'replica_heartbeat'
+
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False)
+
+class SearchEntry(db.Model):
+    """
+    The searchable text of one Activity, Mood or Nutrition entry, kept in
+    step by the write and delete routes (see search.py). MySQL searches it
+    through a FULLTEXT index; SQLite through the search_entry_fts FTS5 table.
+    """
+    __tablename__ = 'search_entry'
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'entry_id', name='uq_search_entry_kind_entry'),
+        db.Index('ix_search_entry_body', 'body', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # activity / mood / nutrition
+    entry_id = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+
+
+# Archive tables: the same columns as the hot tables, holding the rows
+# archive.py moved out of them. Rows keep their original ids.
+
+class ActivityArchive(db.Model):
+    __tablename__ = 'activity_archive'
+    __table_args__ = (db.Index('ix_activity_archive_user_date', 'user_id', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    title = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    duration = db.Column(db.Integer, nullable=False)
+    calories = db.Column(db.Integer, nullable=False)
+    intensity = db.Column(db.String(20), nullable=False)
+    notes = db.Column(db.Text)
+    date = db.Column(db.Date)
+    created_at = db.Column(db.DateTime)
+
+class MoodArchive(db.Model):
+    __tablename__ = 'mood_archive'
+    __table_args__ = (db.Index('ix_mood_archive_user_date', 'user_id', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    mood_type = db.Column(db.String(50), nullable=False)
+    mood_score = db.Column(db.Integer, nullable=False)
+    energy_score = db.Column(db.Integer, nullable=False)
+    stress_score = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+
+class NutritionArchive(db.Model):
+    __tablename__ = 'nutrition_archive'
+    __table_args__ = (db.Index('ix_nutrition_archive_user_date', 'user_id', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    meal_type = db.Column(db.String(50), nullable=False)
+    food_items = db.Column(db.Text, nullable=False)
+    calories = db.Column(db.Integer, nullable=False)
+    protein = db.Column(db.Integer, nullable=False)
+    carbs = db.Column(db.Integer, nullable=False)
+    fat = db.Column(db.Integer, nullable=False)
+    water = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+
+class HabitLogArchive(db.Model):
+    __tablename__ = 'habit_log_archive'
+    __table_args__ = (
+        db.Index('ix_habit_log_archive_user_date', 'user_id', 'date'),
+        db.Index('ix_habit_log_archive_habit_date', 'habit_id', 'date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    habit_id = db.Column(db.Integer, db.ForeignKey('habit.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    completed_count = db.Column(db.Integer)
+    is_completed = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
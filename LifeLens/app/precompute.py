@@ -0,0 +1,152 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from .models import db, DailyLog, RecommendationCache, PrecomputeRun
+from .ratelimit import TokenBucket
+from .recommendations import fingerprint, generate_ai_recommendations, store
+from .summaries import bulk_recommendation_weekly_data
+from . import llm
+
+
+# How many failures a run report keeps verbatim
+ERROR_SAMPLE = 20
+
+
+def active_user_ids(days, today=None):
+    """Users with anything logged in the last `days` days, in id order."""
+    today = today or date.today()
+    return db.session.execute(
+        select(DailyLog.user_id)
+        .where(DailyLog.date >= today - timedelta(days=days - 1), DailyLog.date <= today)
+        .distinct()
+        .order_by(DailyLog.user_id)
+    ).scalars().all()
+
+
+def answered(weekly, now=None):
+    """The users in `weekly` whose current data already has a live cached answer."""
+    now = now or datetime.utcnow()
+    keys = {uid: fingerprint(data) for uid, data in weekly.items()}
+    rows = db.session.execute(
+        select(RecommendationCache.user_id, RecommendationCache.fingerprint).where(
+            RecommendationCache.user_id.in_(list(weekly)),
+            RecommendationCache.expires_at > now
+        )
+    )
+    return {uid for uid, key in rows if keys.get(uid) == key}
+
+
+def _start(active_days, today, resume):
+    if resume:
+        run = PrecomputeRun.query.filter(
+            PrecomputeRun.day == today, PrecomputeRun.status.in_(('running', 'interrupted'))
+        ).order_by(PrecomputeRun.id.desc()).first()
+        if run is not None:
+            run.status = 'running'
+            return run
+    run = PrecomputeRun(
+        day=today, status='running', active_days=active_days, users_total=0,
+        generated=0, skipped=0, failed=0, tokens=0, elapsed=0, errors='[]'
+    )
+    db.session.add(run)
+    return run
+
+
+def precompute(active_days=7, concurrency=4, rpm=30, limit=None, dry_run=False,
+               resume=False, client=None, today=None, progress=None):
+    """
+    Generate and cache recommendations for every recently active user.
+
+    Weekly data is built in bulk, users whose data already has a cached
+    answer are skipped (which is also what makes an interrupted run
+    resumable), and the rest are sent to the LLM from a pool of
+    `concurrency` threads behind a `rpm` requests-per-minute token bucket.
+    Results are stored from this thread as they complete. With `dry_run`
+    the fake client answers and nothing is written.
+
+    Returns the run report; `progress(report)` is called after each user.
+    """
+    today = today or date.today()
+    if dry_run and client is None:
+        client = llm.FakeClient()
+    run = None if dry_run else _start(active_days, today, resume)
+    report = {
+        "day": today.isoformat(), "dry_run": dry_run, "users_total": 0, "generated": 0,
+        "skipped": 0, "failed": 0, "tokens": 0, "elapsed": 0.0, "errors": [],
+    }
+    if run is not None and run.id is not None:
+        # resuming: carry the earlier attempts' figures forward
+        report.update(
+            generated=run.generated, failed=run.failed, tokens=run.tokens,
+            elapsed=run.elapsed, errors=json.loads(run.errors or '[]')
+        )
+    started = time.monotonic()
+    elapsed_before = report["elapsed"]
+
+    def save(status=None):
+        report["elapsed"] = round(elapsed_before + time.monotonic() - started, 3)
+        if run is None:
+            return
+        for name in ('users_total', 'generated', 'skipped', 'failed', 'tokens', 'elapsed'):
+            setattr(run, name, report[name])
+        run.errors = json.dumps(report["errors"])
+        if status is not None:
+            run.status = status
+            run.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    user_ids = active_user_ids(active_days, today)
+    weekly = bulk_recommendation_weekly_data(user_ids, today)
+    done = answered(weekly)
+    todo = [uid for uid in user_ids if uid not in done]
+    if limit is not None:
+        todo = todo[:limit]
+    report["users_total"] = len(user_ids)
+    # answers generated by an earlier attempt of this run aren't "skipped"
+    report["skipped"] = max(0, len(done) - report["generated"])
+    save()
+
+    bucket = TokenBucket(rpm / 60.0, capacity=max(1, min(concurrency, rpm)))
+
+    def generate(uid):
+        bucket.acquire()
+        return generate_ai_recommendations(weekly[uid], client)
+
+    def fail(uid, error):
+        report["failed"] += 1
+        if len(report["errors"]) < ERROR_SAMPLE:
+            report["errors"].append({"user_id": uid, "error": error})
+
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='lifelens-precompute')
+    try:
+        futures = {pool.submit(generate, uid): uid for uid in todo}
+        for future in as_completed(futures):
+            uid = futures[future]
+            try:
+                result, tokens = future.result()
+            except Exception as e:
+                fail(uid, f"{type(e).__name__}: {e}")
+            else:
+                report["tokens"] += tokens
+                if "error" in result:
+                    fail(uid, result["error"])
+                else:
+                    report["generated"] += 1
+                    if not dry_run:
+                        store(uid, fingerprint(weekly[uid]), result, tokens)
+            save()
+            if progress is not None:
+                progress(report)
+    except BaseException:
+        pool.shutdown(wait=False, cancel_futures=True)
+        db.session.rollback()
+        save('interrupted')
+        raise
+    pool.shutdown()
+
+    save('done')
+    elapsed = report["elapsed"] - elapsed_before
+    report["users_per_minute"] = round(len(todo) / elapsed * 60, 1) if elapsed else None
+    return report
@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from sqlalchemy import event, select
+from .models import db, DailyLog, Habit, User
+from . import archive
+
+
+def routes(user_id):
+    """The GET routes whose queries are checked, filled in for this user's data."""
+    paths = ['/dashboard', '/habits', '/activity', '/mood', '/nutrition', '/search?q=walk']
+    paths += [f'/analytics?window={window}' for window in (7, 30, 365)]
+    paths += [f'/api/analytics/{series}?window=30' for series in (
+        'activities', 'mood-distribution', 'macros', 'habit-trend', 'stats', 'insights', 'wellness-model'
+    )]
+    paths += [f'/api/history/{kind}?after=2100-01-01.0' for kind in ('activity', 'mood', 'nutrition')]
+    before = archive.boundary(user_id)
+    if before is not None:
+        # pages and windows that reach into the archive tables
+        paths += [f'/api/history/{kind}?after={before.isoformat()}.0' for kind in ('activity', 'mood', 'nutrition')]
+        paths.append('/api/analytics/mood-distribution?window=365')
+    habit_id = db.session.execute(select(Habit.id).where(Habit.user_id == user_id).limit(1)).scalar()
+    if habit_id is not None:
+        paths.append(f'/api/habits/{habit_id}/heatmap')
+    return paths
+
+
+def busiest_user():
+    """The user with the most rollup days, i.e. the most history to query."""
+    return db.session.execute(
+        select(DailyLog.user_id).group_by(DailyLog.user_id)
+        .order_by(db.func.count(DailyLog.id).desc()).limit(1)
+    ).scalar()
+
+
+@contextmanager
+def capture(engine):
+    """Collect the (statement, parameters) of every SELECT run on `engine`."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+# Databases whose EXPLAIN output full_scans() can read
+DIALECTS = ('sqlite', 'mysql', 'postgresql')
+
+
+def explain(statement, parameters):
+    """The database's plan for one captured statement, as a list of text lines."""
+    dialect = db.engine.dialect.name
+    with db.engine.connect() as conn:
+        if dialect == 'sqlite':
+            rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+            return [row[-1] for row in rows]
+        if dialect == 'mysql':
+            rows = conn.exec_driver_sql('EXPLAIN ' + statement, parameters).mappings().all()
+            return [f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']}" for row in rows]
+        # postgresql: one text line per plan node
+        return [row[0].strip() for row in conn.exec_driver_sql('EXPLAIN ' + statement, parameters)]
+
+
+def full_scans(plan):
+    """The tables a plan reads in full (index lookups, virtual tables, subqueries and temp b-trees are fine)."""
+    # SQLite names subqueries in "CO-ROUTINE x" / "MATERIALIZE x" lines before scanning them
+    subqueries = {line.split()[1] for line in plan if line.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+    scanned = []
+    for line in plan:
+        if line.startswith('SCAN '):
+            # SQLite: "SCAN habit_log" or "SCAN habit_log USING COVERING INDEX ..."
+            table = line.split()[1]
+            if 'VIRTUAL TABLE' in line or table.startswith('(') or table == 'CONSTANT' or table in subqueries:
+                continue
+            scanned.append(table)
+        elif ': type=ALL ' in line and not line.startswith('<'):
+            # MySQL: access type ALL is a full table scan (of a <derivedN> subquery is fine)
+            scanned.append(line.split(':')[0])
+        elif 'Seq Scan on ' in line:
+            # PostgreSQL: "->  Seq Scan on habit_log  (cost=...)"
+            scanned.append(line.split('Seq Scan on ')[1].split()[0])
+    return scanned
+
+
+def check(app, user_id):
+    """
+    Request every checked route as `user_id`, EXPLAIN each distinct query it
+    ran, and return [(path, statement, plan, scanned tables)] for all of them.
+    """
+    if db.engine.dialect.name not in DIALECTS:
+        raise ValueError(
+            f"can't read query plans on {db.engine.dialect.name} (supported: {', '.join(DIALECTS)})"
+        )
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    report, seen = [], set()
+    for path in routes(user_id):
+        # a cached summary would hide the queries behind it
+        User.mark_all_changed([user_id])
+        db.session.commit()
+        with capture(db.engine) as statements:
+            response = client.get(path, headers={'Accept': 'text/html'})
+        if response.status_code >= 400:
+            raise RuntimeError(f"GET {path} returned {response.status_code}")
+        for statement, parameters in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            plan = explain(statement, parameters)
+            report.append((path, statement, plan, full_scans(plan)))
+    return report
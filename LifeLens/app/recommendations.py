@@ -0,0 +1,386 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from .models import db, RecommendationCache
+from .metrics import metrics
+from . import llm, jobs
+
+
+MODEL = "llama-3.1-8b-instant"
+
+# Bump when the prompt or parsing changes so cached answers aren't reused
+PROMPT_VERSION = 1
+
+CATEGORIES = ("activity", "mood", "nutrition", "habits")
+
+# What the page renders while an answer is still being generated
+EMPTY = {category: [] for category in CATEGORIES}
+
+# Seconds between writes of the cache hits counted in this process
+HITS_FLUSH_INTERVAL = 60
+
+
+def build_prompt(weekly_data):
+    return f"""
+    You are a wellness AI coach. Based on the user's weekly data below, 
+    generate personalized and actionable recommendations.
+
+    IMPORTANT: Generate EXACTLY 3 recommendations for EACH category with one High, one Medium, and one Low priority item.
+
+    The output MUST be ONLY valid JSON in this exact structure:
+
+    {{
+        "activity": [
+            {{
+                "title": "Recommendation 1",
+                "description": "Description for recommendation 1",
+                "priority": "High",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-running"
+            }},
+            {{
+                "title": "Recommendation 2",
+                "description": "Description for recommendation 2",
+                "priority": "Medium",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-dumbbell"
+            }},
+            {{
+                "title": "Recommendation 3",
+                "description": "Description for recommendation 3",
+                "priority": "Low",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-hiking"
+            }}
+        ],
+        "mood": [
+            {{
+                "title": "Recommendation 1",
+                "description": "Description for recommendation 1",
+                "priority": "High",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-smile"
+            }},
+            {{
+                "title": "Recommendation 2",
+                "description": "Description for recommendation 2",
+                "priority": "Medium",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-heart"
+            }},
+            {{
+                "title": "Recommendation 3",
+                "description": "Description for recommendation 3",
+                "priority": "Low",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-music"
+            }}
+        ],
+        "nutrition": [
+            {{
+                "title": "Recommendation 1",
+                "description": "Description for recommendation 1",
+                "priority": "High",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-apple-alt"
+            }},
+            {{
+                "title": "Recommendation 2",
+                "description": "Description for recommendation 2",
+                "priority": "Medium",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-water"
+            }},
+            {{
+                "title": "Recommendation 3",
+                "description": "Description for recommendation 3",
+                "priority": "Low",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-carrot"
+            }}
+        ],
+        "habits": [
+            {{
+                "title": "Recommendation 1",
+                "description": "Description for recommendation 1",
+                "priority": "High",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-check-circle"
+            }},
+            {{
+                "title": "Recommendation 2",
+                "description": "Description for recommendation 2",
+                "priority": "Medium",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-bullseye"
+            }},
+            {{
+                "title": "Recommendation 3",
+                "description": "Description for recommendation 3",
+                "priority": "Low",
+                "meta": ["detail1", "detail2"],
+                "icon": "fa-calendar"
+            }}
+        ]
+    }}
+
+    Return ONLY valid JSON. No extra text before or after.
+
+    USER WEEKLY DATA:
+    {json.dumps(weekly_data, indent=2)}
+    """
+
+
+def items(value):
+    """A category's recommendations trimmed to 3, or None unless they're a list of objects."""
+    if value is None:
+        return []
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value[:3]):
+        return None
+    return value[:3]
+
+
+def parse(content):
+    """The recommendations dict from the model's reply, trimmed to 3 per category."""
+    try:
+        result = json.loads(content)
+    except ValueError:
+        return {"error": "Invalid JSON returned by AI", "raw": content}
+    if not isinstance(result, dict):
+        return {"error": "Unexpected JSON returned by AI", "raw": content}
+    for category in CATEGORIES:
+        result[category] = items(result.get(category))
+        if result[category] is None:
+            return {"error": f"Unexpected {category} recommendations returned by AI", "raw": content}
+    return result
+
+
+def generate_ai_recommendations(weekly_data, client=None):
+    """Ask the model (or `client`) for recommendations. Returns (result, total_tokens)."""
+    response = (client or llm.get_client()).chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": build_prompt(weekly_data)}],
+        temperature=0.4
+    )
+    usage = getattr(response, "usage", None)
+    tokens = getattr(usage, "total_tokens", None) or 0
+    return parse(response.choices[0].message.content.strip()), tokens
+
+
+class CategoryStream:
+    """
+    Incremental parser for a streamed reply. feed() it text as it arrives and
+    it returns every top-level `"category": [...]` array that has closed,
+    without waiting for the rest of the JSON document.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.key = None
+        self.key_start = None
+        self.array_start = None
+        self.categories = {}
+
+    def feed(self, chunk):
+        self.text += chunk
+        finished = []
+        while self.pos < len(self.text):
+            ch = self.text[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.key_start is not None:
+                        self.key = json.loads(self.text[self.key_start:self.pos + 1])
+                        self.key_start = None
+            elif ch == '"':
+                self.in_string = True
+                # strings directly inside the top-level object are its keys
+                if self.depth == 1:
+                    self.key_start = self.pos
+            elif ch in "{[":
+                if self.depth == 1 and ch == "[":
+                    self.array_start = self.pos
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 1 and self.array_start is not None:
+                    raw = self.text[self.array_start:self.pos + 1]
+                    self.array_start = None
+                    if self.key in CATEGORIES and self.key not in self.categories:
+                        try:
+                            parsed = items(json.loads(raw))
+                        except ValueError:
+                            parsed = None
+                        if parsed is not None:
+                            self.categories[self.key] = parsed
+                            finished.append((self.key, parsed))
+            self.pos += 1
+        return finished
+
+    def result(self):
+        """The whole reply parsed, falling back to the categories seen if it's malformed."""
+        result = parse(self.text.strip())
+        if "error" in result and len(self.categories) == len(CATEGORIES):
+            return dict(self.categories)
+        return result
+
+
+def stream_ai_recommendations(weekly_data):
+    """
+    Streamed generate_ai_recommendations. Yields ("category", (name, items))
+    as each category's array completes, then ("done", (result, total_tokens)).
+    """
+    stream = llm.get_client().chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": build_prompt(weekly_data)}],
+        temperature=0.4,
+        stream=True
+    )
+    parser = CategoryStream()
+    tokens = 0
+    # closed even if the page goes away mid-reply, so the call's slot is freed
+    with stream:
+        for chunk in stream:
+            if chunk.choices:
+                for category in parser.feed(chunk.choices[0].delta.content or ""):
+                    yield "category", category
+            # Groq reports usage on the final chunk, under x_groq
+            usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if usage is not None:
+                tokens = usage.total_tokens or 0
+    yield "done", (parser.result(), tokens)
+
+
+def fingerprint(weekly_data):
+    """Canonical hash of the prompt inputs: equal data gives an equal key."""
+    canonical = json.dumps(
+        {"model": MODEL, "prompt": PROMPT_VERSION, "data": weekly_data},
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def lookup(user_id, key, now=None):
+    """The user's live cache row for `key`, or None."""
+    now = now or datetime.utcnow()
+    return RecommendationCache.query.filter(
+        RecommendationCache.user_id == user_id,
+        RecommendationCache.fingerprint == key,
+        RecommendationCache.expires_at > now
+    ).first()
+
+
+def store(user_id, key, result, tokens, now=None):
+    """Save a parsed result, replacing the user's older or expired rows for it."""
+    now = now or datetime.utcnow()
+    ttl = current_app.config["RECOMMENDATION_CACHE_TTL"]
+    RecommendationCache.query.filter(
+        RecommendationCache.user_id == user_id,
+        or_(RecommendationCache.fingerprint == key, RecommendationCache.expires_at <= now)
+    ).delete(synchronize_session=False)
+    row = RecommendationCache(
+        user_id=user_id, fingerprint=key, payload=json.dumps(result),
+        tokens=tokens, hits=0, created_at=now, expires_at=now + timedelta(seconds=ttl)
+    )
+    try:
+        # a concurrent request may have stored the same answer first
+        with db.session.begin_nested():
+            db.session.add(row)
+    except IntegrityError:
+        return None
+    return row
+
+
+def cached(user_id, weekly_data):
+    """(fingerprint, recommendations or None) for the user's current data."""
+    key = fingerprint(weekly_data)
+    row = lookup(user_id, key)
+    if row is None:
+        metrics.incr("recommendation_cache.misses")
+        return key, None
+    metrics.incr("recommendation_cache.hits")
+    metrics.incr("recommendation_cache.tokens_saved", row.tokens or 0)
+    cache_hits.add(row.id)
+    return key, json.loads(row.payload)
+
+
+class HitCounter:
+    """
+    Cache hits counted in memory and added to RecommendationCache.hits at
+    most every HITS_FLUSH_INTERVAL seconds, in a transaction of their own on
+    the primary: a hit is a read, and the caller's session (which may be on
+    a replica) is left alone.
+    """
+
+    def __init__(self):
+        self.pending = Counter()
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, row_id):
+        with self.lock:
+            self.pending[row_id] += 1
+            due = time.monotonic() - self.flushed_at >= HITS_FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            with db.engine.begin() as conn:
+                for row_id, count in pending.items():
+                    conn.execute(
+                        update(RecommendationCache).where(RecommendationCache.id == row_id)
+                        .values(hits=RecommendationCache.hits + count)
+                    )
+        except SQLAlchemyError:
+            # only statistics: log them and carry on
+            current_app.logger.exception("couldn't record %d recommendation cache hit(s)", sum(pending.values()))
+
+
+cache_hits = HitCounter()
+
+
+@jobs.handler("recommendation")
+def generate_job(job, weekly_data):
+    """Background job: generate and store the answer the page is waiting for."""
+    result, tokens = generate_ai_recommendations(weekly_data)
+    if "error" in result:
+        raise ValueError(result["error"])
+    store(job.user_id, job.key, result, tokens)
+
+
+def invalidate(user_id):
+    """Forget a user's cached answers so the next view asks the model again."""
+    RecommendationCache.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+
+
+def totals():
+    """Answers currently in the cache table, how often they were reused and the tokens that saved."""
+    cache_hits.flush()
+    rows, reused, saved = db.session.execute(
+        select(
+            func.count(RecommendationCache.id),
+            func.sum(RecommendationCache.hits),
+            func.sum(RecommendationCache.hits * RecommendationCache.tokens)
+        )
+    ).one()
+    return {"entries": rows or 0, "hits": int(reused or 0), "tokens_saved": int(saved or 0)}
@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, g, has_app_context, request
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy import select
+from .metrics import metrics
+
+
+def read_only(view):
+    """
+    Mark a GET-only view whose queries may be answered by a read replica.
+    Routes that also accept POST need their write handler split out first.
+    """
+    view.read_only = True
+    return view
+
+
+class RoutingSession(Session):
+    """
+    A session that sends plain SELECTs to the replica ReplicaRouter picked
+    for the current request (if any). The first write or locking read puts
+    the rest of the request back on the primary, so it reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get('db_replica') is not None:
+            if self._flushing or (clause is not None and (
+                    not getattr(clause, 'is_select', False)
+                    or getattr(clause, '_for_update_arg', None) is not None)):
+                g.db_replica = None
+            elif clause is not None:
+                return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    Chooses a replica for each request to a @read_only route: one whose
+    heartbeat shows it at most REPLICA_MAX_LAG seconds behind, and only for
+    users who haven't written in the sticky window. Lags are checked at
+    most every REPLICA_CHECK_INTERVAL seconds per process.
+    """
+
+    def __init__(self, app=None):
+        self.keys = ()
+        self._lags = {}  # bind key -> (checked at, lag in seconds or None)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('REPLICA_BINDS', ())
+        app.config.setdefault('REPLICA_MAX_LAG', 5)
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 10)
+        app.config.setdefault('REPLICA_CHECK_INTERVAL', 1)
+
+        self.keys = tuple(app.config['REPLICA_BINDS'])
+        self.max_lag = app.config['REPLICA_MAX_LAG']
+        # A write must have reached every replica we'd use by the time its
+        # author leaves the primary, so the window is never shorter than the lag
+        self.sticky = max(app.config['REPLICA_STICKY_SECONDS'], self.max_lag)
+        self.check_interval = app.config['REPLICA_CHECK_INTERVAL']
+        if self.keys:
+            app.before_request(self._route)
+        app.extensions['replica_router'] = self
+
+    def lag(self, key):
+        """Seconds the replica trails the primary's heartbeat; None if unknown or unreachable."""
+        now = time.monotonic()
+        with self._lock:
+            checked = self._lags.get(key)
+        if checked is not None and now - checked[0] < self.check_interval:
+            return checked[1]
+
+        # imported here: this module is loaded by app/__init__.py before the models
+        from . import db
+        from .models import ReplicaHeartbeat
+
+        try:
+            with db.engines[key].connect() as conn:
+                beat = conn.execute(select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)).scalar()
+            lag = (datetime.utcnow() - beat).total_seconds() if beat else None
+        except Exception:
+            metrics.incr('db.replica.errors')
+            lag = None
+        with self._lock:
+            self._lags[key] = (now, lag)
+        return lag
+
+    def pick(self):
+        """A replica within the lag tolerance, or None."""
+        usable = [key for key in self.keys if (lag := self.lag(key)) is not None and lag <= self.max_lag]
+        return random.choice(usable) if usable else None
+
+    def _route(self):
+        if request.method not in ('GET', 'HEAD'):
+            return
+        view = current_app.view_functions.get(request.endpoint)
+        if not getattr(view, 'read_only', False):
+            return
+        # loading the user here reads it from the primary
+        if not current_user.is_authenticated:
+            return
+        updated = current_user.data_updated_at
+        if updated is not None and updated > datetime.utcnow() - timedelta(seconds=self.sticky):
+            metrics.incr('db.replica.sticky')
+            return
+
+        key = self.pick()
+        if key is None:
+            metrics.incr('db.replica.unavailable')
+            return
+
+        from . import db
+        g.db_replica = db.engines[key]
+        metrics.incr('db.replica.routed')
+
+    def status(self):
+        """Each replica's lag as last measured."""
+        return {key: self.lag(key) for key in self.keys}
@@ -0,0 +1,233 @@
+from datetime import date, datetime
+from sqlalchemy import func, select
+from .models import db, DailyLog, Activity, Mood, Nutrition, HabitLog
+from . import archive, upsert, wellness_stats
+
+
+COUNTERS = (
+    'activity_count', 'calories_out',
+    'meal_count', 'calories_in', 'water', 'protein', 'carbs', 'fat',
+    'mood_count', 'mood_total', 'energy_total', 'stress_total',
+    'habits_completed',
+)
+
+
+def as_date(value):
+    """Entries are created from strptime() datetimes; the rollup keys on dates."""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _row(user_id, day):
+    """
+    Return the (user, day) rollup row, creating an empty one if needed. The
+    create is an upsert against uq_daily_log_user_date, so two first writes
+    for the same day (a double submit, two tabs) both end up on one row.
+
+    The row is read fresh and locked (FOR UPDATE; on SQLite the upsert has
+    already taken the write lock) until the caller commits, so the values
+    record_activity/record_mood read as the day's old point can't go stale
+    before their deltas are applied.
+    """
+    upsert.insert_missing(
+        DailyLog, ('user_id', 'date'),
+        user_id=user_id, date=day, **{name: 0 for name in COUNTERS}
+    )
+    return (
+        DailyLog.query.filter_by(user_id=user_id, date=day)
+        .with_for_update().populate_existing().one()
+    )
+
+
+def adjust(user_id, day, **deltas):
+    """
+    Add deltas to the rollup row for (user, day).
+
+    Existing rows are updated with `col = col + delta` so concurrent writers
+    don't lose each other's increments.
+    """
+    return _apply(_row(user_id, as_date(day)), deltas)
+
+
+def _apply(row, deltas):
+    for name, delta in deltas.items():
+        if delta:
+            setattr(row, name, getattr(DailyLog, name) + delta)
+    return row
+
+
+def _point(row):
+    """The day's (activity_count, calories_out, first_mood_score) as loaded."""
+    return (row.activity_count or 0, row.calories_out or 0, row.first_mood_score or 0)
+
+
+def record_activity(activity, sign=1):
+    row = _row(activity.user_id, as_date(activity.date))
+    before = _point(row)
+    calories = sign * (activity.calories or 0)
+    _apply(row, {'activity_count': sign, 'calories_out': calories})
+    wellness_stats.move(activity.user_id, before, (before[0] + sign, before[1] + calories, before[2]))
+    return row
+
+
+def record_meal(meal, sign=1):
+    return adjust(
+        meal.user_id, meal.date,
+        meal_count=sign,
+        calories_in=sign * (meal.calories or 0),
+        water=sign * (meal.water or 0),
+        protein=sign * (meal.protein or 0),
+        carbs=sign * (meal.carbs or 0),
+        fat=sign * (meal.fat or 0)
+    )
+
+
+def record_mood(mood, sign=1):
+    """Count a mood entry in (or, with sign=-1, out of) its day's rollup."""
+    if mood.id is None:
+        db.session.flush()
+    day = as_date(mood.date)
+    row = _row(mood.user_id, day)
+    before = _point(row)
+    _apply(row, {
+        'mood_count': sign,
+        'mood_total': sign * mood.mood_score,
+        'energy_total': sign * mood.energy_score,
+        'stress_total': sign * mood.stress_score
+    })
+
+    # The day's chart value is its first logged entry
+    if sign > 0:
+        if row.first_mood_id is None or mood.id < row.first_mood_id:
+            row.first_mood_id = mood.id
+            row.first_mood_score = mood.mood_score
+    elif row.first_mood_id == mood.id:
+        moods = archive.source(Mood, mood.user_id, day)
+        replacement = db.session.execute(
+            select(moods.id, moods.mood_score).where(
+                moods.user_id == mood.user_id,
+                moods.date == day,
+                moods.id != mood.id
+            ).order_by(moods.id).limit(1)
+        ).first()
+        row.first_mood_id = replacement.id if replacement else None
+        row.first_mood_score = replacement.mood_score if replacement else None
+
+    wellness_stats.move(mood.user_id, before, (before[0], before[1], row.first_mood_score or 0))
+    return row
+
+
+def record_habit_completion(user_id, day, sign=1):
+    return adjust(user_id, day, habits_completed=sign)
+
+
+def forget_habit_logs(habit_id, user_id):
+    """Take a habit's completed logs out of the rollup before it's deleted."""
+    logs = archive.source(HabitLog, user_id)
+    rows = db.session.execute(
+        select(logs.date, func.count(logs.id))
+        .where(logs.habit_id == habit_id, logs.is_completed.is_(True))
+        .group_by(logs.date)
+    ).all()
+    for day, completed in rows:
+        adjust(user_id, day, habits_completed=-completed)
+
+
+def rebuild(user_id=None, days=None):
+    """
+    Recompute rollup rows from the raw tables, for one user or everyone,
+    optionally only on the given `days`. Returns the number of rows
+    written. The caller commits.
+    """
+    def scoped(stmt, model):
+        if user_id is not None:
+            stmt = stmt.where(model.user_id == user_id)
+        if days is not None:
+            stmt = stmt.where(model.date.in_(days))
+        return stmt
+
+    # archived rows still count towards their days
+    if user_id is None or archive.reaches(user_id, min(days) if days else None):
+        activity, nutrition, mood, habit_log = (
+            archive.including(model) for model in (Activity, Nutrition, Mood, HabitLog)
+        )
+    else:
+        activity, nutrition, mood, habit_log = Activity, Nutrition, Mood, HabitLog
+
+    totals = {}
+
+    def add(uid, day, **values):
+        entry = totals.setdefault((uid, as_date(day)), {name: 0 for name in COUNTERS})
+        entry.update(values)
+
+    for uid, day, count, calories in db.session.execute(scoped(
+        select(activity.user_id, activity.date, func.count(activity.id), func.sum(activity.calories))
+        .group_by(activity.user_id, activity.date), activity
+    )):
+        add(uid, day, activity_count=count, calories_out=int(calories or 0))
+
+    for uid, day, count, calories, water, protein, carbs, fat in db.session.execute(scoped(
+        select(
+            nutrition.user_id, nutrition.date, func.count(nutrition.id),
+            func.sum(nutrition.calories), func.sum(nutrition.water),
+            func.sum(nutrition.protein), func.sum(nutrition.carbs), func.sum(nutrition.fat)
+        ).group_by(nutrition.user_id, nutrition.date), nutrition
+    )):
+        add(uid, day, meal_count=count, calories_in=int(calories or 0), water=int(water or 0),
+            protein=int(protein or 0), carbs=int(carbs or 0), fat=int(fat or 0))
+
+    per_day = scoped(
+        select(
+            mood.user_id.label('user_id'),
+            mood.date.label('date'),
+            func.min(mood.id).label('first_id'),
+            func.count(mood.id).label('entries'),
+            func.sum(mood.mood_score).label('mood_total'),
+            func.sum(mood.energy_score).label('energy_total'),
+            func.sum(mood.stress_score).label('stress_total')
+        ).group_by(mood.user_id, mood.date), mood
+    ).subquery()
+    for uid, day, first_id, entries, mood_total, energy_total, stress_total, first_score in db.session.execute(
+        select(per_day, mood.mood_score).join(mood, mood.id == per_day.c.first_id)
+    ):
+        add(uid, day, mood_count=entries, mood_total=int(mood_total or 0),
+            energy_total=int(energy_total or 0), stress_total=int(stress_total or 0),
+            first_mood_id=first_id, first_mood_score=first_score)
+
+    for uid, day, completed in db.session.execute(scoped(
+        select(habit_log.user_id, habit_log.date, func.count(habit_log.id))
+        .where(habit_log.is_completed.is_(True))
+        .group_by(habit_log.user_id, habit_log.date), habit_log
+    )):
+        add(uid, day, habits_completed=completed)
+
+    # Reset every existing row in scope, then write the fresh totals over it
+    existing = scoped(DailyLog.query, DailyLog)
+    cleared = {name: 0 for name in COUNTERS}
+    cleared.update(first_mood_id=None, first_mood_score=None)
+    rows = {}
+    for row in existing:
+        for name, value in cleared.items():
+            setattr(row, name, value)
+        rows[(row.user_id, as_date(row.date))] = row
+
+    for (uid, day), values in totals.items():
+        row = rows.get((uid, day))
+        if row is None:
+            row = DailyLog(user_id=uid, date=day, **cleared)
+            db.session.add(row)
+        for name, value in values.items():
+            setattr(row, name, value)
+
+    return len(totals)
+
+
+def range_rows(user_id, start, end=None):
+    """Rollup rows for a user from `start` (and up to `end`), keyed by date."""
+    query = DailyLog.query.filter(DailyLog.user_id == user_id, DailyLog.date >= start)
+    if end is not None:
+        query = query.filter(DailyLog.date <= end)
+    return {as_date(row.date): row for row in query}
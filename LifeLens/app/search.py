@@ -0,0 +1,166 @@
+import re
+from sqlalchemy import DDL, event, exists, func, insert, literal, select, text
+from sqlalchemy.dialects.mysql import match
+from .models import db, Activity, Mood, Nutrition, SearchEntry
+from . import archive
+
+
+PER_PAGE = 20
+
+# Longer queries are cut to this many terms
+MAX_TERMS = 8
+
+# kind -> (model, the text columns a search looks through)
+SOURCES = {
+    'activity': (Activity, ('title', 'category', 'notes')),
+    'mood': (Mood, ('mood_type', 'notes')),
+    'nutrition': (Nutrition, ('meal_type', 'food_items', 'notes')),
+}
+
+
+# SQLite keeps an external-content FTS5 index over search_entry, synced by
+# triggers; MySQL uses the FULLTEXT index declared on the model instead.
+# user_id is indexed too, so a search can MATCH the user's own entries
+# (`user_id : "3" AND ...`) rather than every user's and filter after
+FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_entry_fts USING fts5("
+    "body, user_id, content='search_entry', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ai AFTER INSERT ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(rowid, body, user_id) VALUES (new.id, new.body, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ad AFTER DELETE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body, user_id) "
+    "VALUES ('delete', old.id, old.body, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_au AFTER UPDATE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body, user_id) "
+    "VALUES ('delete', old.id, old.body, old.user_id); "
+    "INSERT INTO search_entry_fts(rowid, body, user_id) VALUES (new.id, new.body, new.user_id); END",
+)
+
+for statement in FTS_DDL:
+    event.listen(SearchEntry.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+event.listen(
+    SearchEntry.__table__, 'before_drop',
+    DDL("DROP TABLE IF EXISTS search_entry_fts").execute_if(dialect='sqlite')
+)
+
+# bm25 weights: rank on the body alone; the user_id column only scopes the match
+FTS_QUERY = text("""
+    SELECT e.kind, e.entry_id, e.date, e.body, -bm25(search_entry_fts, 1.0, 0.0) AS score
+    FROM search_entry_fts JOIN search_entry e ON e.id = search_entry_fts.rowid
+    WHERE search_entry_fts MATCH :terms AND e.user_id = :user_id
+    ORDER BY bm25(search_entry_fts, 1.0, 0.0), e.date DESC, e.id DESC
+    LIMIT :limit OFFSET :offset
+""").columns(kind=db.String, entry_id=db.Integer, date=db.Date, body=db.Text, score=db.Float)
+
+
+def _body(model, columns):
+    """SQL for an entry's searchable text: its text columns joined by spaces."""
+    body = func.coalesce(getattr(model, columns[0]), '')
+    for name in columns[1:]:
+        body = body + literal(' ') + func.coalesce(getattr(model, name), '')
+    return body
+
+
+def index(kind, user_id, entry_ids=None, after_id=None, archived=False):
+    """
+    Add a user's `kind` entries to the search index: the given `entry_ids`,
+    those with ids after `after_id`, or all of them (from the archive table
+    with `archived`). Entries already indexed are left alone. One
+    INSERT ... SELECT; the caller commits.
+    """
+    model, columns = SOURCES[kind]
+    if archived:
+        model = archive.ARCHIVES[model]
+    source = select(model.user_id, literal(kind), model.id, model.date, _body(model, columns)).where(
+        model.user_id == user_id,
+        ~exists().where(SearchEntry.kind == kind, SearchEntry.entry_id == model.id)
+    )
+    if entry_ids is not None:
+        source = source.where(model.id.in_(entry_ids))
+    if after_id is not None:
+        source = source.where(model.id > after_id)
+    db.session.execute(insert(SearchEntry).from_select(
+        ['user_id', 'kind', 'entry_id', 'date', 'body'], source
+    ))
+
+
+def forget(kind, entry_ids):
+    """Drop entries from the search index (before or after they're deleted)."""
+    SearchEntry.query.filter(
+        SearchEntry.kind == kind, SearchEntry.entry_id.in_(list(entry_ids))
+    ).delete(synchronize_session=False)
+
+
+def rebuild(user_id=None):
+    """Re-index everything, for one user or everyone. Returns the entry count."""
+    from .models import User
+
+    existing = SearchEntry.query
+    if user_id is not None:
+        existing = existing.filter_by(user_id=user_id)
+    existing.delete(synchronize_session=False)
+    user_ids = [user_id] if user_id is not None else db.session.execute(select(User.id)).scalars().all()
+    for uid in user_ids:
+        for kind in SOURCES:
+            index(kind, uid)
+            index(kind, uid, archived=True)
+    stmt = select(func.count(SearchEntry.id))
+    if user_id is not None:
+        stmt = stmt.where(SearchEntry.user_id == user_id)
+    return db.session.execute(stmt).scalar()
+
+
+def terms(query):
+    """The words of a search box query, lower-cased and capped at MAX_TERMS."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _substring_search(user_id, words, limit, offset):
+    """Without a full-text index: the user's entries containing every word, newest first."""
+    stmt = select(
+        SearchEntry.kind, SearchEntry.entry_id, SearchEntry.date, SearchEntry.body,
+        literal(0.0).label('score')
+    ).where(SearchEntry.user_id == user_id)
+    for word in words:
+        # terms() leaves only word characters; _ is the one LIKE wildcard among them
+        pattern = '%' + word.replace('_', '\\_') + '%'
+        stmt = stmt.where(func.lower(SearchEntry.body).like(pattern, escape='\\'))
+    return db.session.execute(
+        stmt.order_by(SearchEntry.date.desc(), SearchEntry.id.desc()).limit(limit).offset(offset)
+    ).all()
+
+
+def search(user_id, query, page=1, per_page=PER_PAGE):
+    """
+    A user's entries matching every word of `query` (words also match as
+    prefixes), best match first; on a database without a full-text index,
+    entries containing every word, newest first. Returns (results,
+    has_next) where each result is a dict of kind, entry_id, date, body and
+    score.
+    """
+    words = terms(query)
+    if not words:
+        return [], False
+    offset = (page - 1) * per_page
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        rows = db.session.execute(FTS_QUERY, {
+            "terms": f'user_id : "{int(user_id)}" AND body : (' + ' '.join(f'"{word}"*' for word in words) + ')',
+            "user_id": user_id, "limit": per_page + 1, "offset": offset
+        }).all()
+    elif dialect == 'mysql':
+        relevance = match(SearchEntry.body, against=' '.join(f'+{word}*' for word in words)).in_boolean_mode()
+        rows = db.session.execute(
+            select(
+                SearchEntry.kind, SearchEntry.entry_id, SearchEntry.date, SearchEntry.body,
+                relevance.label('score')
+            )
+            .where(SearchEntry.user_id == user_id, relevance)
+            .order_by(relevance.desc(), SearchEntry.date.desc(), SearchEntry.id.desc())
+            .limit(per_page + 1).offset(offset)
+        ).all()
+    else:
+        rows = _substring_search(user_id, words, per_page + 1, offset)
+
+    return [row._asdict() for row in rows[:per_page]], len(rows) > per_page
@@ -360,3 +360,157 @@ function showNotification(message, type) {
 }
 
 // ============================== ANALYTICS ====================================================
+
+// ====================================== HISTORY LISTS ===============================================
+
+function escapeHtml(value) {
+  const div = document.createElement("div");
+  div.textContent = value == null ? "" : String(value);
+  return div.innerHTML;
+}
+
+const MOOD_EMOJI = {
+  happy: "😊",
+  sad: "😢",
+  neutral: "😐",
+  stressed: "😣",
+  excited: "😄",
+  anxious: "😰",
+};
+const MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"];
+const MEAL_ICONS = { breakfast: "fa-coffee", lunch: "fa-utensils", dinner: "fa-moon" };
+
+// "2024-03-07" -> "07/03/2024", or "07 Mar 2024" with long=true (as the templates show it)
+function formatDay(iso, long = false) {
+  const [year, month, day] = iso.split("-");
+  return long ? `${day} ${MONTHS[parseInt(month) - 1]} ${year}` : `${day}/${month}/${year}`;
+}
+
+// Card markup per list, matching the server-rendered cards in each template
+const HISTORY_CARDS = {
+  activity: (act) => `
+    <div class="activity-card">
+      <div class="activity-card-header">
+        <div class="activity-card-title">
+          <h3>${escapeHtml(act.title)}</h3>
+          <p>${escapeHtml(act.category)}</p>
+        </div>
+        <div style="display: flex; gap: 0.5rem; align-items: center;">
+          <span class="activity-intensity-badge activity-badge-${escapeHtml(act.intensity)}">${escapeHtml(act.intensity)}</span>
+          ${act.archived ? "" : `
+          <button class="activity-delete-btn" onclick="deleteActivity(${act.id})" title="Delete activity">
+            <i class="fas fa-trash-alt"></i>
+          </button>`}
+        </div>
+      </div>
+      <div style="display: flex; justify-content: space-between; align-items: end;">
+        <div class="activity-card-stats">
+          <div class="activity-stat-item"><i class="fas fa-clock"></i><span>${act.duration} min</span></div>
+          <div class="activity-stat-item"><i class="fas fa-fire"></i><span>${act.calories} cal</span></div>
+        </div>
+        <div class="activity-card-date">${formatDay(act.date)}</div>
+      </div>
+      ${act.notes ? `<div class="activity-card-notes" style="margin-top: 1rem;">${escapeHtml(act.notes)}</div>` : ""}
+    </div>`,
+
+  mood: (mood) => `
+    <div class="mood-card">
+      <div class="mood-card-header">
+        <div class="mood-card-title-section">
+          <div class="mood-emoji-circle">${MOOD_EMOJI[mood.mood_type] || ""}</div>
+          <div class="mood-card-title-text">
+            <h3>${escapeHtml(mood.mood_type.charAt(0).toUpperCase() + mood.mood_type.slice(1).toLowerCase())}</h3>
+            <p>${formatDay(mood.date, true)}</p>
+          </div>
+        </div>
+        <div style="display: flex; gap: 0.75rem; align-items: center;">
+          <div class="mood-score-badge">${mood.mood_score}</div>
+          ${mood.archived ? "" : `
+          <button class="mood-delete-btn" onclick="deleteMood(${mood.id})" title="Delete mood">
+            <i class="fas fa-trash-alt"></i>
+          </button>`}
+        </div>
+      </div>
+      <div class="mood-stats-row">
+        <div class="mood-stat-item"><div class="mood-stat-label">Mood</div><div class="mood-stat-value">${mood.mood_score}/10</div></div>
+        <div class="mood-stat-item"><div class="mood-stat-label">Energy</div><div class="mood-stat-value">${mood.energy_score}/10</div></div>
+        <div class="mood-stat-item"><div class="mood-stat-label">Stress</div><div class="mood-stat-value">${mood.stress_score}/10</div></div>
+      </div>
+      ${mood.notes ? `<div class="mood-notes-section">${escapeHtml(mood.notes)}</div>` : ""}
+    </div>`,
+
+  nutrition: (meal) => `
+    <div class="nutrition-card">
+      <div class="nutrition-card-header">
+        <div class="nutrition-meal-info">
+          <div class="nutrition-meal-icon"><i class="fas ${MEAL_ICONS[meal.meal_type] || "fa-cookie"}"></i></div>
+          <div class="nutrition-meal-title">
+            <h3>${escapeHtml(meal.meal_type)}</h3>
+            <p>${formatDay(meal.date)}</p>
+          </div>
+        </div>
+        <div style="display: flex; gap: 0.75rem; align-items: center;">
+          <div class="nutrition-calories-badge">
+            <div class="nutrition-calories-number">${meal.calories}</div>
+            <div class="nutrition-calories-label">calories</div>
+          </div>
+          ${meal.archived ? "" : `
+          <button class="nutrition-delete-btn" onclick="deleteNutrition(${meal.id})" title="Delete nutrition">
+            <i class="fas fa-trash-alt"></i>
+          </button>`}
+        </div>
+      </div>
+      <div class="nutrition-food-items">
+        <div class="nutrition-food-label">Food Items:</div>
+        <div class="nutrition-food-list">${escapeHtml(meal.food_items)}</div>
+      </div>
+      <div class="nutrition-macros-grid">
+        <div class="nutrition-macro-item"><div class="nutrition-macro-label">Protein</div><div class="nutrition-macro-value">${meal.protein}g</div></div>
+        <div class="nutrition-macro-item"><div class="nutrition-macro-label">Carbs</div><div class="nutrition-macro-value">${meal.carbs}g</div></div>
+        <div class="nutrition-macro-item"><div class="nutrition-macro-label">Fat</div><div class="nutrition-macro-value">${meal.fat}g</div></div>
+        <div class="nutrition-macro-item"><div class="nutrition-macro-label"><i class="fas fa-tint"></i></div><div class="nutrition-macro-value">${meal.water}ml</div></div>
+      </div>
+      ${meal.notes ? `<div class="nutrition-notes-section">${escapeHtml(meal.notes)}</div>` : ""}
+    </div>`,
+};
+
+// Infinite scroll: fetch the next page when the "loading more" marker
+// comes into view, until the server stops returning a next page
+function setupHistoryScroll() {
+  const list = document.getElementById("historyList");
+  const more = document.getElementById("historyMore");
+  if (!list || !more) return;
+
+  let loading = false;
+  const observer = new IntersectionObserver(
+    async (entries) => {
+      if (!entries[0].isIntersecting || loading) return;
+      loading = true;
+      try {
+        const resp = await fetch(more.dataset.nextUrl, { headers: { Accept: "application/json" } });
+        const data = await resp.json();
+        if (!resp.ok) throw new Error(data.error || "Failed to load more entries");
+
+        list.insertAdjacentHTML("beforeend", data.items.map(HISTORY_CARDS[list.dataset.kind]).join(""));
+        if (data.next) {
+          more.dataset.nextUrl = data.next;
+          // re-check: the marker may still be on screen after a short page
+          observer.unobserve(more);
+          observer.observe(more);
+        } else {
+          observer.disconnect();
+          more.remove();
+        }
+      } catch (err) {
+        console.error(err);
+        showNotification("Couldn't load more entries", "error");
+      } finally {
+        loading = false;
+      }
+    },
+    { rootMargin: "400px" }
+  );
+  observer.observe(more);
+}
+
+document.addEventListener("DOMContentLoaded", setupHistoryScroll);
@@ -0,0 +1,144 @@
+from datetime import date, timedelta
+from sqlalchemy import func, select
+from .models import db, Habit, HabitLog
+from .rollup import as_date
+from . import archive
+
+
+def completed_dates(user_id, habit_ids=None, until=None):
+    """
+    Completed days per habit, newest first, from a single query over all of
+    a user's habits (or just `habit_ids`). Days after `until` are skipped.
+    """
+    logs = archive.source(HabitLog, user_id)
+    stmt = (
+        select(logs.habit_id, logs.date)
+        .join(Habit, Habit.id == logs.habit_id)
+        .where(
+            Habit.user_id == user_id,
+            logs.user_id == user_id,
+            logs.is_completed.is_(True)
+        )
+        .order_by(logs.habit_id, logs.date.desc())
+    )
+    if habit_ids is not None:
+        stmt = stmt.where(logs.habit_id.in_(list(habit_ids)))
+    if until is not None:
+        stmt = stmt.where(logs.date <= until)
+
+    dates = {}
+    for habit_id, day in db.session.execute(stmt):
+        day = as_date(day)
+        days = dates.setdefault(habit_id, [])
+        # duplicate logs for the same day count once
+        if not days or days[-1] != day:
+            days.append(day)
+    return dates
+
+
+def streak_from_dates(days, today):
+    """
+    Consecutive completed days counted back from the most recent completed
+    day on or before `today`. `days` must be unique and newest first.
+    """
+    streak = 0
+    expected = None
+    for day in days:
+        if day > today:
+            continue
+        if expected is not None and day != expected:
+            break
+        streak += 1
+        expected = day - timedelta(days=1)
+    return streak
+
+
+def longest_run(days):
+    """Length of the longest run of consecutive days in a newest-first list."""
+    longest = run = 0
+    previous = None
+    for day in days:
+        run = run + 1 if previous is not None and day == previous - timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    return longest
+
+
+def active_streak(user_id, today=None):
+    """The longest live streak among a user's habits, read from the counters."""
+    today = today or date.today()
+    return db.session.execute(
+        select(func.max(Habit.current_streak)).where(
+            Habit.user_id == user_id,
+            Habit.last_completed_date >= today - timedelta(days=1)
+        )
+    ).scalar() or 0
+
+
+def record_completion(habit, day):
+    """Update a habit's counters in O(1) after `day` was marked complete."""
+    if habit.last_completed_date == day:
+        return
+    if habit.last_completed_date == day - timedelta(days=1) and habit.current_streak:
+        habit.current_streak += 1
+    else:
+        # a new run: every earlier one is now behind it
+        habit.longest_before_current = habit.longest_streak or 0
+        habit.current_streak = 1
+    habit.last_completed_date = day
+    habit.longest_streak = max(habit.longest_before_current or 0, habit.current_streak)
+
+
+def record_uncompletion(habit, day):
+    """Update a habit's counters in O(1) after `day` (its latest completion) was un-marked."""
+    if habit.last_completed_date != day or not habit.current_streak:
+        # counters out of step with the logs; rebuild this habit from scratch
+        repair([habit], day)
+        return
+
+    if habit.current_streak > 1:
+        habit.current_streak -= 1
+        habit.last_completed_date = day - timedelta(days=1)
+    else:
+        # the previous completion (if any) is older than yesterday, so no
+        # streak carries over
+        habit.current_streak = 0
+        logs = archive.source(HabitLog, habit.user_id)
+        habit.last_completed_date = db.session.execute(
+            select(func.max(logs.date)).where(
+                logs.habit_id == habit.id,
+                logs.is_completed.is_(True),
+                logs.date < day
+            )
+        ).scalar()
+    # the earlier runs are untouched, and the current one is a day shorter
+    habit.longest_streak = max(habit.longest_before_current or 0, habit.current_streak)
+
+
+def repair(habits, today=None):
+    """Recompute counters for the given habits from habit_log."""
+    today = today or date.today()
+    by_user = {}
+    for habit in habits:
+        by_user.setdefault(habit.user_id, []).append(habit)
+
+    for user_id, user_habits in by_user.items():
+        dates = completed_dates(user_id, [h.id for h in user_habits], until=today)
+        for habit in user_habits:
+            days = dates.get(habit.id, [])
+            live = bool(days) and days[0] >= today - timedelta(days=1)
+            habit.last_completed_date = days[0] if days else None
+            habit.current_streak = streak_from_dates(days, today) if live else 0
+            habit.longest_streak = longest_run(days)
+            # the current streak is the newest `current_streak` days
+            habit.longest_before_current = longest_run(days[habit.current_streak:])
+
+
+def roll_over(today=None):
+    """Zero the counters of habits whose streak broke before `today`."""
+    today = today or date.today()
+    return Habit.query.filter(
+        Habit.current_streak > 0,
+        db.or_(Habit.last_completed_date.is_(None), Habit.last_completed_date < today - timedelta(days=1))
+    ).update({Habit.current_streak: 0, Habit.longest_before_current: Habit.longest_streak},
+             synchronize_session=False)
@@ -0,0 +1,237 @@
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from .models import db, Mood, MoodArchive, Habit, HabitLog, DailyLog
+from .rollup import as_date
+from .features import UserWeekFeatures
+from .streaks import active_streak
+from . import archive
+
+
+def habit_counts(user_id, day):
+    """Return (total_habits, completed_on_day) with a single round trip."""
+    total = select(func.count(Habit.id)).where(Habit.user_id == user_id).scalar_subquery()
+    completed = select(func.count(HabitLog.id)).where(
+        HabitLog.user_id == user_id,
+        HabitLog.date == day,
+        HabitLog.is_completed.is_(True)
+    ).scalar_subquery()
+    row = db.session.execute(select(total, completed)).one()
+    return row[0] or 0, row[1] or 0
+
+
+def dashboard_summary(user_id, today=None):
+    """
+    Every value the dashboard renders, read from the daily rollup with a
+    fixed handful of queries regardless of data volume.
+    """
+    today = today or date.today()
+    # The week cards count from 7 days back (8 days, plus anything dated
+    # later); the charts show the last 7
+    week = UserWeekFeatures.get(user_id, today, days=8)
+    chart = week.window(7)
+
+    # Mood data (a plain dict so the summary can be cached across requests)
+    latest = Mood.query.filter_by(user_id=user_id).order_by(Mood.date.desc()).first()
+    before = archive.boundary(user_id)
+    if before is not None and (latest is None or as_date(latest.date) < before):
+        # the newest entry may have been archived
+        older = MoodArchive.query.filter_by(user_id=user_id).order_by(MoodArchive.date.desc()).first()
+        if older is not None and (latest is None or as_date(older.date) > as_date(latest.date)):
+            latest = older
+    latest_mood = {
+        "mood_score": latest.mood_score,
+        "energy_score": latest.energy_score,
+        "stress_score": latest.stress_score,
+        "date": latest.date
+    } if latest else None
+
+    # The water/calorie cards show the most recent day with meals; only when
+    # there's none this week (or later) does that need another query
+    if week.after['meal_count'] or not week['meal_count'].any():
+        display = db.session.execute(
+            select(DailyLog.water, DailyLog.calories_in)
+            .where(DailyLog.user_id == user_id, DailyLog.meal_count > 0)
+            .order_by(DailyLog.date.desc())
+            .limit(1)
+        ).first()
+        today_water = display.water if display else 0
+        calories_today = display.calories_in if display else 0
+    else:
+        last = np.flatnonzero(week['meal_count'])[-1]
+        today_water = int(week['water'][last])
+        calories_today = int(week['calories_in'][last])
+    week_water_total = week.total('water')
+
+    # Activity
+    today_activity_count = int(week['activity_count'][-1])
+    today_calories_burned = int(week['calories_out'][-1])
+    total_weekly_activities = week.total('activity_count')
+    weekly_activities = chart.activities.tolist()
+
+    # Mood: the first entry logged each day feeds the chart,
+    # the count/total feed the weekly average
+    weekly_mood = chart.mood.tolist()
+    mood_entries = week.total('mood_count')
+    mood_total = week.total('mood_total')
+    avg_mood = round(mood_total / mood_entries) if mood_entries else 0
+
+    # Habits today
+    total_habits, completed_today = habit_counts(user_id, today)
+    completion_rate = round((completed_today / total_habits * 100) if total_habits > 0 else 0)
+
+    return {
+        "latest_mood": latest_mood,
+        "today_water": today_water,
+        "week_water_total": week_water_total,
+        "total_habits": total_habits,
+        "completed_today": completed_today,
+        "completion_rate": completion_rate,
+        "today_calories_burned": today_calories_burned,
+        "today_activity_count": today_activity_count,
+        "calories_today": calories_today,
+        "total_weekly_activities": total_weekly_activities,
+        "weekly_mood": weekly_mood,
+        "weekly_activities": weekly_activities,
+        "day_labels": [d.strftime('%a') for d in chart.dates],
+        "avg_mood": avg_mood,
+        "longest_streak": active_streak(user_id, today)
+    }
+
+
+ANALYTICS_WINDOWS = (7, 30, 90, 365)
+
+def analytics_summary(user_id, today=None, window=7):
+    """Chart series and stat-card values for the analytics page over `window` days."""
+    today = today or date.today()
+    start = today - timedelta(days=window - 1)
+
+    daily = UserWeekFeatures.get(user_id, today, window)
+    day_labels = [d.strftime("%a" if window <= 7 else "%d %b") for d in daily.dates]
+
+    # Activities and calories burned per day
+    weekly_activities = daily.activities
+    weekly_calories = daily.calories
+
+    # Mood: first entry per day, 0 where nothing was logged
+    weekly_mood = daily.mood
+    logged = weekly_mood > 0
+    avg_mood = round(float(weekly_mood[logged].mean()), 1) if logged.any() else 0
+
+    # Habit Stats
+    total_habits, completed_today = habit_counts(user_id, today)
+    habit_success = int((completed_today/total_habits)*100) if total_habits else 0
+
+    # Water Intake Today
+    today_water = int(daily['water'][-1])
+
+    # 1. MOOD DISTRIBUTION PIE CHART (mood types in the window, in order of first use)
+    moods = archive.source(Mood, user_id, start)
+    mood_dist = {
+        mood_type: count
+        for mood_type, count in db.session.execute(
+            select(moods.mood_type, func.count(moods.id))
+            .where(moods.user_id == user_id, moods.date >= start)
+            .group_by(moods.mood_type)
+            .order_by(func.min(moods.id))
+        )
+    }
+    mood_labels = list(mood_dist.keys()) if mood_dist else ["No Data"]
+    mood_counts = list(mood_dist.values()) if mood_dist else [0]
+
+    # 2. MACRO BREAKDOWN PIE CHART (everything logged since the window started)
+    macro_labels = ["Protein", "Carbs", "Fat"]
+    macro_values = [daily.total(m) for m in ('protein', 'carbs', 'fat')]
+
+    # 3. HABIT COMPLETION TREND
+    if total_habits > 0:
+        habit_completion_trend = (daily['habits_completed'] / total_habits * 100).astype(int)
+    else:
+        habit_completion_trend = np.zeros(window, dtype=int)
+
+    # 4. SCATTER: MOOD VS ACTIVITY (only days with a mood logged)
+    scatter_data = [
+        {"x": int(x), "y": int(y)}
+        for x, y in zip(weekly_activities[logged], weekly_mood[logged])
+    ]
+
+    return {
+        "window": window,
+        "weekly_activities": weekly_activities.tolist(),
+        "weekly_calories": weekly_calories.tolist(),
+        "weekly_mood": weekly_mood.tolist(),
+        "day_labels": day_labels,
+        "mood_labels": mood_labels,
+        "mood_counts": mood_counts,
+        "macro_labels": macro_labels,
+        "macro_values": macro_values,
+        "calories_in": daily['calories_in'].tolist(),
+        "calories_out": weekly_calories.tolist(),
+        "habit_completion_trend": habit_completion_trend.tolist(),
+        "scatter_data": scatter_data,
+        "total_weekly_activities": int(weekly_activities.sum()),
+        "total_calories_burned": int(weekly_calories.sum()),
+        "avg_mood": avg_mood,
+        "habit_success": habit_success,
+        "completed_today": completed_today,
+        "today_water": today_water,
+        "longest_streak": active_streak(user_id, today)
+    }
+
+
+def recommendation_weekly_data(user_id, today=None):
+    """The weekly snapshot the recommendation prompt is built from."""
+    today = today or date.today()
+    week = UserWeekFeatures.get(user_id, today, 7)
+
+    total_habits, completed_today = habit_counts(user_id, today)
+    habit_success = int((completed_today/total_habits)*100) if total_habits else 0
+
+    return {
+        "activities": week.activities.tolist(),
+        "mood": week.mood.tolist(),
+        "calories": week.calories.tolist(),
+        "water_today": int(week['water'][-1]),
+        "habit_success": habit_success
+    }
+
+
+def bulk_recommendation_weekly_data(user_ids, today=None):
+    """
+    recommendation_weekly_data for many users at once: three queries in
+    total rather than a few per user. Returns {user_id: weekly_data}.
+    """
+    today = today or date.today()
+    user_ids = list(user_ids)
+    days = [(today - timedelta(days=i)) for i in range(6, -1, -1)]
+
+    rows = {}
+    for row in DailyLog.query.filter(
+        DailyLog.user_id.in_(user_ids), DailyLog.date >= days[0], DailyLog.date <= today
+    ):
+        rows[(row.user_id, as_date(row.date))] = row
+
+    totals = dict(db.session.execute(
+        select(Habit.user_id, func.count(Habit.id))
+        .where(Habit.user_id.in_(user_ids))
+        .group_by(Habit.user_id)
+    ).all())
+    completed = dict(db.session.execute(
+        select(HabitLog.user_id, func.count(HabitLog.id))
+        .where(HabitLog.user_id.in_(user_ids), HabitLog.date == today, HabitLog.is_completed.is_(True))
+        .group_by(HabitLog.user_id)
+    ).all())
+
+    weekly = {}
+    for uid in user_ids:
+        daily = [rows.get((uid, d)) for d in days]
+        total_habits = totals.get(uid, 0)
+        habit_success = int((completed.get(uid, 0)/total_habits)*100) if total_habits else 0
+        weekly[uid] = {
+            "activities": [row.activity_count if row else 0 for row in daily],
+            "mood": [(row.first_mood_score or 0) if row else 0 for row in daily],
+            "calories": [row.calories_out if row else 0 for row in daily],
+            "water_today": rows[(uid, today)].water if (uid, today) in rows else 0,
+            "habit_success": habit_success
+        }
+    return weekly
@@ -0,0 +1,43 @@
+from sqlalchemy.exc import IntegrityError
+from .models import db
+
+
+def insert_for(dialect):
+    """The dialect's INSERT construct, which knows its own upsert syntax; None if it has none."""
+    if dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        return mysql_insert
+    if dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert
+    if dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert
+    return None
+
+
+def insert_missing(model, keys, **values):
+    """
+    INSERT the row unless one with the same `keys` (the columns of a unique
+    constraint) already exists, without failing when a concurrent request
+    inserts it first. `values` must include the keys. Where the dialect has
+    no upsert, the INSERT runs in a savepoint and a duplicate is ignored.
+    """
+    insert = insert_for(db.session.get_bind().dialect)
+    if insert is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(model).values(**values))
+        except IntegrityError:
+            pass
+        return
+
+    stmt = insert(model).values(**values)
+    if db.session.get_bind().dialect.name == 'mysql':
+        # a no-op update rather than INSERT IGNORE: it takes the row's
+        # exclusive lock, so a following SELECT ... FOR UPDATE can't deadlock
+        # with another writer holding a shared one
+        stmt = stmt.on_duplicate_key_update(id=model.id)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[getattr(model, key) for key in keys])
+    db.session.execute(stmt)
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import numpy as np
+from .cache import MemoryBackend
+from .metrics import metrics
+
+
+# analyze_wellness results keyed on a fingerprint of their inputs (LRU, bounded)
+wellness_results = MemoryBackend(int(os.getenv("WELLNESS_CACHE_SIZE", 512)))
+
+
+def linear_regression():
+    """
+    scikit-learn's LinearRegression, imported on first use. sklearn takes
+    longer to load than the rest of the app, and only the 7-day insight fit
+    needs it.
+    """
+    from sklearn.linear_model import LinearRegression
+    return LinearRegression
+
+
+def _wellness_fingerprint(*series):
+    """Stable digest of the input series; equal data gives an equal key."""
+    digest = hashlib.blake2b(digest_size=16)
+    for values in series:
+        values = np.asarray(values, dtype=np.float64)
+        digest.update(str(values.shape).encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def analyze_wellness(activities, mood, calories):
+    """Fit mood against activity and calories burned, given one value per day."""
+    series = activities, mood, calories
+    # Same inputs give the same fit, so reuse the earlier result
+    key = _wellness_fingerprint(*series)
+    cached = wellness_results.get(key)
+    if cached is not None:
+        metrics.incr("wellness_cache.hits")
+        return cached
+    metrics.incr("wellness_cache.misses")
+    result = _fit_wellness(*series)
+    wellness_results.set(key, result)
+    return result
+
+
+def _fit_wellness(activity_list, mood_list, calories_list):
+    # Convert to numpy arrays
+    X = np.array([activity_list, calories_list]).T
+    y = np.array(mood_list)
+
+    # Remove missing values
+    valid = y > 0
+    X, y = X[valid], y[valid]
+
+    if len(y) < 3:
+        return {
+            "insight": "Not enough data for AI analysis.",
+            "activity_mood_corr": 0,
+            "calorie_mood_corr": 0,
+            "prediction": 0
+        }
+
+    # 1. Correlation
+    activity_corr = np.corrcoef(activity_list, mood_list)[0][1]
+    calorie_corr = np.corrcoef(calories_list, mood_list)[0][1]
+
+    # 2. Regression model
+    LinearRegression = linear_regression()
+    model = LinearRegression()
+    model.fit(X, y)
+    predicted_mood = model.predict([[2, 200]])[0]
+
+    return {
+        "activity_mood_corr": round(activity_corr, 2),
+        "calorie_mood_corr": round(calorie_corr, 2),
+        "prediction": round(predicted_mood, 1),
+        "insight": generate_ai_text(activity_corr, calorie_corr)
+    }
+
+
+def generate_ai_text(activity_corr, calorie_corr):
+    insight = ""
+
+    if activity_corr > 0.6:
+        insight += "Your mood strongly improves on active days. Try adding short activities on low-energy days. "
+    elif activity_corr < -0.3:
+        insight += "High activity seems to reduce your mood. Try balancing intense days with rest. "
+
+    if calorie_corr > 0.5:
+        insight += "Burning more calories correlates with better mood. Keep it up! "
+    elif calorie_corr < -0.3:
+        insight += "High calorie days lower your mood—avoid overexertion. "
+
+    if insight == "":
+        insight = "Your lifestyle trends look balanced. Keep maintaining consistency."
+
+    # AI Recommendation
+    recommendation = ""
+    if activity_corr > 0.5 and calorie_corr > 0.5:
+        recommendation = "Aim for 20–30 minutes of moderate activity daily."
+    elif activity_corr < 0:
+        recommendation = "Your body may be stressed. Try light stretching or meditation."
+    elif calorie_corr < 0:
+        recommendation = "Ensure proper nutrition and hydration on workout days."
+    else:
+        recommendation = "Maintain your routine; consistency is improving your wellness."
+
+    return insight + " Recommendation: " + recommendation
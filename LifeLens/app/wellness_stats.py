@@ -0,0 +1,142 @@
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from .models import db, DailyLog, WellnessStats
+from . import upsert
+
+
+# Sufficient statistics over days with a mood logged, where a day is the
+# point (a, c, m) = (activity_count, calories_out, first_mood_score)
+FIELDS = (
+    'n', 'sum_a', 'sum_c', 'sum_m',
+    'sum_aa', 'sum_cc', 'sum_mm', 'sum_ac', 'sum_am', 'sum_cm',
+)
+
+
+def contribution(activity, calories, mood):
+    """What one day adds to each sum; days without a mood add nothing."""
+    if not mood:
+        return np.zeros(len(FIELDS), dtype=np.int64)
+    a, c, m = int(activity or 0), int(calories or 0), int(mood)
+    return np.array([1, a, c, m, a * a, c * c, m * m, a * c, a * m, c * m], dtype=np.int64)
+
+
+def move(user_id, before, after):
+    """
+    Swap a day's old point for its new one in the user's all-time sums.
+    `before` and `after` are (activity_count, calories_out, first_mood_score),
+    with `before` read from the day's rollup row under its lock (see
+    rollup._row). The sums are applied as `col = col + delta`.
+    """
+    delta = contribution(*after) - contribution(*before)
+    if not delta.any():
+        return None
+
+    upsert.insert_missing(WellnessStats, ('user_id',), user_id=user_id, **{name: 0 for name in FIELDS})
+    row = WellnessStats.query.filter_by(user_id=user_id).populate_existing().one()
+    for name, value in zip(FIELDS, delta.tolist()):
+        if value:
+            setattr(row, name, getattr(WellnessStats, name) + value)
+    return row
+
+
+def _sums(a, c, m):
+    """SQL aggregates for every field over DailyLog-shaped columns."""
+    return (
+        func.count(), func.sum(a), func.sum(c), func.sum(m),
+        func.sum(a * a), func.sum(c * c), func.sum(m * m),
+        func.sum(a * c), func.sum(a * m), func.sum(c * m),
+    )
+
+
+def _mood_days(stmt):
+    return stmt.where(DailyLog.first_mood_score > 0)
+
+
+def rebuild(user_id=None):
+    """Recompute the all-time sums from daily_log. The caller commits."""
+    a, c, m = DailyLog.activity_count, DailyLog.calories_out, DailyLog.first_mood_score
+    stmt = _mood_days(select(DailyLog.user_id, *_sums(a, c, m)).group_by(DailyLog.user_id))
+    existing = WellnessStats.query
+    if user_id is not None:
+        stmt = stmt.where(DailyLog.user_id == user_id)
+        existing = existing.filter_by(user_id=user_id)
+
+    rows = {row.user_id: row for row in existing}
+    for row in rows.values():
+        for name in FIELDS:
+            setattr(row, name, 0)
+
+    written = 0
+    for uid, *values in db.session.execute(stmt):
+        row = rows.get(uid)
+        if row is None:
+            row = WellnessStats(user_id=uid)
+            db.session.add(row)
+        for name, value in zip(FIELDS, values):
+            setattr(row, name, int(value or 0))
+        written += 1
+    return written
+
+
+def totals(user_id, window=None, today=None):
+    """
+    The sums for a user as a dict: all-time from the stored row, or for the
+    last `window` days from a single aggregate over daily_log. That reads
+    at most `window` rollup rows (365 for the longest analytics window) from
+    the uq_daily_log_user_date index, rather than a stored lookup: per-day
+    prefix sums would make every write rewrite each later day's prefix.
+    """
+    if window is None:
+        row = WellnessStats.query.filter_by(user_id=user_id).first()
+        return {name: int(getattr(row, name) or 0) if row else 0 for name in FIELDS}
+
+    today = today or date.today()
+    a, c, m = DailyLog.activity_count, DailyLog.calories_out, DailyLog.first_mood_score
+    values = db.session.execute(_mood_days(
+        select(*_sums(a, c, m)).where(
+            DailyLog.user_id == user_id,
+            DailyLog.date >= today - timedelta(days=window - 1),
+            DailyLog.date <= today
+        )
+    )).one()
+    return {name: int(value or 0) for name, value in zip(FIELDS, values)}
+
+
+def _corr(n, sx, sy, sxx, syy, sxy):
+    spread = (n * sxx - sx * sx) * (n * syy - sy * sy)
+    return (n * sxy - sx * sy) / spread ** 0.5 if spread > 0 else 0.0
+
+
+def model(s, activity=2, calories=200):
+    """
+    Correlations with mood and the least-squares mood prediction at
+    (`activity`, `calories`), solved from the sums alone.
+    """
+    n = s['n']
+    if n < 3:
+        return None
+
+    activity_corr = _corr(n, s['sum_a'], s['sum_m'], s['sum_aa'], s['sum_mm'], s['sum_am'])
+    calorie_corr = _corr(n, s['sum_c'], s['sum_m'], s['sum_cc'], s['sum_mm'], s['sum_cm'])
+
+    # Centred normal equations; lstsq gives the minimum-norm answer when the
+    # inputs are collinear, like LinearRegression on the raw rows does
+    mean = np.array([s['sum_a'], s['sum_c']], dtype=np.float64) / n
+    mean_m = s['sum_m'] / n
+    cov = np.array([
+        [s['sum_aa'] - n * mean[0] * mean[0], s['sum_ac'] - n * mean[0] * mean[1]],
+        [s['sum_ac'] - n * mean[0] * mean[1], s['sum_cc'] - n * mean[1] * mean[1]],
+    ])
+    cross = np.array([s['sum_am'] - n * mean[0] * mean_m, s['sum_cm'] - n * mean[1] * mean_m])
+    coef = np.linalg.lstsq(cov, cross, rcond=None)[0]
+    intercept = mean_m - coef @ mean
+
+    return {
+        "days": n,
+        "activity_mood_corr": round(float(activity_corr), 2),
+        "calorie_mood_corr": round(float(calorie_corr), 2),
+        "prediction": round(float(intercept + coef @ [activity, calories]), 1),
+        "coefficients": [round(float(x), 4) for x in coef],
+        "intercept": round(float(intercept), 4)
+    }
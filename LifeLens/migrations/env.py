@@ -51,6 +51,22 @@ def get_metadata():
     return target_db.metadata
 
 
+# Schema that exists outside the models (the SQLite FTS5 index over
+# search_entry and its shadow tables, see app/search.py), and indexes the
+# models declare for one dialect only
+UNMODELLED_TABLES = ('search_entry_fts',)
+DIALECT_INDEXES = {'ix_search_entry_body': 'mysql'}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep autogenerate and `flask db check` from dropping what the models don't describe."""
+    if type_ == 'table' and name.startswith(UNMODELLED_TABLES):
+        return False
+    if type_ == 'index' and name in DIALECT_INDEXES:
+        return context.get_context().dialect.name == DIALECT_INDEXES[name]
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +81,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +110,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
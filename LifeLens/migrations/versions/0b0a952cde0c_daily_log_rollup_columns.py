@@ -0,0 +1,46 @@
+"""Turn daily_log into a per-day rollup
+
+Revision ID: 0b0a952cde0c
+Revises: 2549e9ded886
+Create Date: 2026-10-18 10:12:41.532118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b0a952cde0c'
+down_revision = '2549e9ded886'
+branch_labels = None
+depends_on = None
+
+
+COUNTERS = [
+    'activity_count', 'calories_out',
+    'meal_count', 'calories_in', 'water', 'protein', 'carbs', 'fat',
+    'mood_count', 'mood_total', 'energy_total', 'stress_total',
+    'habits_completed',
+]
+
+
+def upgrade():
+    # Existing rows start at zero; run `flask rollup rebuild` after upgrading
+    # to populate the counters from the raw entries.
+    with op.batch_alter_table('daily_log', schema=None) as batch_op:
+        for name in COUNTERS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('first_mood_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('first_mood_score', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_unique_constraint('uq_daily_log_user_date', ['user_id', 'date'])
+
+
+def downgrade():
+    with op.batch_alter_table('daily_log', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_daily_log_user_date', type_='unique')
+        batch_op.drop_column('updated_at')
+        batch_op.drop_column('first_mood_score')
+        batch_op.drop_column('first_mood_id')
+        for name in reversed(COUNTERS):
+            batch_op.drop_column(name)
@@ -0,0 +1,61 @@
+"""One habit_log row per habit and day
+
+Revision ID: 9c1d5e7a3f28
+Revises: e2f7d4a9b0c5
+Create Date: 2026-10-18 18:02:37.215940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1d5e7a3f28'
+down_revision = 'e2f7d4a9b0c5'
+branch_labels = None
+depends_on = None
+
+
+habit_log = sa.table(
+    'habit_log',
+    sa.column('id', sa.Integer),
+    sa.column('habit_id', sa.Integer),
+    sa.column('date', sa.Date),
+    sa.column('completed_count', sa.Integer),
+    sa.column('is_completed', sa.Boolean),
+)
+
+
+def upgrade():
+    # Fold duplicate rows (left by double clicks before the constraint) into
+    # the oldest one: completed if any of them was, with their counts summed.
+    # Run `flask rollup rebuild` and `flask habits repair-streaks` afterwards
+    # if any were merged.
+    conn = op.get_bind()
+    duplicates = conn.execute(
+        sa.select(
+            sa.func.min(habit_log.c.id),
+            habit_log.c.habit_id,
+            habit_log.c.date,
+            sa.func.sum(sa.func.coalesce(habit_log.c.completed_count, 0)),
+            sa.func.max(sa.case((habit_log.c.is_completed.is_(True), 1), else_=0)),
+        )
+        .group_by(habit_log.c.habit_id, habit_log.c.date)
+        .having(sa.func.count(habit_log.c.id) > 1)
+    ).all()
+    for keep, habit_id, day, completed_count, is_completed in duplicates:
+        conn.execute(
+            habit_log.update().where(habit_log.c.id == keep)
+            .values(completed_count=completed_count, is_completed=bool(is_completed))
+        )
+        conn.execute(habit_log.delete().where(
+            habit_log.c.habit_id == habit_id, habit_log.c.date == day, habit_log.c.id != keep
+        ))
+
+    with op.batch_alter_table('habit_log', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_habit_log_habit_date', ['habit_id', 'date'])
+
+
+def downgrade():
+    with op.batch_alter_table('habit_log', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_habit_log_habit_date', type_='unique')
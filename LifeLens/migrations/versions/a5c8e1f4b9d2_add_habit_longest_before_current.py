@@ -0,0 +1,33 @@
+"""Add longest_before_current to habit
+
+Revision ID: a5c8e1f4b9d2
+Revises: e4d9b2a7c3f1
+Create Date: 2026-10-18 16:40:12.518337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5c8e1f4b9d2'
+down_revision = 'e4d9b2a7c3f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('longest_before_current', sa.Integer(), nullable=False, server_default='0'))
+
+    # Where the record is longer than the current streak it's an earlier run.
+    # Where they're equal only the history can tell; run
+    # `flask habits repair-streaks` after upgrading to fill those in
+    op.execute(
+        "UPDATE habit SET longest_before_current = longest_streak WHERE current_streak < longest_streak"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.drop_column('longest_before_current')
@@ -0,0 +1,31 @@
+"""Add streak counters to habit
+
+Revision ID: b3f50e4789e3
+Revises: 0b0a952cde0c
+Create Date: 2026-10-18 11:02:17.408953
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f50e4789e3'
+down_revision = '0b0a952cde0c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Counters start at zero; run `flask habits repair-streaks` after upgrading
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_streak', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('longest_streak', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('last_completed_date', sa.Date(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('habit', schema=None) as batch_op:
+        batch_op.drop_column('last_completed_date')
+        batch_op.drop_column('longest_streak')
+        batch_op.drop_column('current_streak')
@@ -0,0 +1,68 @@
+"""Add search_entry table and its full-text index
+
+Revision ID: d8a3f6c1e4b7
+Revises: 9c1d5e7a3f28
+Create Date: 2026-10-18 18:41:52.630817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8a3f6c1e4b7'
+down_revision = '9c1d5e7a3f28'
+branch_labels = None
+depends_on = None
+
+
+# Same statements as app/search.py FTS_DDL
+SQLITE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_entry_fts USING fts5("
+    "body, content='search_entry', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ai AFTER INSERT ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(rowid, body) VALUES (new.id, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ad AFTER DELETE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body) VALUES ('delete', old.id, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_au AFTER UPDATE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+    "INSERT INTO search_entry_fts(rowid, body) VALUES (new.id, new.body); END",
+)
+
+
+def upgrade():
+    # Starts empty; run `flask search rebuild` after upgrading to index
+    # existing entries.
+    op.create_table('search_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('entry_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'entry_id', name='uq_search_entry_kind_entry')
+    )
+    with op.batch_alter_table('search_entry', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_search_entry_user_id'), ['user_id'], unique=False)
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.create_index('ix_search_entry_body', 'search_entry', ['body'], mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ix_search_entry_body', table_name='search_entry')
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_entry_fts")
+
+    with op.batch_alter_table('search_entry', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_search_entry_user_id'))
+
+    op.drop_table('search_entry')
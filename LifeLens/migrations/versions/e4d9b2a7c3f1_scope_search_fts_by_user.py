@@ -0,0 +1,68 @@
+"""Index user_id in the SQLite search_entry_fts table
+
+Revision ID: e4d9b2a7c3f1
+Revises: c1a7e5b3d2f6
+Create Date: 2026-10-18 21:47:06.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4d9b2a7c3f1'
+down_revision = 'c1a7e5b3d2f6'
+branch_labels = None
+depends_on = None
+
+
+TRIGGERS = ('search_entry_ai', 'search_entry_ad', 'search_entry_au')
+
+# Same statements as app/search.py FTS_DDL
+SQLITE_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_entry_fts USING fts5("
+    "body, user_id, content='search_entry', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ai AFTER INSERT ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(rowid, body, user_id) VALUES (new.id, new.body, new.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ad AFTER DELETE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body, user_id) "
+    "VALUES ('delete', old.id, old.body, old.user_id); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_au AFTER UPDATE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body, user_id) "
+    "VALUES ('delete', old.id, old.body, old.user_id); "
+    "INSERT INTO search_entry_fts(rowid, body, user_id) VALUES (new.id, new.body, new.user_id); END",
+)
+
+# The body-only table and triggers from d8a3f6c1e4b7
+PREVIOUS_FTS = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_entry_fts USING fts5("
+    "body, content='search_entry', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ai AFTER INSERT ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(rowid, body) VALUES (new.id, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_ad AFTER DELETE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body) VALUES ('delete', old.id, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS search_entry_au AFTER UPDATE ON search_entry BEGIN "
+    "INSERT INTO search_entry_fts(search_entry_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+    "INSERT INTO search_entry_fts(rowid, body) VALUES (new.id, new.body); END",
+)
+
+
+def _recreate(statements):
+    # MySQL's FULLTEXT index is unchanged: its search already filters by user_id
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS search_entry_fts")
+    for statement in statements:
+        op.execute(statement)
+    # re-index the existing search_entry rows from the content table
+    op.execute("INSERT INTO search_entry_fts(search_entry_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    _recreate(SQLITE_FTS)
+
+
+def downgrade():
+    _recreate(PREVIOUS_FTS)
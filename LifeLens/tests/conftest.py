@@ -0,0 +1,82 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+
+@pytest.fixture
+def app_env():
+    """Extra environment for create_app(); override it in a test module to change the setup."""
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_env):
+    """
+    The app on a fresh SQLite file (DB_PROFILE=local, so WAL and a real
+    connection pool, as in development), with jobs left to the test to run
+    and the offline LLM client.
+    """
+    monkeypatch.setenv('DB_PROFILE', 'local')
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'lifelens.db'}")
+    monkeypatch.setenv('JOBS_MODE', 'worker')
+    monkeypatch.setenv('LLM_BACKEND', 'fake')
+    monkeypatch.delenv('REPLICA_URLS', raising=False)
+    for name, value in app_env.items():
+        monkeypatch.setenv(name, value)
+
+    from app import create_app, db
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        # the primary only: replicas are copies of it (and db remembers every
+        # bind key an earlier app had)
+        db.create_all(bind_key=None)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    """A fresh shared LLM client around FakeClient; its calls are in `.transport.calls`."""
+    from app import llm
+    client = llm.ResilientClient(llm.FakeClient())
+    monkeypatch.setattr(llm, '_client', client)
+    return client
+
+
+@pytest.fixture
+def make_user(app):
+    """Create a user (password 'pw') and return their id."""
+    from app import db
+    from app.models import User
+
+    def make(username='alice', **fields):
+        with app.app_context():
+            user = User(
+                name=username.title(), username=username, email=f'{username}@example.com',
+                password=generate_password_hash('pw'), **fields
+            )
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make
+
+
+@pytest.fixture
+def login(app):
+    """Return a new test client logged in as `username`."""
+    def log_in(username='alice'):
+        client = app.test_client()
+        response = client.post('/auth/', data={'form_type': 'login', 'username': username, 'password': 'pw'})
+        assert response.status_code == 302 and '/auth' not in response.location
+        return client
+    return log_in
+
+
+@pytest.fixture
+def client(make_user, login):
+    """A test client logged in as a new user, alice."""
+    make_user('alice')
+    return login('alice')
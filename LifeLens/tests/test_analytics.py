@@ -0,0 +1,49 @@
+import time
+from datetime import date, datetime, timedelta, timezone
+import pytest
+from app import db
+from app.models import User
+
+
+@pytest.fixture
+def kolkata(monkeypatch):
+    """Run with the server's local time at UTC+05:30."""
+    monkeypatch.setenv('TZ', 'Asia/Kolkata')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def last_modified(client):
+    response = client.get('/api/analytics/stats')
+    assert response.status_code == 200
+    return response.last_modified
+
+
+def test_last_modified_is_the_write_time_in_utc(kolkata, app, make_user, login):
+    written = datetime.utcnow().replace(microsecond=0)
+    make_user('alice', data_updated_at=written)
+    assert last_modified(login('alice')) == written.replace(tzinfo=timezone.utc)
+
+
+def test_last_modified_is_at_least_local_midnight(kolkata, app, make_user, login):
+    make_user('alice', data_updated_at=datetime(2000, 1, 1))
+    midnight = datetime.combine(date.today(), datetime.min.time()).replace(
+        tzinfo=timezone(timedelta(hours=5, minutes=30))
+    )
+    assert last_modified(login('alice')) == midnight
+
+
+def test_if_modified_since_answers_304_until_the_next_write(app, make_user, login):
+    user_id = make_user('alice', data_updated_at=datetime.utcnow() - timedelta(hours=1))
+    client = login('alice')
+    stamp = last_modified(client)
+
+    headers = {'If-Modified-Since': stamp.strftime('%a, %d %b %Y %H:%M:%S GMT')}
+    assert client.get('/api/analytics/stats', headers=headers).status_code == 304
+
+    with app.app_context():
+        db.session.get(User, user_id).mark_data_changed()
+        db.session.commit()
+    assert client.get('/api/analytics/stats', headers=headers).status_code == 200
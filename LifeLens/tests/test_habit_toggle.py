@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import func, select
+from app import db, habit_log, rollup, streaks
+from app.models import DailyLog, Habit, HabitLog, User
+
+# toggles per habit: odd counts end completed, even ones not
+TOGGLES = {'read': 7, 'run': 8, 'water': 5, 'sleep': 1}
+
+
+@pytest.fixture(params=['upsert', 'portable'])
+def habits(request, app, make_user, monkeypatch):
+    """alice's habits by name, each completed on the two days before today."""
+    if request.param == 'portable':
+        # as on a database without INSERT ... ON CONFLICT / ON DUPLICATE KEY
+        monkeypatch.setattr(habit_log, 'insert_for', lambda dialect: None)
+    user_id = make_user('alice')
+    today = date.today()
+    with app.app_context():
+        habits = [Habit(user_id=user_id, name=name) for name in TOGGLES]
+        db.session.add_all(habits)
+        db.session.flush()
+        for habit in habits:
+            for back in (1, 2):
+                db.session.add(HabitLog(
+                    habit_id=habit.id, user_id=user_id, date=today - timedelta(days=back),
+                    completed_count=1, is_completed=True
+                ))
+        rollup.rebuild(user_id)
+        streaks.repair(habits, today)
+        db.session.commit()
+        return {habit.name: habit.id for habit in habits}
+
+
+def test_concurrent_toggles_keep_one_row_and_consistent_counters(app, login, habits):
+    clients = [login('alice') for _ in range(8)]
+    posts = [habits[name] for name, count in TOGGLES.items() for _ in range(count)]
+
+    def toggle(i):
+        response = clients[i % len(clients)].post('/toggle_habit', json={'habit_id': posts[i]})
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        assert set(pool.map(toggle, range(len(posts)))) == {200}
+
+    today = date.today()
+    with app.app_context():
+        user_id = User.query.filter_by(username='alice').one().id
+
+        # exactly one habit_log row per (habit, day), in the state the
+        # number of toggles leaves it
+        rows = db.session.execute(
+            select(HabitLog.habit_id, HabitLog.date, func.count())
+            .group_by(HabitLog.habit_id, HabitLog.date)
+        ).all()
+        assert all(count == 1 for _, _, count in rows)
+        completed = {
+            log.habit_id: log.is_completed
+            for log in HabitLog.query.filter_by(date=today)
+        }
+        assert completed == {habits[name]: count % 2 == 1 for name, count in TOGGLES.items()}
+
+        # the day's rollup count matches the logs, and a rebuild
+        incremental = DailyLog.query.filter_by(user_id=user_id, date=today).one().habits_completed
+        assert incremental == sum(completed.values())
+        rollup.rebuild(user_id)
+        db.session.flush()
+        assert DailyLog.query.filter_by(user_id=user_id, date=today).one().habits_completed == incremental
+
+        # the streak columns match a repair from habit_log
+        def counters():
+            return {
+                habit.id: (habit.current_streak, habit.longest_streak, habit.last_completed_date)
+                for habit in Habit.query.order_by(Habit.id)
+            }
+        incremental = counters()
+        streaks.repair(Habit.query.all(), today)
+        db.session.flush()
+        assert incremental == counters()
+        assert incremental[habits['read']] == (3, 3, today)
+        assert incremental[habits['run']] == (2, 2, today - timedelta(days=1))
+        db.session.rollback()
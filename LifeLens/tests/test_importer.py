@@ -0,0 +1,52 @@
+import io
+import json
+from app.models import Mood
+
+HEADER = 'mood_type,mood_score,energy_score,stress_score,date,notes\n'
+
+
+def upload(client, body, name='moods.csv'):
+    return client.post('/import', data={'kind': 'mood', 'file': (io.BytesIO(body), name)})
+
+
+def test_a_utf16_file_is_rejected(client):
+    response = upload(client, (HEADER + 'calm,6,5,3,2026-01-02,\n').encode('utf-16'))
+    assert response.status_code == 400
+    assert 'UTF-8' in response.json['error']
+
+
+def test_latin1_rows_are_reported_and_the_rest_imported(app, client):
+    body = (HEADER + 'calm,6,5,3,2026-01-02,café\nhappy,8,7,2,2026-01-03,fine\n').encode('latin-1')
+    report = upload(client, body).json
+    assert report['imported'] == 1
+    assert report['errors'] == [{'line': 2, 'error': 'not UTF-8 text'}]
+
+
+def test_unreadable_csv_records_are_reported_and_skipped(app, client):
+    body = (HEADER + 'calm,6,5,3,2026-01-02,' + 'x' * 200_000 + '\nhappy,8,7,2,2026-01-03,\n').encode()
+    report = upload(client, body).json
+    assert report['imported'] == 1
+    assert report['errors'][0]['line'] == 2
+    assert report['errors'][0]['error'].startswith('unreadable CSV')
+
+
+def test_jsonl_lines_are_decoded_one_at_a_time(app, client):
+    good = {'mood_type': 'calm', 'mood_score': 6, 'energy_score': 5, 'stress_score': 3, 'date': '2026-01-02'}
+    body = (json.dumps(good) + '\n').encode() + '{"mood_type": "café"}\n'.encode('latin-1')
+    report = upload(client, body, 'moods.jsonl').json
+    assert report['imported'] == 1
+    assert report['errors'] == [{'line': 2, 'error': 'not UTF-8 text'}]
+
+
+def test_notes_must_be_strings(app, client):
+    rows = [
+        {'mood_type': 'calm', 'mood_score': 6, 'energy_score': 5, 'stress_score': 3,
+         'date': '2026-01-02', 'notes': notes}
+        for notes in ({'a': 1}, ['walk'], 'a quiet day')
+    ]
+    body = ''.join(json.dumps(row) + '\n' for row in rows).encode()
+    report = upload(client, body, 'moods.jsonl').json
+    assert report['imported'] == 1
+    assert [e['error'] for e in report['errors']] == ['notes: must be a string'] * 2
+    with app.app_context():
+        assert [m.notes for m in Mood.query] == ['a quiet day']
@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+import pytest
+from app import db, jobs, job_queue
+from app.models import Job
+
+
+@pytest.fixture
+def user_id(make_user):
+    return make_user('alice')
+
+
+@pytest.fixture
+def handlers(monkeypatch):
+    """Register test job kinds: 'ok' records its payload, 'boom' raises."""
+    ran = []
+
+    def ok(job, payload):
+        ran.append(payload)
+
+    def boom(job, payload):
+        raise ValueError("boom")
+
+    monkeypatch.setitem(jobs.HANDLERS, 'ok', ok)
+    monkeypatch.setitem(jobs.HANDLERS, 'boom', boom)
+    return ran
+
+
+def test_enqueue_reuses_the_queued_job_for_the_same_key(app, user_id, handlers):
+    with app.app_context():
+        first = jobs.enqueue(user_id, 'ok', 'k1', {'n': 1})
+        db.session.commit()
+        assert jobs.enqueue(user_id, 'ok', 'k1', {'n': 2}).id == first.id
+        other = jobs.enqueue(user_id, 'ok', 'k2', {'n': 3})
+        db.session.commit()
+        assert other.id != first.id
+        assert Job.query.count() == 2
+
+        # once the job has finished, the same key queues new work
+        jobs.drain()
+        again = jobs.enqueue(user_id, 'ok', 'k1', {'n': 4})
+        db.session.commit()
+        assert again.id not in (first.id, other.id)
+
+
+def test_claim_takes_the_oldest_pending_job_once(app, user_id, handlers):
+    with app.app_context():
+        queued = [jobs.enqueue(user_id, 'ok', key, {}) for key in ('a', 'b')]
+        db.session.commit()
+        ids = [job.id for job in queued]
+
+        first = jobs.claim()
+        assert (first.id, first.status, first.attempts) == (ids[0], jobs.RUNNING, 1)
+        assert first.started_at is not None
+        assert jobs.claim().id == ids[1]
+        assert jobs.claim() is None
+
+
+def test_run_records_success(app, user_id, handlers):
+    with app.app_context():
+        jobs.enqueue(user_id, 'ok', 'k', {'n': 1})
+        db.session.commit()
+        job = jobs.run(jobs.claim())
+        assert (job.status, job.error) == (jobs.DONE, None)
+        assert job.finished_at is not None
+    assert handlers == [{'n': 1}]
+
+
+def test_run_records_and_logs_failure(app, user_id, handlers, caplog):
+    with app.app_context():
+        jobs.enqueue(user_id, 'boom', 'k', {})
+        db.session.commit()
+        job = jobs.run(jobs.claim())
+        assert (job.status, job.error) == (jobs.FAILED, 'ValueError: boom')
+        assert job.finished_at is not None
+        assert f"job {job.id} failed" in caplog.text
+
+
+def test_thread_pool_requeues_jobs_left_running(app, user_id, handlers):
+    with app.app_context():
+        job = jobs.enqueue(user_id, 'ok', 'k', {})
+        db.session.commit()
+        jobs.claim()
+        # its pool thread died with the process that was running it
+        job.started_at = datetime.utcnow() - timedelta(seconds=app.config['JOBS_STALE_AFTER'] + 1)
+        db.session.commit()
+        job_id = job.id
+
+    job_queue._drain()
+
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.attempts) == (jobs.DONE, 2)
+    assert handlers == [{}]
+
+
+def test_recommendation_page_polls_its_job_until_done(app, client, fake_llm):
+    assert client.get('/recommendation').status_code == 200
+    with app.app_context():
+        job = Job.query.one()
+        job_id = job.id
+        assert job.kind == 'recommendation'
+
+    status = client.get(f'/api/jobs/{job_id}').get_json()
+    assert (status['status'], status['finished_at']) == (jobs.PENDING, None)
+    # a second view while it's queued doesn't add another job
+    client.get('/recommendation')
+    with app.app_context():
+        assert Job.query.count() == 1
+        assert jobs.drain() == 1
+
+    status = client.get(f'/api/jobs/{job_id}').get_json()
+    assert (status['status'], status['error']) == (jobs.DONE, None)
+    assert len(fake_llm.transport.calls) == 1
+
+    # the stored answer is shown without asking the model or queueing again
+    page = client.get('/recommendation').get_data(as_text=True)
+    assert 'Sample activity tip 1' in page
+    with app.app_context():
+        assert Job.query.count() == 1
+    assert len(fake_llm.transport.calls) == 1
+
+
+def test_job_status_is_private_to_its_user(app, client, make_user, login, handlers):
+    other = make_user('bob')
+    with app.app_context():
+        job = jobs.enqueue(other, 'ok', 'k', {})
+        db.session.commit()
+        job_id = job.id
+    assert client.get(f'/api/jobs/{job_id}').status_code == 404
+    assert login('bob').get(f'/api/jobs/{job_id}').status_code == 200
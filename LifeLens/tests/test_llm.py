@@ -0,0 +1,213 @@
+import gc
+from types import SimpleNamespace
+import pytest
+from app import llm
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], x_groq=None)
+
+
+class BrokenStream(llm.FakeClient):
+    """FakeClient whose streamed reply drops the connection after two chunks."""
+
+    def _stream(self, content, usage, size=40):
+        yield chunk(content[:10])
+        yield chunk(content[10:20])
+        raise ConnectionError("connection reset mid-stream")
+
+
+def call(client):
+    return client.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}], stream=True)
+
+
+def test_streams_that_are_never_read_give_their_slot_back():
+    client = llm.ResilientClient(llm.FakeClient(), max_concurrency=2, deadline=0.1)
+    for _ in range(5):
+        call(client)  # dropped before the first chunk
+        gc.collect()
+    for _ in range(5):
+        call(client).close()
+    with call(client), call(client):
+        pass
+    # both slots are free: two streams can be open at once again
+    first, second = call(client), call(client)
+    with pytest.raises(llm.LLMError, match="in flight"):
+        call(client)
+    first.close()
+    second.close()
+
+
+def test_a_finished_stream_gives_its_slot_back_once():
+    client = llm.ResilientClient(llm.FakeClient(), max_concurrency=1, deadline=0.1)
+    stream = call(client)
+    assert "".join(c.choices[0].delta.content or "" for c in stream)
+    stream.close()  # already released; a second release would raise
+    call(client).close()
+
+
+def test_a_stream_dropped_mid_reply_counts_as_a_provider_failure():
+    breaker = llm.CircuitBreaker(threshold=2)
+    client = llm.ResilientClient(BrokenStream(), max_concurrency=1, deadline=0.1, breaker=breaker)
+    for _ in range(2):
+        stream = call(client)
+        with pytest.raises(ConnectionError):
+            list(stream)
+    assert breaker.state == "open"
+    # and the failed streams released their slot
+    assert client.slots.acquire(blocking=False)
+
+
+class StatusError(Exception):
+    """An SDK error carrying the provider's HTTP status."""
+
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class Clock:
+    """A monotonic clock that only moves when told to, or when slept on."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class ScriptedTransport:
+    """
+    SDK-shaped transport answering each call with the next scripted outcome:
+    an exception to raise, or "ok". `took` seconds pass on the clock per call
+    (at most its timeout).
+    """
+
+    def __init__(self, clock, *outcomes, took=0.0):
+        self.clock = clock
+        self.outcomes = list(outcomes)
+        self.took = took
+        self.timeouts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, stream=False, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        self.clock.now += min(self.took, timeout)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(choices=[], usage=None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # backoff takes the top of its jitter range, so sleeps are predictable
+    monkeypatch.setattr(llm.random, "uniform", lambda low, high: high)
+    return Clock()
+
+
+def scripted(clock, *outcomes, took=0.0, **options):
+    transport = ScriptedTransport(clock, *outcomes, took=took)
+    options.setdefault("breaker", llm.CircuitBreaker(threshold=10, clock=clock))
+    client = llm.ResilientClient(transport, clock=clock, sleep=clock.sleep, **options)
+    return client, transport
+
+
+def plain_call(client):
+    return client.chat.completions.create(model="m", messages=[])
+
+
+@pytest.mark.parametrize("error", [
+    StatusError(429), StatusError(500), StatusError(503), StatusError(408), TimeoutError(), ConnectionError()
+])
+def test_transient_errors_are_retried_with_backoff(clock, error):
+    client, transport = scripted(clock, error, error, "ok", retries=2, backoff=0.5)
+    plain_call(client)
+    assert len(transport.timeouts) == 3
+    assert clock.slept == [0.5, 1.0]
+    assert client.breaker.state == "closed" and client.breaker.failures == 0
+
+
+def test_backoff_is_capped(clock):
+    client, transport = scripted(clock, *[StatusError(503)] * 6, "ok", retries=6, backoff=1.0, max_backoff=5.0)
+    plain_call(client)
+    assert clock.slept == [1.0, 2.0, 4.0, 5.0, 5.0, 5.0]
+
+
+@pytest.mark.parametrize("error", [StatusError(400), StatusError(401), StatusError(404), ValueError("bad")])
+def test_caller_errors_are_raised_at_once(clock, error):
+    client, transport = scripted(clock, error, "ok", retries=3)
+    with pytest.raises(type(error)):
+        plain_call(client)
+    assert len(transport.timeouts) == 1 and clock.slept == []
+    # the provider answered, so it isn't held against it
+    assert client.breaker.failures == 0
+
+
+def test_giving_up_after_the_retries(clock):
+    client, transport = scripted(clock, *[StatusError(502)] * 5, retries=2)
+    with pytest.raises(llm.LLMError, match="after 3 attempt"):
+        plain_call(client)
+    assert len(transport.timeouts) == 3
+    assert client.breaker.failures == 3
+
+
+def test_attempts_share_the_overall_deadline(clock):
+    # every attempt times out; the last one only gets what's left
+    client, transport = scripted(clock, *[TimeoutError()] * 10, took=20.0,
+                                 timeout=20.0, deadline=50.0, retries=10, backoff=0.5)
+    with pytest.raises(llm.LLMError):
+        plain_call(client)
+    assert transport.timeouts == [20.0, 20.0, 8.5]
+    assert clock.now <= 50.0
+
+
+def test_breaker_opens_then_half_opens_then_closes(clock):
+    breaker = llm.CircuitBreaker(threshold=2, reset_after=30.0, clock=clock)
+    client, transport = scripted(clock, StatusError(503), StatusError(503), StatusError(503), "ok",
+                                 retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(llm.LLMError):
+            plain_call(client)
+    assert breaker.state == "open"
+
+    # open: calls fail fast without reaching the provider
+    with pytest.raises(llm.CircuitOpenError):
+        plain_call(client)
+    assert len(transport.timeouts) == 2
+
+    clock.now += 30.0
+    assert breaker.state == "half-open"
+    # the trial fails: straight back to open, however few failures that is
+    with pytest.raises(llm.LLMError):
+        plain_call(client)
+    assert breaker.state == "open"
+
+    clock.now += 30.0
+    plain_call(client)
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_half_open_lets_one_trial_through_at_a_time(clock):
+    breaker = llm.CircuitBreaker(threshold=1, reset_after=30.0, clock=clock)
+    breaker.failure()
+    clock.now += 30.0
+    breaker.allow()  # the trial
+    with pytest.raises(llm.CircuitOpenError):
+        breaker.allow()
+    # a trial that never reports back expires after another reset period
+    clock.now += 30.0
+    breaker.allow()
+
+
+def test_retries_stop_once_the_breaker_opens(clock):
+    breaker = llm.CircuitBreaker(threshold=2, clock=clock)
+    client, transport = scripted(clock, *[StatusError(503)] * 5, retries=5, breaker=breaker)
+    with pytest.raises(llm.LLMError, match="after 2 attempt"):
+        plain_call(client)
+    assert len(transport.timeouts) == 2 and breaker.state == "open"
@@ -0,0 +1,14 @@
+from pathlib import Path
+from flask_migrate import check, stamp
+from app import db
+
+MIGRATIONS = str(Path(__file__).parent.parent / 'migrations')
+
+
+def test_the_models_match_the_migrations_without_dropping_the_search_index(app):
+    with app.app_context():
+        tables = db.inspect(db.engine).get_table_names()
+        assert 'search_entry_fts' in tables
+        stamp(directory=MIGRATIONS)
+        # raises (SystemExit) when autogenerate would write a migration
+        check(directory=MIGRATIONS)
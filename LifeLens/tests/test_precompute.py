@@ -0,0 +1,22 @@
+import pytest
+from app.ratelimit import TokenBucket
+
+
+@pytest.mark.parametrize('option', ['--rpm', '--concurrency', '--active-days'])
+@pytest.mark.parametrize('value', ['0', '-1'])
+def test_precompute_rejects_non_positive_limits(app, option, value):
+    result = app.test_cli_runner().invoke(args=['recommendations', 'precompute', '--dry-run', option, value])
+    assert result.exit_code == 2
+    assert f"Invalid value for '{option}'" in result.output
+
+
+def test_precompute_dry_run(app, make_user):
+    make_user('alice')
+    result = app.test_cli_runner().invoke(args=['recommendations', 'precompute', '--dry-run', '--rpm', '600'])
+    assert result.exit_code == 0, result.output
+
+
+@pytest.mark.parametrize('rate', [0, -1])
+def test_token_bucket_needs_a_positive_rate(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate)
@@ -0,0 +1,77 @@
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import text
+from app import archive, db, habit_calendar, query_plans, rollup, search, streaks, wellness_stats
+from app.models import Activity, Habit, HabitLog, Mood, Nutrition
+
+USERS = 4
+DAYS = 500  # past ARCHIVE_AFTER_DAYS, so the archive tables get rows too
+
+
+@pytest.fixture
+def seeded(app, make_user):
+    """Several users with DAYS of entries each, part of it archived. Returns the first user's id."""
+    rng = random.Random(7)
+    today = date.today()
+    user_ids = [make_user(f'user{n}') for n in range(USERS)]
+    with app.app_context():
+        for user_id in user_ids:
+            habits = [Habit(user_id=user_id, name=f'habit {n}', created_at=datetime(2024, 1, 1)) for n in range(4)]
+            db.session.add_all(habits)
+            db.session.flush()
+            for back in range(DAYS):
+                day = today - timedelta(days=back)
+                for _ in range(rng.randint(0, 2)):
+                    db.session.add(Activity(
+                        user_id=user_id, title='Morning walk', category='Cardio', duration=30,
+                        calories=rng.randint(50, 400), intensity='low', notes='walk by the river', date=day
+                    ))
+                if rng.random() < 0.7:
+                    db.session.add(Mood(
+                        user_id=user_id, mood_type='calm', mood_score=rng.randint(1, 10),
+                        energy_score=rng.randint(1, 10), stress_score=rng.randint(1, 10), date=day
+                    ))
+                if rng.random() < 0.8:
+                    db.session.add(Nutrition(
+                        user_id=user_id, meal_type='lunch', food_items='rice and beans',
+                        calories=rng.randint(200, 900), protein=20, carbs=50, fat=10, water=300, date=day
+                    ))
+                for habit in habits:
+                    if rng.random() < 0.6:
+                        db.session.add(HabitLog(
+                            habit_id=habit.id, user_id=user_id, date=day, completed_count=1, is_completed=True
+                        ))
+        db.session.flush()
+        rollup.rebuild()
+        wellness_stats.rebuild()
+        streaks.repair(Habit.query.all(), today)
+        habit_calendar.rebuild()
+        search.rebuild()
+        db.session.commit()
+        archive.run(app.config['ARCHIVE_AFTER_DAYS'], today=today)
+        # planner statistics, as a maintained production database has
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    return user_ids[0]
+
+
+def test_page_queries_use_indexes(app, seeded):
+    with app.app_context():
+        report = query_plans.check(app, seeded)
+
+    # the pages read the rollup, the search index and, for old enough
+    # ranges, the archive tables
+    statements = ' '.join(statement for _, statement, *_ in report)
+    for table in ('daily_log', 'search_entry_fts', 'mood_archive', 'habit_log'):
+        assert table in statements
+    scans = [(path, ' '.join(statement.split()), scanned) for path, statement, _, scanned in report if scanned]
+    assert scans == []
+
+
+def test_a_missing_index_is_reported(app, seeded):
+    with app.app_context():
+        db.session.execute(text('DROP INDEX ix_mood_user_date'))
+        db.session.commit()
+        report = query_plans.check(app, seeded)
+    assert any('mood' in scanned for *_, scanned in report)
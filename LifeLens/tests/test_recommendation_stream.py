@@ -0,0 +1,124 @@
+import json
+import pytest
+from app import llm, recommendations
+from app.recommendations import CATEGORIES, CategoryStream
+
+
+def item(title):
+    return {"title": title, "description": "d", "priority": "High", "meta": [], "icon": "fa-star"}
+
+
+# Keys out of the usual order, a key that isn't a category, brackets, braces
+# and escaped quotes inside strings, nested objects, and a category with
+# more than the three items kept
+TRICKY = json.dumps({
+    "mood": [item('Say "no" [politely]'), item("{breathe}")],
+    "notes": [[1, 2], {"a": "]"}],
+    "habits": [dict(item("Stack habits"), meta=[{"nested": ["x"]}])],
+    "activity": [item(f"Walk {i}") for i in range(5)],
+    "nutrition": [item("Water \\ tea")],
+})
+
+
+class SplitClient(llm.FakeClient):
+    """FakeClient streaming `reply` (default: its usual answer) in `size`-character chunks."""
+
+    def __init__(self, size, reply=None):
+        super().__init__()
+        self.size = size
+        self.reply = reply
+        self.sent = 0
+        self.total = None
+
+    def _stream(self, content, usage, size=40):
+        content = self.reply or content
+        self.total = -(-len(content) // self.size)
+        for chunk in super()._stream(content, usage, self.size):
+            if chunk.choices[0].delta.content is not None:
+                self.sent += 1
+            yield chunk
+
+
+def feed_all(pieces):
+    parser = CategoryStream()
+    emitted = [category for piece in pieces for category in parser.feed(piece)]
+    return parser, emitted
+
+
+def streamed(monkeypatch, transport):
+    monkeypatch.setattr(llm, '_client', llm.ResilientClient(transport))
+    return list(recommendations.stream_ai_recommendations({"days": 7}))
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 40, 100000])
+def test_stream_emits_each_category_once_in_reply_order(monkeypatch, size):
+    transport = SplitClient(size)
+    events = streamed(monkeypatch, transport)
+
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["category"] * len(CATEGORIES) + ["done"]
+    assert [value[0] for _, value in events[:-1]] == list(CATEGORIES)
+
+    result, tokens = events[-1][1]
+    assert result == {name: items for _, (name, items) in events[:-1]}
+    assert tokens > 0
+
+
+def test_categories_arrive_before_the_reply_ends(monkeypatch):
+    transport = SplitClient(10)
+    monkeypatch.setattr(llm, '_client', llm.ResilientClient(transport))
+    events = recommendations.stream_ai_recommendations({"days": 7})
+
+    kind, (name, _) = next(events)
+    assert (kind, name) == ("category", "activity")
+    assert transport.sent < transport.total / 2
+
+
+def test_tricky_reply_split_anywhere_gives_the_same_categories():
+    expected = json.loads(TRICKY)
+    order = ["mood", "habits", "activity", "nutrition"]
+    for at in range(1, len(TRICKY)):
+        parser, emitted = feed_all([TRICKY[:at], TRICKY[at:]])
+        assert [name for name, _ in emitted] == order, at
+        assert dict(emitted) == {name: expected[name][:3] for name in order}
+        assert parser.result() == recommendations.parse(TRICKY)
+
+    _, emitted = feed_all(TRICKY)  # one character at a time
+    assert [name for name, _ in emitted] == order
+
+
+def test_tricky_reply_through_the_client(monkeypatch):
+    events = streamed(monkeypatch, SplitClient(3, reply=TRICKY))
+    assert [value[0] for kind, value in events if kind == "category"] == ["mood", "habits", "activity", "nutrition"]
+    assert events[-1][1][0] == recommendations.parse(TRICKY)
+
+
+def test_a_repeated_category_keeps_its_first_array():
+    reply = '{"mood": [{"title": "first"}], "mood": [{"title": "second"}]}'
+    _, emitted = feed_all([reply[:20], reply[20:]])
+    assert emitted == [("mood", [{"title": "first"}])]
+
+
+def test_truncated_reply_keeps_the_finished_categories():
+    cut = TRICKY.index('"activity"')
+    events = []
+    parser = CategoryStream()
+    for at in range(0, cut, 5):
+        events += parser.feed(TRICKY[at:min(at + 5, cut)])
+    assert [name for name, _ in events] == ["mood", "habits"]
+    assert "error" in parser.result()
+
+
+def test_trailing_garbage_falls_back_to_the_streamed_categories(monkeypatch):
+    reply = TRICKY + " Hope this helps!"
+    events = streamed(monkeypatch, SplitClient(7, reply=reply))
+    result = events[-1][1][0]
+    assert "error" not in result
+    assert result == {name: items for kind, (name, items) in events[:-1]}
+
+
+@pytest.mark.parametrize('reply', ['{"activity": 5}', '{"activity": "abc"}', '{"activity": [1, 2]}', '[1]'])
+def test_a_reply_of_the_wrong_shape_ends_in_an_error(monkeypatch, reply):
+    events = streamed(monkeypatch, SplitClient(2, reply=reply))
+    assert [kind for kind, _ in events] == ["done"]
+    assert "error" in events[-1][1][0]
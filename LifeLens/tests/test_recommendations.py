@@ -0,0 +1,52 @@
+import json
+import pytest
+from app import db, recommendations
+from app.models import RecommendationCache
+
+WEEK = {"activities": [1, 0, 2, 0, 0, 1, 3], "mood": [6] * 7}
+
+
+@pytest.mark.parametrize('reply', [
+    '{"activity": 5}', '{"activity": "abc"}', '{"mood": [1, 2]}', '{"habits": {"title": "x"}}', '[]', '"text"'
+])
+def test_parse_rejects_categories_that_arent_lists_of_objects(reply):
+    result = recommendations.parse(reply)
+    assert "error" in result and result["raw"] == reply
+
+
+def test_parse_trims_and_fills_in_categories():
+    result = recommendations.parse(json.dumps({"activity": [{"title": str(i)} for i in range(5)], "mood": None}))
+    assert [item["title"] for item in result["activity"]] == ["0", "1", "2"]
+    assert result["mood"] == result["nutrition"] == []
+
+
+def test_a_cache_hit_writes_nothing_until_the_hits_are_flushed(app, make_user, monkeypatch):
+    user_id = make_user('alice')
+    monkeypatch.setattr(recommendations, 'cache_hits', recommendations.HitCounter())
+    with app.test_request_context():
+        key = recommendations.fingerprint(WEEK)
+        recommendations.store(user_id, key, recommendations.EMPTY, tokens=100)
+        db.session.commit()
+
+        for _ in range(3):
+            assert recommendations.cached(user_id, WEEK) == (key, recommendations.EMPTY)
+        # nothing pending in the caller's session, and the hits wait in memory
+        assert not db.session.dirty and not db.session.new
+        assert db.session.scalar(db.select(RecommendationCache.hits)) == 0
+
+        assert recommendations.totals() == {"entries": 1, "hits": 3, "tokens_saved": 300}
+        db.session.expire_all()
+        assert db.session.scalar(db.select(RecommendationCache.hits)) == 3
+
+
+def test_hits_are_flushed_once_the_interval_has_passed(app, make_user, monkeypatch):
+    user_id = make_user('alice')
+    monkeypatch.setattr(recommendations, 'cache_hits', recommendations.HitCounter())
+    monkeypatch.setattr(recommendations, 'HITS_FLUSH_INTERVAL', 0)
+    with app.test_request_context():
+        key = recommendations.fingerprint(WEEK)
+        recommendations.store(user_id, key, recommendations.EMPTY, tokens=100)
+        db.session.commit()
+
+        recommendations.cached(user_id, WEEK)
+        assert db.session.scalar(db.select(RecommendationCache.hits)) == 1
@@ -0,0 +1,140 @@
+import sqlite3
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import event, text
+from app import db
+from app.models import Mood, User
+
+MAX_LAG = 5
+
+
+@pytest.fixture
+def app_env(tmp_path):
+    """A primary and one replica, each a SQLite file; lag is re-measured on every request."""
+    return {
+        'REPLICA_URLS': f"sqlite:///{tmp_path / 'replica.db'}",
+        'REPLICA_MAX_LAG': str(MAX_LAG),
+        'REPLICA_STICKY_SECONDS': '10',
+        'REPLICA_CHECK_INTERVAL': '0',
+    }
+
+
+@pytest.fixture
+def replication(app, tmp_path):
+    """Copies the primary to the replica file, after stamping the heartbeat, when called."""
+    def replicate():
+        result = app.test_cli_runner().invoke(args=['replicas', 'heartbeat', '--once'])
+        assert result.exit_code == 0, result.output
+        with app.app_context():
+            db.engines['replica_1'].dispose()
+        primary = sqlite3.connect(tmp_path / 'lifelens.db')
+        replica = sqlite3.connect(tmp_path / 'replica.db')
+        primary.backup(replica)
+        primary.close()
+        replica.close()
+    return replicate
+
+
+@pytest.fixture
+def queries(app):
+    """The SQL each engine ran, by 'primary' and 'replica', since the last clear()."""
+    ran = {'primary': [], 'replica': []}
+    with app.app_context():
+        for name, engine in (('primary', db.engines[None]), ('replica', db.engines['replica_1'])):
+            event.listen(engine, 'before_cursor_execute',
+                         lambda conn, cursor, statement, *args, name=name: ran[name].append(statement))
+    return ran
+
+
+def clear(queries):
+    for statements in queries.values():
+        statements.clear()
+
+
+@pytest.fixture
+def alice(app, make_user, replication):
+    """A user whose last write is long past the sticky window, already on the replica."""
+    user_id = make_user('alice', data_updated_at=datetime.utcnow() - timedelta(hours=1))
+    with app.app_context():
+        db.session.add(Mood(user_id=user_id, mood_type='calm', mood_score=6, energy_score=5,
+                            stress_score=3, date=date.today(), notes='replicated mood'))
+        db.session.commit()
+    replication()
+    return user_id
+
+
+def test_get_is_served_by_the_replica(app, alice, login, queries):
+    client = login('alice')
+    clear(queries)
+
+    response = client.get('/mood')
+    assert response.status_code == 200
+    assert b'replicated mood' in response.data
+    assert queries['replica']
+    # only loading the logged-in user (to check the sticky window) hits the primary
+    assert all('FROM user' in statement for statement in queries['primary'])
+
+
+def test_writes_and_the_sticky_window_stay_on_the_primary(app, alice, login, queries, replication):
+    client = login('alice')
+    clear(queries)
+
+    response = client.post('/mood', data={
+        'mood_type': 'happy', 'mood_score': '8', 'energy_score': '7', 'stress_score': '2',
+        'date': date.today().isoformat(), 'notes': 'fresh mood'
+    })
+    assert response.status_code == 302
+    assert queries['replica'] == []
+
+    # the replica hasn't got the write yet; its author reads from the primary
+    clear(queries)
+    response = client.get('/mood')
+    assert b'fresh mood' in response.data
+    assert queries['replica'] == []
+
+    # once the window has passed (and the replica caught up) reads move back
+    with app.app_context():
+        db.session.get(User, alice).data_updated_at = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+    replication()
+    clear(queries)
+    assert b'fresh mood' in client.get('/mood').data
+    assert queries['replica']
+
+
+def test_a_lagging_replica_falls_back_to_the_primary(app, alice, login, queries, tmp_path):
+    client = login('alice')
+    replica = sqlite3.connect(tmp_path / 'replica.db')
+    replica.execute('UPDATE replica_heartbeat SET beat_at = ?',
+                    ((datetime.utcnow() - timedelta(seconds=MAX_LAG + 1)).isoformat(' '),))
+    replica.commit()
+    replica.close()
+    clear(queries)
+
+    response = client.get('/mood')
+    assert response.status_code == 200
+    assert b'replicated mood' in response.data
+    assert [statement for statement in queries['replica'] if 'replica_heartbeat' not in statement] == []
+    assert any('FROM mood' in statement for statement in queries['primary'])
+
+
+def test_an_unreachable_replica_falls_back_to_the_primary(app, alice, login, queries, tmp_path):
+    client = login('alice')
+    with app.app_context():
+        db.engines['replica_1'].dispose()
+    (tmp_path / 'replica.db').unlink()
+
+    response = client.get('/mood')
+    assert response.status_code == 200
+    assert b'replicated mood' in response.data
+
+
+def test_a_write_mid_request_moves_the_rest_of_it_to_the_primary(app, alice):
+    from flask import g
+    with app.test_request_context():
+        g.db_replica = db.engines['replica_1']
+        assert db.session.get_bind(clause=db.select(Mood.id)) is db.engines['replica_1']
+        db.session.execute(text('UPDATE mood SET notes = notes'))
+        assert g.db_replica is None
+        assert db.session.get_bind(clause=db.select(Mood.id)) is db.engines[None]
+        db.session.rollback()
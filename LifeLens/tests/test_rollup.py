@@ -0,0 +1,116 @@
+import random
+from datetime import date, datetime, timedelta
+import pytest
+from app import db, rollup
+from app.models import Activity, DailyLog, Habit, Mood, Nutrition
+
+COLUMNS = rollup.COUNTERS + ('first_mood_id', 'first_mood_score')
+DAYS = [date(2026, 3, 1) + timedelta(days=i) for i in range(4)]
+
+
+def snapshot(user_id):
+    """The user's daily_log as {date: column values}, read fresh."""
+    db.session.expire_all()
+    return {
+        rollup.as_date(row.date): {name: getattr(row, name) for name in COLUMNS}
+        for row in DailyLog.query.filter_by(user_id=user_id)
+    }
+
+
+def assert_matches_rebuild(user_id):
+    incremental = snapshot(user_id)
+    rollup.rebuild(user_id)
+    db.session.flush()
+    assert incremental == snapshot(user_id)
+
+
+def new_entry(user_id, kind, rng):
+    when = datetime.combine(rng.choice(DAYS), datetime.min.time())
+    if kind == 'activity':
+        return Activity(user_id=user_id, title='Run', category='Exercise', duration=30,
+                        calories=rng.randint(0, 500), intensity='low', date=when)
+    if kind == 'meal':
+        return Nutrition(user_id=user_id, meal_type='lunch', food_items='soup', date=when,
+                         **{name: rng.randint(0, 900) for name in ('calories', 'protein', 'carbs', 'fat', 'water')})
+    return Mood(user_id=user_id, mood_type='calm', date=when,
+                **{name: rng.randint(1, 10) for name in ('mood_score', 'energy_score', 'stress_score')})
+
+
+RECORD = {'activity': rollup.record_activity, 'meal': rollup.record_meal, 'mood': rollup.record_mood}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_adds_and_deletes_match_a_rebuild(app, make_user, seed):
+    rng = random.Random(seed)
+    user_id = make_user('alice')
+    with app.app_context():
+        live = []
+        for step in range(120):
+            if live and rng.random() < 0.4:
+                kind, entry = live.pop(rng.randrange(len(live)))
+                RECORD[kind](entry, -1)
+                db.session.delete(entry)
+            else:
+                kind = rng.choice(list(RECORD))
+                entry = new_entry(user_id, kind, rng)
+                db.session.add(entry)
+                db.session.flush()
+                RECORD[kind](entry)
+                live.append((kind, entry))
+            db.session.flush()
+            if step % 20 == 19:
+                assert_matches_rebuild(user_id)
+        assert_matches_rebuild(user_id)
+
+
+def test_deleting_a_days_first_moods_moves_the_chart_value(app, make_user):
+    user_id = make_user('alice')
+    with app.app_context():
+        moods = [Mood(user_id=user_id, mood_type='calm', mood_score=score, energy_score=5,
+                      stress_score=5, date=datetime(2026, 3, 1)) for score in (3, 7, 9)]
+        for mood in moods:
+            db.session.add(mood)
+            rollup.record_mood(mood)
+
+        for mood, first in ((moods[0], 7), (moods[2], 7), (moods[1], None)):
+            rollup.record_mood(mood, -1)
+            db.session.delete(mood)
+            db.session.flush()
+            assert snapshot(user_id)[date(2026, 3, 1)]['first_mood_score'] == first
+            assert_matches_rebuild(user_id)
+
+
+def test_routes_keep_the_rollup_in_step(app, make_user, login):
+    user_id = make_user('alice')
+    client = login('alice')
+    day = date.today().isoformat()
+
+    for calories in (200, 350):
+        client.post('/add_activity', data={'title': 'Run', 'category': 'Exercise', 'duration': '30',
+                                           'calories': str(calories), 'intensity': 'low', 'date': day})
+    for score in (4, 8):
+        client.post('/mood', data={'mood_type': 'calm', 'mood_score': str(score), 'energy_score': '5',
+                                   'stress_score': '5', 'date': day})
+    client.post('/nutrition', data={'meal_type': 'lunch', 'food_items': 'soup', 'calories': '600',
+                                    'protein': '20', 'carbs': '70', 'fat': '15', 'water': '500', 'date': day})
+    with app.app_context():
+        habits = [Habit(user_id=user_id, name=name) for name in ('read', 'run')]
+        db.session.add_all(habits)
+        db.session.commit()
+        habit_ids = [habit.id for habit in habits]
+        activity_id = db.session.scalar(db.select(Activity.id).order_by(Activity.id))
+        mood_id = db.session.scalar(db.select(Mood.id).order_by(Mood.id))
+        meal_id = db.session.scalar(db.select(Nutrition.id))
+
+    # complete both habits, un-toggle one, then delete the other
+    for habit_id in habit_ids + habit_ids[:1]:
+        assert client.post('/toggle_habit', json={'habit_id': habit_id}).status_code == 200
+    assert client.delete(f'/delete_habit/{habit_ids[1]}').status_code == 200
+    for path in (f'/delete_activity/{activity_id}', f'/delete_mood/{mood_id}', f'/delete_nutrition/{meal_id}'):
+        assert client.delete(path).status_code == 200
+
+    with app.app_context():
+        row = snapshot(user_id)[date.today()]
+        assert (row['activity_count'], row['calories_out'], row['mood_count'], row['first_mood_score'],
+                row['meal_count'], row['habits_completed']) == (1, 350, 1, 8, 0, 0)
+        assert_matches_rebuild(user_id)
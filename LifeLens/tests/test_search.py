@@ -0,0 +1,49 @@
+from datetime import date
+import pytest
+from sqlalchemy import text
+from app import db, search
+from app.models import Activity
+
+
+@pytest.fixture
+def entries(app, make_user):
+    """Two users with overlapping words in their activities; returns their ids."""
+    alice, bob = make_user('alice'), make_user('bob')
+    with app.app_context():
+        for user_id, notes in ((alice, 'salmon run by the river'), (alice, 'hill_runs'),
+                               (bob, 'salmon swim'), (bob, 'salmon pie')):
+            db.session.add(Activity(
+                user_id=user_id, title='Workout', category='Cardio', duration=30,
+                calories=200, intensity='low', notes=notes, date=date(2026, 1, 2)
+            ))
+        db.session.commit()
+        search.rebuild()
+        db.session.commit()
+    return alice, bob
+
+
+def test_full_text_search_only_matches_the_users_own_entries(app, entries):
+    alice, bob = entries
+    with app.app_context():
+        results, has_next = search.search(alice, 'salm')
+        assert [r['body'] for r in results] == ['Workout Cardio salmon run by the river']
+        assert not has_next
+        assert len(search.search(bob, 'salmon')[0]) == 2
+
+        # the MATCH itself is scoped to the user, not filtered after it
+        scoped = db.session.execute(text(
+            "SELECT count(*) FROM search_entry_fts WHERE search_entry_fts MATCH :terms"
+        ), {"terms": f'user_id : "{bob}" AND body : ("salmon"*)'}).scalar()
+        assert scoped == 2
+
+
+def test_substring_search_without_a_full_text_index(app, entries):
+    alice, bob = entries
+    with app.app_context():
+        assert [r.body for r in search._substring_search(alice, ['salm', 'river'], 10, 0)] == \
+            ['Workout Cardio salmon run by the river']
+        # _ is matched literally, not as a LIKE wildcard
+        assert len(search._substring_search(alice, ['hill_runs'], 10, 0)) == 1
+        assert search._substring_search(alice, ['hill_r_ns'], 10, 0) == []
+        assert len(search._substring_search(bob, ['salmon'], 10, 0)) == 2
+        assert len(search._substring_search(bob, ['salmon'], 1, 1)) == 1
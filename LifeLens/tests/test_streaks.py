@@ -0,0 +1,88 @@
+import random
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+from app import db, streaks
+from app.models import Habit, HabitLog
+
+COUNTERS = ('current_streak', 'longest_streak', 'last_completed_date', 'longest_before_current')
+START = date(2026, 1, 1)
+
+
+def counters(habit):
+    return {name: getattr(habit, name) for name in COUNTERS}
+
+
+def set_day(habit, day, completed):
+    log = HabitLog.query.filter_by(habit_id=habit.id, date=day).first()
+    if log is None:
+        log = HabitLog(habit_id=habit.id, user_id=habit.user_id, date=day, completed_count=0)
+        db.session.add(log)
+    log.is_completed = completed
+    db.session.flush()
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_toggling_today_keeps_the_counters_equal_to_a_repair(app, make_user, seed):
+    rng = random.Random(seed)
+    user_id = make_user('alice')
+    with app.app_context():
+        habit = Habit(user_id=user_id, name='read')
+        db.session.add(habit)
+        db.session.flush()
+        for offset in range(90):
+            today = START + timedelta(days=offset)
+            # the daily cron job
+            streaks.roll_over(today)
+            db.session.refresh(habit)
+
+            completed = False
+            # mostly completed days, with gaps, and some days toggled back and forth
+            for _ in range(rng.choice([0, 1, 1, 1, 2, 3])):
+                completed = not completed
+                set_day(habit, today, completed)
+                if completed:
+                    streaks.record_completion(habit, today)
+                else:
+                    streaks.record_uncompletion(habit, today)
+
+                incremental = counters(habit)
+                streaks.repair([habit], today)
+                assert incremental == counters(habit), (today, completed)
+
+
+def test_un_marking_today_reads_no_history(app, make_user):
+    user_id = make_user('alice')
+    with app.app_context():
+        habit = Habit(user_id=user_id, name='read')
+        db.session.add(habit)
+        db.session.flush()
+        # a 5-day record, a gap, then a 5-day current streak ending today
+        days = [START + timedelta(days=i) for i in list(range(5)) + list(range(7, 12))]
+        for day in days:
+            set_day(habit, day, True)
+            streaks.record_completion(habit, day)
+        today = days[-1]
+        assert (habit.current_streak, habit.longest_streak, habit.longest_before_current) == (5, 5, 5)
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        set_day(habit, today, False)
+        statements.clear()
+        streaks.record_uncompletion(habit, today)
+        assert statements == []
+        assert (habit.current_streak, habit.longest_streak) == (4, 5)
+
+
+def test_roll_over_moves_the_broken_streak_behind(app, make_user):
+    user_id = make_user('alice')
+    with app.app_context():
+        habit = Habit(user_id=user_id, name='read')
+        db.session.add(habit)
+        db.session.flush()
+        for day in (START, START + timedelta(days=1)):
+            set_day(habit, day, True)
+            streaks.record_completion(habit, day)
+        assert streaks.roll_over(START + timedelta(days=3)) == 1
+        db.session.refresh(habit)
+        assert (habit.current_streak, habit.longest_streak, habit.longest_before_current) == (0, 2, 2)
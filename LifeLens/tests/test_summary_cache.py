@@ -0,0 +1,49 @@
+import json
+from datetime import date, datetime
+from app import db, rollup, summary_cache
+from app.models import Activity, User
+
+
+def add_activity_elsewhere(app, user_id):
+    """A write as another worker handles it: nothing in this process hears about it."""
+    with app.app_context():
+        activity = Activity(
+            user_id=user_id, title='Run', category='Cardio', duration=30, calories=250,
+            intensity='high', notes='', date=datetime.combine(date.today(), datetime.min.time())
+        )
+        db.session.add(activity)
+        db.session.flush()
+        rollup.record_activity(activity)
+        db.session.get(User, user_id).mark_data_changed()
+        db.session.commit()
+
+
+def test_a_write_in_another_worker_misses_this_workers_cache(app, make_user, login):
+    user_id = make_user('alice')
+    client = login('alice')
+
+    response = client.get('/api/analytics/stats')
+    assert response.json['total_weekly_activities'] == 0
+    stale_etag = response.headers['ETag']
+
+    add_activity_elsewhere(app, user_id)
+
+    response = client.get('/api/analytics/stats', headers={'If-None-Match': stale_etag})
+    assert response.status_code == 200
+    assert response.json['total_weekly_activities'] == 1
+    assert response.headers['ETag'] != stale_etag
+
+    response = client.get('/api/analytics/stats', headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+
+def test_cached_summaries_hold_plain_values(app, make_user, login):
+    make_user('alice')
+    client = login('alice')
+    client.get('/api/analytics/stats')
+
+    entries = list(summary_cache.backend._entries.values())
+    assert entries
+    for _, value in entries:
+        # what a shared backend pickles on every miss: no feature arrays
+        json.dumps(value)
@@ -0,0 +1,86 @@
+import random
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytest
+from app import db, rollup, wellness_stats
+from app.models import Activity, Mood, WellnessStats
+
+DAYS = [date(2026, 3, 1) + timedelta(days=i) for i in range(6)]
+
+
+def stored(user_id):
+    db.session.expire_all()
+    row = WellnessStats.query.filter_by(user_id=user_id).first()
+    return {name: getattr(row, name) if row else 0 for name in wellness_stats.FIELDS}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sums_kept_by_move_match_a_rebuild(app, make_user, seed):
+    rng = random.Random(seed)
+    user_id = make_user('alice')
+    with app.app_context():
+        live = []
+        for _ in range(150):
+            if live and rng.random() < 0.4:
+                entry = live.pop(rng.randrange(len(live)))
+                (rollup.record_mood if isinstance(entry, Mood) else rollup.record_activity)(entry, -1)
+                db.session.delete(entry)
+            else:
+                when = datetime.combine(rng.choice(DAYS), datetime.min.time())
+                if rng.random() < 0.5:
+                    entry = Mood(user_id=user_id, mood_type='calm', mood_score=rng.randint(1, 10),
+                                 energy_score=5, stress_score=5, date=when)
+                    db.session.add(entry)
+                    rollup.record_mood(entry)
+                else:
+                    entry = Activity(user_id=user_id, title='Run', category='Exercise', duration=30,
+                                     calories=rng.randint(0, 600), intensity='low', date=when)
+                    db.session.add(entry)
+                    db.session.flush()
+                    rollup.record_activity(entry)
+                live.append(entry)
+            db.session.flush()
+
+        incremental = stored(user_id)
+        assert incremental == wellness_stats.totals(user_id)
+        wellness_stats.rebuild(user_id)
+        db.session.flush()
+        assert incremental == stored(user_id)
+        # every day is inside a window this long, so it sums the same days
+        assert wellness_stats.totals(user_id, window=30, today=DAYS[-1]) == incremental
+
+
+def sums(points):
+    total = sum((wellness_stats.contribution(*point) for point in points),
+                np.zeros(len(wellness_stats.FIELDS), dtype=np.int64))
+    return dict(zip(wellness_stats.FIELDS, total.tolist()))
+
+
+def random_points(seed, days=40):
+    rng = random.Random(seed)
+    return [(rng.randint(0, 5), rng.randint(0, 900), rng.randint(1, 10)) for _ in range(days)]
+
+
+@pytest.mark.parametrize('points', [random_points(seed) for seed in range(4)] + [
+    # calories a fixed multiple of activities: collinear inputs
+    [(a, 150 * a, m) for a, m in ((1, 4), (2, 6), (3, 5), (4, 9), (0, 2))],
+    [(0, 0, 5), (1, 100, 7), (2, 250, 6)],
+])
+def test_model_matches_the_sklearn_fit(points):
+    from sklearn.linear_model import LinearRegression
+
+    result = wellness_stats.model(sums(points))
+    X = np.array([[a, c] for a, c, _ in points], dtype=np.float64)
+    y = np.array([m for _, _, m in points], dtype=np.float64)
+    fit = LinearRegression().fit(X, y)
+
+    assert result["days"] == len(points)
+    assert result["prediction"] == pytest.approx(round(fit.predict([[2, 200]])[0], 1), abs=0.11)
+    assert result["coefficients"] == pytest.approx(fit.coef_, abs=1e-3)
+    for corr, column in (("activity_mood_corr", 0), ("calorie_mood_corr", 1)):
+        expected = np.corrcoef(X[:, column], y)[0][1]
+        assert result[corr] == pytest.approx(round(expected, 2), abs=0.011)
+
+
+def test_model_needs_three_mood_days():
+    assert wellness_stats.model(sums([(1, 100, 5), (2, 200, 6), (3, 300, 0)])) is None